@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DSP.settings')
 
 application = get_asgi_application()
+
+# Busy upload endpoints answer 429 before their request body is received
+from myapp.services.offload import asgi_guard  # noqa: E402  (needs the app registry)
+
+application = asgi_guard(application)
@@ -124,3 +124,157 @@ STATICFILES_DIRS = [
 ]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Startup preloading. By default a worker imports only the page views; each feature's views
+# (and rasterio, mne, wfdb, TensorFlow, ...) load on its first request.
+# PRELOAD_FEATURES: any of 'ecg', 'eeg', 'signals', 'sar', 'doppler', 'drones', 'audio', 'metrics', or '*'.
+
+PRELOAD_FEATURES = []
+
+# Model registry (myapp/services/model_registry.py)
+# Models listed here are loaded when the app starts; everything else loads on first use, e.g.
+#     ('keras', 'anti_alias_model.h5'),
+#     ('audio-classification', 'prithivMLmods/Common-Voice-Gender-Detection'),
+
+MODEL_REGISTRY_WARMUP = []
+MODEL_REGISTRY_MEMORY_BUDGET_MB = 4096
+MODEL_REGISTRY_RETRY_SECS = 30  # back-off after a failed load, doubled per further failure
+MODEL_REGISTRY_MAX_RETRY_SECS = 600
+
+# Micro-batching of classifier requests (myapp/services/batching.py)
+
+BATCHING_ENABLED = True
+BATCH_MAX_SIZE = 8
+BATCH_WINDOW_MS = 10
+BATCH_RESULT_TIMEOUT = 120  # seconds a request waits for its batched results
+
+# Anti-aliasing reconstruction: frames per model call and cross-fade length in samples
+
+AA_MAX_BATCH = 16
+AA_OVERLAP = 0
+
+# Parsed ECG/EEG uploads, keyed by content hash (myapp/services/signal_cache.py)
+
+SIGNAL_CACHE_DIR = BASE_DIR / 'signal_cache'
+SIGNAL_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# EEG paging: seconds returned by the upload / default page, and the largest page served
+
+EEG_PAGE_SECS = 10
+EEG_MAX_PAGE_SECS = 60
+EEG_OPEN_MAX_BYTES = 512 * 1024 ** 2  # open recordings MNE had to preload (.set without .fdt)
+
+# ECG paging: records are read from their .dat/.hea files one window at a time
+
+ECG_PAGE_SECS = 60
+ECG_MAX_PAGE_SECS = 300
+
+# Joint histogram / recurrence engine (myapp/services/recurrence.py)
+# All-pairs requests above RECURRENCE_PARALLEL_MIN_WORK (pairs * samples) use a process pool.
+
+RECURRENCE_WORKERS = None  # None -> os.cpu_count()
+RECURRENCE_PARALLEL_MIN_WORK = 50_000_000
+RECURRENCE_CACHE_MAX_BYTES = 64 * 1024 ** 2  # cached histograms / matrices (numpy, not JSON lists)
+
+# Pair analysis requests: window used when ``stop`` is missing, largest window,
+# and the largest histogram response (pairs * bins ** 2 cells)
+
+SIGNAL_ANALYSIS_SECS = 60
+SIGNAL_ANALYSIS_MAX_SECS = 600
+SIGNAL_HISTOGRAM_MAX_CELLS = 4_000_000
+
+# Streaming audio decode: samples per decoded block and Welch frame length for spectra
+
+AUDIO_BLOCK_SIZE = 65536
+AUDIO_SPECTRUM_NFFT = 65536
+
+# Polyphase resampling: largest up/down factor before the ratio is approximated
+
+RESAMPLE_MAX_FACTOR = 2000
+
+# Audio spectra (myapp/services/spectrum.py): clips up to SPECTRUM_EXACT_MAX_SAMPLES get one
+# exact rfft, longer ones are Welch-averaged. Analyses and decoded samples are cached by content hash.
+
+SPECTRUM_EXACT_MAX_SAMPLES = 2 ** 22
+AUDIO_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+# Audio sessions (myapp/services/audio_sessions.py): bytes of rendered WAV renditions kept in memory
+
+AUDIO_RENDER_CACHE_MAX_BYTES = 64 * 1024 ** 2
+
+# Doppler scenes (myapp/services/doppler_scene.py)
+
+DOPPLER_MAX_SOURCES = 16
+DOPPLER_MAX_DURATION = 600  # seconds
+
+# SAR tile pyramid (myapp/services/sar_tiles.py): levels with up to SAR_TILE_PREBUILD_MAX_TILES
+# tiles in total are rendered when a product is registered, deeper tiles on first request.
+
+SAR_TILE_CACHE_DIR = BASE_DIR / 'sar_tiles'
+SAR_TILE_CACHE_MAX_BYTES = 4 * 1024 ** 3
+SAR_TILE_PREBUILD_MAX_TILES = 64
+
+# SAR preview image (process_sar): longest side in pixels after block averaging
+
+SAR_PREVIEW_MAX_DIM = 1024
+
+# Block-parallel SAR preview (myapp/services/sar_pipeline.py): rasters above
+# SAR_PARALLEL_MIN_PIXELS are processed in windows of SAR_BLOCK_ROWS rows across SAR_WORKERS processes.
+
+SAR_WORKERS = None  # None -> os.cpu_count()
+SAR_BLOCK_ROWS = 2048
+SAR_PARALLEL_MIN_PIXELS = 16_000_000
+
+# Out-of-process inference (myapp/services/inference_worker.py). With INFERENCE_WORKER_ENABLED
+# the views send audio to `python manage.py inference_worker` (one copy of each model for all
+# web workers) through shared memory; if the worker is down they run in-process when
+# INFERENCE_WORKER_FALLBACK is set. MODEL_REGISTRY_WARMUP applies to the worker as well.
+
+INFERENCE_WORKER_ENABLED = False
+INFERENCE_WORKER_SOCKET = BASE_DIR / 'inference.sock'
+INFERENCE_WORKER_TIMEOUT = 120  # seconds
+INFERENCE_WORKER_FALLBACK = True
+
+# Async upload/processing views (myapp/services/offload.py). Each view runs in its own pool of
+# ASYNC_VIEW_CONCURRENCY threads and queues at most ASYNC_VIEW_QUEUE more requests; further
+# requests get 429. ASYNC_VIEW_LIMITS overrides (concurrency, queue) per view name.
+
+ASYNC_OFFLOAD_ENABLED = True
+ASYNC_VIEW_CONCURRENCY = 4
+ASYNC_VIEW_QUEUE = 16
+ASYNC_VIEW_LIMITS = {
+    'process_sar': (2, 4),
+    'signal_window': (4, 16),
+    'signal_histogram': (2, 8),
+    'signal_recurrence': (2, 4),
+    'doppler_audio': (2, 8),
+    'predict_audio': (2, 8),
+    'drone_upload': (2, 8),
+    'drone_timeline': (2, 8),
+}
+
+# Instrumentation (myapp/services/metrics.py): stage timings and request histograms served at
+# /metrics. METRICS_ENABLED off removes the instrumentation too, not just the endpoint.
+# /metrics answers only METRICS_ALLOWED_IPS (REMOTE_ADDR; behind a proxy, list the proxy or
+# scrape from inside); None exposes it publicly. Per-request tracemalloc peaks and sampled
+# cProfile dumps are off by default; with METRICS_DEBUG_HEADERS they can also be requested
+# with `X-Debug-Memory: 1` / `X-Debug-Profile: 1`.
+
+METRICS_ENABLED = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TRACEMALLOC = False
+METRICS_PROFILE_SAMPLE_RATE = 0.0  # fraction of instrumented requests profiled
+METRICS_PROFILE_DIR = BASE_DIR / 'profiles'
+METRICS_DEBUG_HEADERS = DEBUG
+
+# Drone detection timeline (myapp/services/drone_timeline.py): overlapping windows of
+# DRONE_WINDOW_SECS every DRONE_HOP_SECS; windows below DRONE_GATE_DB (RMS, dBFS) are skipped
+# unless their spectral flux reaches DRONE_FLUX_GATE_DB. The rest are classified DRONE_BATCH_SIZE
+# at a time.
+
+DRONE_WINDOW_SECS = 1.0
+DRONE_HOP_SECS = 0.5
+DRONE_GATE_DB = -45.0
+DRONE_FLUX_GATE_DB = -40.0
+DRONE_BATCH_SIZE = 16
@@ -0,0 +1,84 @@
+"""Shared helpers for the benchmark scripts (run from the repository root)."""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(warmup=False):
+    """Configure Django for a standalone script; skips model warm-up unless asked."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "DSP.settings")
+    import django
+    from django.conf import settings
+    if not warmup:
+        settings.MODEL_REGISTRY_WARMUP = []
+    django.setup()
+
+
+def timeit(fn, repeat=5):
+    """Run ``fn`` ``repeat`` times and return the list of wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def median_ms(times):
+    return round(statistics.median(times) * 1000, 2)
+
+
+def synthetic_grd(path, height=8000, width=12000, seed=0):
+    """Write a tiled uint16 GeoTIFF shaped like a GRD measurement band (speckled ramps); returns path."""
+    import numpy as np
+    import rasterio
+    from rasterio.windows import Window
+
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    profile = dict(driver="GTiff", height=height, width=width, count=1, dtype="uint16",
+                   tiled=True, blockxsize=256, blockysize=256)
+    with rasterio.open(path, "w", **profile) as dst:
+        for row in range(0, height, 1024):
+            rows = min(1024, height - row)
+            cols = np.arange(width)
+            scene = 150 + 100 * np.sin(cols / 400.0) + 50 * np.cos((row + np.arange(rows))[:, None] / 300.0)
+            speckle = rng.gamma(4.0, 0.25, size=(rows, width))
+            dst.write((scene * speckle).astype("uint16"), 1, window=Window(0, row, width, rows))
+    return path
+
+
+def use_temp_storage():
+    """Point the database and the on-disk caches at a fresh temp directory (call after setup_django)."""
+    import tempfile
+    from django.conf import settings
+    from django.core.management import call_command
+
+    root = tempfile.mkdtemp(prefix="signalvista_bench_")
+    settings.DATABASES["default"]["NAME"] = os.path.join(root, "bench.sqlite3")
+    settings.SIGNAL_CACHE_DIR = os.path.join(root, "signal_cache")
+    settings.SAR_TILE_CACHE_DIR = os.path.join(root, "sar_tiles")
+    call_command("migrate", verbosity=0)
+    return root
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
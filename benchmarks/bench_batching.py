@@ -0,0 +1,73 @@
+"""
+Requests/sec of the micro-batching scheduler vs one forward pass per request.
+
+    python benchmarks/bench_batching.py [--model MODEL_ID] [--clients 16] [--requests 256]
+
+Without --model a stand-in classifier is used whose cost is a fixed per-call
+dispatch overhead plus a small per-item cost, serialised on one lock the way
+concurrent calls serialise on a single Hugging Face pipeline on CPU.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import setup_django, print_table
+
+setup_django()
+
+import numpy as np
+from myapp.services import model_registry
+from myapp.services.batching import BatchScheduler
+
+
+class StandInClassifier:
+    def __init__(self, call_overhead=0.02, per_item=0.002):
+        self.call_overhead = call_overhead
+        self.per_item = per_item
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs, batch_size=1):
+        items = inputs if isinstance(inputs, list) else [inputs]
+        with self._lock:
+            time.sleep(self.call_overhead + self.per_item * len(items))
+        result = [[{"label": "stand-in", "score": 1.0}] for _ in items]
+        return result if isinstance(inputs, list) else result[0]
+
+
+def run(call, clients, requests, item):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(lambda _: call(item), range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", help="Hugging Face audio-classification model id")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=3.0, help="clip length per request")
+    args = parser.parse_args()
+
+    classifier = (model_registry.get_model("audio-classification", args.model)
+                  if args.model else StandInClassifier())
+    item = {"array": np.random.default_rng(0).standard_normal(int(16000 * args.seconds)).astype(np.float32),
+            "sampling_rate": 16000}
+
+    rows = [["direct", "-", "-", round(run(classifier, args.clients, args.requests, item), 1), "-"]]
+    for max_batch, window_ms in [(4, 5), (8, 10), (16, 20)]:
+        scheduler = BatchScheduler(lambda items: classifier(items, batch_size=len(items)),
+                                   max_batch_size=max_batch, window_ms=window_ms)
+        rps = run(scheduler.submit, args.clients, args.requests, item)
+        rows.append(["batched", max_batch, window_ms, round(rps, 1),
+                     round(scheduler.stats()["mean_batch_size"], 2)])
+
+    print_table(["path", "max_batch", "window_ms", "req/s", "mean_batch"], rows)
+
+
+if __name__ == "__main__":
+    main()
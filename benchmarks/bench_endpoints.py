@@ -0,0 +1,229 @@
+"""
+End-to-end benchmarks of the processing endpoints on deterministic fixtures.
+
+    python benchmarks/bench_endpoints.py [--sizes small medium] [--cases ecg_upload ...] [--repeat 5]
+                                         [--save benchmarks/baseline.json] [--compare benchmarks/baseline.json]
+
+Each (endpoint, size) runs in a fresh interpreter with a throwaway database and
+caches and with stand-in models (fixtures.py), and drives the view through the
+Django test client:
+
+- ``cold``: ``--repeat`` requests, each on a different fixture (seed), so
+  upload caches never hit (one request for the bundled download.wav);
+- ``warm``: ``--repeat`` requests on the same fixture, after the cold run.
+
+A small warm-up request first loads imports, lazy views and models. Reported
+per row: cold p50, warm p50/p95/p99 in ms, peak RSS of the process and its
+growth over the peak after warm-up, and response bytes.
+
+``--save`` writes the results as JSON; ``--compare`` checks them against a
+saved file and exits non-zero when a latency or peak-RSS figure grew by more
+than ``--tolerance`` (and by more than the absolute noise floors), the
+response size changed by more than ``--tolerance``, or an endpoint that
+passed in the baseline now fails. Baselines are machine
+specific: compare against one recorded on the same host.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import ROOT, print_table
+
+CASES = ["ecg_upload", "eeg_upload", "process_sar", "simulate_doppler", "resample_audio", "predict_audio",
+         "drone_timeline"]
+BUNDLED = ("resample_audio", "predict_audio")  # also run on download.wav as size "bundled"
+WARMUP_SEED = 1000  # small fixture sent once before measuring
+MIN_MS = 5.0  # latency changes below this are noise
+MIN_RSS_MB = 20.0
+
+
+# -------------------------------
+# One (case, size) in a child process
+# -------------------------------
+def build_request(case, size, seed):
+    """(path, kwargs for Client.post) for one request of ``case`` on the fixture of ``size`` and ``seed``."""
+    from benchmarks import fixtures
+
+    if case == "ecg_upload":
+        dat, hea = fixtures.wfdb_record(size, seed)
+        return "/ecg/upload/", {"data": {"dat_file": open(dat, "rb"), "hea_file": open(hea, "rb")}}
+    if case == "eeg_upload":
+        return "/eeg/upload/", {"data": {"set_file": open(fixtures.eeglab_set(size, seed), "rb")}}
+    if case == "process_sar":
+        return "/sar/process/", {"data": {"folder_path": fixtures.grd_safe(size, seed), "format": "png"}}
+    if case == "simulate_doppler":
+        scene = fixtures.doppler_scene(size, seed)
+        return "/doppler/simulate/", {"data": json.dumps(scene), "content_type": "application/json"}
+    if case == "drone_timeline":
+        return "/drones/timeline/", {"data": {"audio": open(fixtures.wav_clip(size, seed), "rb")}}
+    if case in ("resample_audio", "predict_audio"):
+        data = {"audio": open(fixtures.wav_clip(size, seed), "rb")}
+        if case == "resample_audio":
+            data["sampling_rate"] = 8000
+            return "/resample/", {"data": data}
+        return "/predict/", {"data": data}
+    raise ValueError(f"unknown case: {case}")
+
+
+def close_files(kwargs):
+    for value in kwargs["data"].values() if isinstance(kwargs["data"], dict) else ():
+        if hasattr(value, "close"):
+            value.close()
+
+
+def run_child(case, size, repeat):
+    import shutil
+    from benchmarks._common import setup_django, use_temp_storage
+
+    setup_django()
+    root = use_temp_storage()
+    try:
+        _run_child(case, size, repeat)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _run_child(case, size, repeat):
+    import time
+    from benchmarks._common import peak_rss_mb
+    from django.test import Client
+    from benchmarks import fixtures
+    fixtures.install_stand_in_models()
+
+    seeds = range(1 if size == "bundled" else repeat)  # one bundled clip: a single cold request
+    for seed in seeds:  # generate outside the timed region
+        close_files(build_request(case, size, seed)[1])
+    close_files(build_request(case, "small", WARMUP_SEED)[1])
+    client = Client(HTTP_HOST="localhost")  # accepted by the default ALLOWED_HOSTS in DEBUG
+
+    def timed(seed, fixture_size=size):
+        path, kwargs = build_request(case, fixture_size, seed)
+        start = time.perf_counter()
+        response = client.post(path, **kwargs)
+        # Streamed responses do their work while being read: consume them inside the timed region
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        elapsed = time.perf_counter() - start
+        close_files(kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} -> {response.status_code}: {body[:120]!r}")
+        content_type = response["Content-Type"].split(";")[0]
+        if b'"error"' in body[:4096] and content_type in ("application/json", "application/x-ndjson"):
+            raise RuntimeError(f"{path} -> {body[:120]!r}")
+        return elapsed, len(body)
+
+    timed(WARMUP_SEED, "small")  # imports, lazy views and models load outside the measurement
+    idle_rss = peak_rss_mb()
+    cold = [timed(seed) for seed in seeds]
+    warm = [timed(0) for _ in range(repeat)]
+    print(json.dumps({
+        "cold_ms": [t * 1000 for t, _ in cold],
+        "warm_ms": [t * 1000 for t, _ in warm],
+        "bytes": warm[-1][1],
+        "idle_rss_mb": idle_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+# -------------------------------
+# Orchestration, baseline and comparison
+# -------------------------------
+def percentile(values, q):
+    import numpy as np
+    return round(float(np.percentile(values, q)), 1)
+
+
+def measure(case, size, repeat):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", case, size, "--repeat", str(repeat)],
+                         capture_output=True, text=True, cwd=ROOT)
+    if out.returncode != 0:
+        raise RuntimeError((out.stderr.strip().splitlines() or ["failed"])[-1])
+    raw = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        "cold_p50_ms": percentile(raw["cold_ms"], 50),
+        "warm_p50_ms": percentile(raw["warm_ms"], 50),
+        "warm_p95_ms": percentile(raw["warm_ms"], 95),
+        "warm_p99_ms": percentile(raw["warm_ms"], 99),
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+        "rss_growth_mb": round(raw["peak_rss_mb"] - raw["idle_rss_mb"], 1),
+        "bytes": raw["bytes"],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List of regression messages for results worse than ``baseline`` beyond ``tolerance``."""
+    regressions = []
+    for key, now in results.items():
+        before = baseline.get("results", {}).get(key)
+        if before is None or "error" in before:
+            continue
+        if "error" in now:
+            regressions.append(f"{key} now fails: {now['error']}")
+            continue
+        for metric in ("cold_p50_ms", "warm_p50_ms", "warm_p95_ms"):
+            if now[metric] > before[metric] * (1 + tolerance) and now[metric] - before[metric] > MIN_MS:
+                regressions.append(f"{key} {metric}: {before[metric]} -> {now[metric]}")
+        if now["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance) and \
+                now["peak_rss_mb"] - before["peak_rss_mb"] > MIN_RSS_MB:
+            regressions.append(f"{key} peak_rss_mb: {before['peak_rss_mb']} -> {now['peak_rss_mb']}")
+        if abs(now["bytes"] - before["bytes"]) > before["bytes"] * tolerance:
+            regressions.append(f"{key} bytes: {before['bytes']} -> {now['bytes']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=["small", "medium", "large"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth (0.25 = 25%%)")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.repeat)
+        return
+
+    results = {}
+    rows = []
+    for case in args.cases:
+        for size in args.sizes + (["bundled"] if case in BUNDLED else []):
+            key = f"{case}/{size}"
+            try:
+                results[key] = r = measure(case, size, args.repeat)
+                rows.append([key, r["cold_p50_ms"], r["warm_p50_ms"], r["warm_p95_ms"], r["warm_p99_ms"],
+                             r["peak_rss_mb"], r["rss_growth_mb"], r["bytes"]])
+            except RuntimeError as e:
+                results[key] = {"error": str(e)}
+                rows.append([key, "-", "-", "-", "-", "-", "-", f"error: {e}"])
+    print_table(["endpoint/size", "cold p50", "warm p50", "warm p95", "warm p99", "peak MB", "growth MB", "bytes"], rows)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "host": {"python": platform.python_version(), "machine": platform.machine(),
+                         "system": platform.system(), "cpus": os.cpu_count()},
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+        print(f"saved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSION:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
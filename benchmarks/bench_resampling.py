@@ -0,0 +1,65 @@
+"""
+FFT resampling (scipy.signal.resample) vs the polyphase engine.
+
+    python benchmarks/bench_resampling.py [--repeat 3] [--lengths 1 10 60]
+
+Times each common rate pair at several clip lengths: the old FFT path, a
+fresh resample_poly call (filter designed every time), the engine's cached
+filter, and the block-wise StreamingResampler.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import setup_django, timeit, median_ms, print_table
+
+setup_django()
+
+import numpy as np
+from scipy.signal import resample, resample_poly
+from myapp.services import resampling
+
+RATE_PAIRS = [
+    (44100, 16000),
+    (48000, 44100),
+    (44100, 8000),
+    (44100, 3000),
+    (8000, 44100),
+    (22050, 44100),
+]
+
+
+def streamed(x, orig_sr, new_sr, block=65536):
+    r = resampling.StreamingResampler(orig_sr, new_sr)
+    parts = [r.process(x[i:i + block]) for i in range(0, len(x), block)]
+    parts.append(r.flush())
+    return np.concatenate(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 10, 60], help="clip lengths in seconds")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for orig_sr, new_sr in RATE_PAIRS:
+        up, down = resampling.rational_ratio(orig_sr, new_sr)
+        for secs in args.lengths:
+            x = rng.standard_normal(int(orig_sr * secs)).astype(np.float32)
+            n_out = int(len(x) * new_sr / orig_sr)
+            resampling.resample(x[:1024], orig_sr, new_sr)  # warm the filter cache
+            rows.append([
+                f"{orig_sr}->{new_sr}", f"{up}/{down}", secs,
+                median_ms(timeit(lambda: resample(x, n_out), args.repeat)),
+                median_ms(timeit(lambda: resample_poly(x, up, down), args.repeat)),
+                median_ms(timeit(lambda: resampling.resample(x, orig_sr, new_sr), args.repeat)),
+                median_ms(timeit(lambda: streamed(x, orig_sr, new_sr), args.repeat)),
+            ])
+    print_table(["rates", "up/down", "secs", "fft_ms", "poly_ms", "cached_ms", "stream_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Block-parallel SAR preview vs the single-threaded full-band read.
+
+    python benchmarks/bench_sar_pipeline.py [--tiff path] [--size 16000x24000] [--workers 1 2 4 8]
+
+Without --tiff a synthetic GRD-like band is written to a temp directory.
+Reports wall time and speed-up over the serial full read for each worker
+count, plus the largest difference between the two previews.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import setup_django, timeit, median_ms, print_table, synthetic_grd
+
+setup_django()
+
+import numpy as np
+import rasterio
+from skimage.transform import downscale_local_mean
+from django.conf import settings
+from myapp.services import sar_pipeline
+
+
+def serial_preview(path, max_dim):
+    """Previous process_sar read stage: whole band in memory, then block mean and dB."""
+    with rasterio.open(path) as src:
+        image_data = src.read(1).astype(np.float32)
+    factors = sar_pipeline.preview_factors(*image_data.shape, max_dim)
+    return 10 * np.log10(downscale_local_mean(image_data, factors) + 1e-6)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tiff")
+    parser.add_argument("--size", default="16000x24000", help="synthetic band HEIGHTxWIDTH")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--block-rows", type=int, default=settings.SAR_BLOCK_ROWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    height, width = (int(v) for v in args.size.split("x"))
+    path = args.tiff or synthetic_grd(os.path.join(tempfile.gettempdir(), f"bench_grd_{args.size}.tiff"), height, width)
+    max_dim = settings.SAR_PREVIEW_MAX_DIM
+    print(f"{path}, {os.cpu_count()} cores, preview <= {max_dim} px, {args.block_rows} rows per window")
+
+    baseline = median_ms(timeit(lambda: serial_preview(path, max_dim), args.repeat))
+    rows = [["serial full read", "-", baseline, 1.0]]
+    reference = serial_preview(path, max_dim)
+    for workers in args.workers:
+        fn = lambda: sar_pipeline.preview_db(path, max_dim, workers=workers, block_rows=args.block_rows)
+        fn()  # start the pool outside the timed runs
+        ms = median_ms(timeit(fn, args.repeat))
+        rows.append(["windowed pipeline", workers, ms, round(baseline / ms, 2)])
+    print_table(["path", "workers", "median_ms", "speedup"], rows)
+
+    preview = sar_pipeline.preview_db(path, max_dim)
+    inner = (slice(0, reference.shape[0] - 1), slice(0, reference.shape[1] - 1))  # edge blocks differ by design
+    print(f"max |difference| (interior): {np.abs(preview[inner] - reference[inner]).max():.2e} dB")
+
+
+if __name__ == "__main__":
+    main()
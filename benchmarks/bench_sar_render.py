@@ -0,0 +1,94 @@
+"""
+SAR preview rendering: matplotlib figure + savefig vs direct array-to-PNG/WebP.
+
+    python benchmarks/bench_sar_render.py [--tiff path] [--size 8000x12000]
+
+Without --tiff a synthetic GRD-like band is written to a temp directory.
+Each row times read -> bytes (full read, block mean, dB, render) and the
+render stage alone. The matplotlib row uses the old 2048 px preview; the
+direct rows use the SAR_PREVIEW_MAX_DIM preview process_sar now serves.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import setup_django, timeit, median_ms, print_table, synthetic_grd
+
+setup_django()
+
+import numpy as np
+import rasterio
+from skimage.transform import downscale_local_mean
+from django.conf import settings
+from myapp.services import sar_render
+
+
+def read_db(path, max_dim=2048, ceil=False):
+    """The process_sar read stage: full band, block mean down to max_dim, dB."""
+    with rasterio.open(path) as src:
+        image_data = src.read(1).astype(np.float32)
+    if image_data.shape[0] > max_dim or image_data.shape[1] > max_dim:
+        div = (lambda n: -(-n // max_dim)) if ceil else (lambda n: n // max_dim)
+        factors = (max(1, div(image_data.shape[0])), max(1, div(image_data.shape[1])))
+        image_data = downscale_local_mean(image_data, factors)
+    return 10 * np.log10(image_data + 1e-6)
+
+
+def render_matplotlib(db, title):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.imshow(db, cmap="gray", aspect="auto")
+    ax.set_title(title)
+    ax.set_xlabel("Range bins")
+    ax.set_ylabel("Azimuth lines")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tiff")
+    parser.add_argument("--size", default="8000x12000", help="synthetic band HEIGHTxWIDTH")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    height, width = (int(v) for v in args.size.split("x"))
+    path = args.tiff or synthetic_grd(os.path.join(tempfile.gettempdir(), f"bench_grd_{args.size}.tiff"), height, width)
+    old_read = lambda: read_db(path)
+    new_read = lambda: read_db(path, settings.SAR_PREVIEW_MAX_DIM, ceil=True)
+    for name, read in [("old", old_read), ("new", new_read)]:
+        print(f"{name} preview: {read().shape[1]}x{read().shape[0]}")
+
+    renderers = [
+        ("matplotlib png", old_read, lambda d: render_matplotlib(d, os.path.basename(path))),
+        ("direct png gray", new_read, lambda d: sar_render.render(d, "gray", "png")[0]),
+        ("direct png viridis", new_read, lambda d: sar_render.render(d, "viridis", "png")[0]),
+        ("direct webp gray", new_read, lambda d: sar_render.render(d, "gray", "webp")[0]),
+        ("direct png gray @2048", old_read, lambda d: sar_render.render(d, "gray", "png")[0]),
+    ]
+    rows = []
+    for name, read, fn in renderers:
+        db = read()
+        try:
+            size = len(fn(db))
+        except Exception as e:
+            print(f"skipping {name}: {e}")
+            continue
+        rows.append([
+            name, size,
+            median_ms(timeit(lambda: fn(db), args.repeat)),
+            median_ms(timeit(lambda: fn(read()), args.repeat)),
+        ])
+    print_table(["renderer", "bytes", "render_ms", "read_to_bytes_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
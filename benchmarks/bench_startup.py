@@ -0,0 +1,104 @@
+"""
+Worker startup cost: import time and RSS of a freshly started Django process.
+
+    python benchmarks/bench_startup.py [--max-startup-ms 1500] [--max-rss-mb 200]
+
+Each row is measured in a new interpreter: startup with lazy feature views
+(the default), with every feature preloaded, and the first-request import
+cost of each feature on top of a lazy start. With the --max-* options the
+script exits non-zero when the lazy start exceeds them, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import ROOT, print_table
+
+HEAVY = ["numpy", "scipy", "soundfile", "librosa", "mne", "wfdb", "rasterio", "skimage",
+         "matplotlib", "tensorflow", "torch", "transformers"]
+
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+os.environ["DJANGO_SETTINGS_MODULE"] = "DSP.settings"
+from django.conf import settings
+settings.PRELOAD_FEATURES = {preload!r}
+settings.MODEL_REGISTRY_WARMUP = []
+import django
+django.setup()
+from django.urls import resolve
+resolve("/")
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+startup_ms = (time.perf_counter() - start) * 1000
+startup_rss = rss_mb()
+feature_ms = feature_rss = 0.0
+if {feature!r}:
+    from myapp.views import lazy
+    t = time.perf_counter()
+    lazy.preload([{feature!r}])
+    feature_ms = (time.perf_counter() - t) * 1000
+    feature_rss = rss_mb() - startup_rss
+print(json.dumps({{
+    "startup_ms": startup_ms, "rss_mb": startup_rss,
+    "feature_ms": feature_ms, "feature_rss_mb": feature_rss,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(preload=(), feature=None):
+    code = CHILD.format(root=ROOT, preload=list(preload), feature=feature, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-startup-ms", type=float)
+    parser.add_argument("--max-rss-mb", type=float)
+    args = parser.parse_args()
+
+    from myapp.views.lazy import FEATURE_MODULES
+
+    lazy = measure()
+    rows = [["lazy start", round(lazy["startup_ms"]), round(lazy["rss_mb"], 1), "-", "-", ",".join(lazy["heavy"]) or "-"]]
+    preloaded = measure(preload=["*"])
+    rows.append(["preload *", round(preloaded["startup_ms"]), round(preloaded["rss_mb"], 1), "-", "-",
+                 ",".join(preloaded["heavy"])])
+    for feature in FEATURE_MODULES:
+        try:
+            r = measure(feature=feature)
+        except RuntimeError as e:
+            rows.append([f"first {feature} request", "-", "-", "-", "-", f"error: {e}"])
+            continue
+        rows.append([f"first {feature} request", "-", "-", round(r["feature_ms"]), round(r["feature_rss_mb"], 1),
+                     ",".join(r["heavy"])])
+    print_table(["scenario", "startup_ms", "rss_mb", "import_ms", "extra_rss_mb", "heavy modules loaded"], rows)
+
+    failed = []
+    if args.max_startup_ms and lazy["startup_ms"] > args.max_startup_ms:
+        failed.append(f"startup {lazy['startup_ms']:.0f} ms > {args.max_startup_ms} ms")
+    if args.max_rss_mb and lazy["rss_mb"] > args.max_rss_mb:
+        failed.append(f"RSS {lazy['rss_mb']:.1f} MB > {args.max_rss_mb} MB")
+    if failed:
+        print("REGRESSION: " + "; ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
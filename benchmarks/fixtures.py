@@ -0,0 +1,138 @@
+"""
+Deterministic offline fixtures and stand-in models for the endpoint benchmarks.
+
+Every generator takes a size name and a seed and writes its files once under
+``FIXTURE_DIR`` (the same size and seed always give the same bytes), so
+repeated runs and baseline comparisons measure identical inputs.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks._common import ROOT, synthetic_grd
+
+
+FIXTURE_DIR = os.environ.get("BENCH_FIXTURE_DIR", os.path.join(tempfile.gettempdir(), "signalvista_bench_fixtures"))
+
+SIZES = {
+    # name: (ECG seconds, EEG seconds, SAR HEIGHTxWIDTH, WAV seconds, Doppler seconds)
+    "small": (60, 60, (1000, 1500), 5, 2),
+    "medium": (600, 600, (4000, 6000), 60, 30),
+    "large": (3600, 1800, (8000, 12000), 600, 300),
+}
+ECG_FS, ECG_CHANNELS = 500, 12
+EEG_FS, EEG_CHANNELS = 256, 32
+WAV_SR = 44100
+
+
+def _path(*parts):
+    path = os.path.join(FIXTURE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def wfdb_record(size, seed=0):
+    """12-lead .dat/.hea record (ECG-like waveform plus noise); returns (dat_path, hea_path)."""
+    import wfdb
+
+    seconds = SIZES[size][0]
+    name = f"ecg_{size}_{seed}"
+    base = _path("ecg", name)
+    if not os.path.exists(base + ".hea"):
+        rng = np.random.default_rng(seed)
+        t = np.arange(seconds * ECG_FS) / ECG_FS
+        beat = np.exp(-((t % 0.8) - 0.2) ** 2 / 0.0005)  # 75 bpm R peaks
+        leads = np.stack([beat * (0.5 + 0.1 * i) + 0.05 * rng.standard_normal(t.size) for i in range(ECG_CHANNELS)], axis=1)
+        wfdb.wrsamp(name, fs=ECG_FS, units=["mV"] * ECG_CHANNELS, sig_name=[f"L{i + 1}" for i in range(ECG_CHANNELS)],
+                    p_signal=leads, fmt=["16"] * ECG_CHANNELS, write_dir=os.path.dirname(base))
+    return base + ".dat", base + ".hea"
+
+
+def eeglab_set(size, seed=0):
+    """32-channel EEGLAB .set file (alpha rhythm plus pink-ish noise); returns its path."""
+    seconds = SIZES[size][1]
+    path = _path("eeg", f"eeg_{size}_{seed}.set")
+    if not os.path.exists(path):
+        import mne
+
+        rng = np.random.default_rng(seed)
+        t = np.arange(seconds * EEG_FS) / EEG_FS
+        noise = np.cumsum(rng.standard_normal((EEG_CHANNELS, t.size)), axis=1)
+        noise -= noise.mean(axis=1, keepdims=True)
+        data = (20 * np.sin(2 * np.pi * 10 * t) + 0.5 * noise) * 1e-6
+        info = mne.create_info([f"EEG{i + 1:03d}" for i in range(EEG_CHANNELS)], EEG_FS, "eeg")
+        raw = mne.io.RawArray(data, info, verbose="ERROR")
+        mne.export.export_raw(path, raw, fmt="eeglab", verbose="ERROR")
+    return path
+
+
+def grd_safe(size, seed=0):
+    """.SAFE-style folder with one VV GRD measurement band (no manifest); returns the folder."""
+    height, width = SIZES[size][2]
+    folder = os.path.join(FIXTURE_DIR, "sar", f"S1A_IW_GRDH_{size}_{seed}.SAFE")
+    synthetic_grd(os.path.join(folder, "measurement", f"s1a-iw-grd-vv-bench-{size}-{seed:03d}.tiff"), height, width, seed)
+    return folder
+
+
+def wav_clip(size, seed=0, samplerate=WAV_SR):
+    """Mono 16-bit WAV (chirp with one harmonic plus noise), or the bundled download.wav; returns its path."""
+    import soundfile as sf
+
+    if size == "bundled":
+        return os.path.join(ROOT, "download.wav")
+    seconds = SIZES[size][3]
+    path = _path("wav", f"clip_{size}_{seed}_{samplerate}.wav")
+    if not os.path.exists(path):
+        rng = np.random.default_rng(seed)
+        t = np.arange(int(seconds * samplerate)) / samplerate
+        phase = 2 * np.pi * (200 * t + 300 * t * (t % 5) / 5)
+        y = 0.4 * np.sin(phase) + 0.2 * np.sin(2 * phase) + 0.02 * rng.standard_normal(t.size)
+        sf.write(path, y.astype(np.float32), samplerate, subtype="PCM_16")
+    return path
+
+
+def doppler_scene(size, seed=0):
+    """Scene JSON body for /doppler/simulate/: more and longer sources for larger sizes."""
+    rng = np.random.default_rng(seed)
+    n_sources = {"small": 1, "medium": 4, "large": 16}[size]
+    return {
+        "duration": SIZES[size][4],
+        "fs": 44100,
+        "points": 2000,
+        "sources": [
+            {"frequency": float(rng.uniform(200, 2000)), "velocity": float(rng.uniform(5, 60)),
+             "distance": float(rng.uniform(5, 50)), "trajectory": "linear"}
+            for _ in range(n_sources)
+        ],
+    }
+
+
+# -------------------------------
+# Stand-in models (no network, no TensorFlow/transformers)
+# -------------------------------
+class StandInReconstructor:
+    """Keras-like model: 5-tap moving average per frame through ``predict_on_batch``."""
+
+    def predict_on_batch(self, frames):
+        frames = np.asarray(frames, dtype=np.float32)
+        kernel = np.full(5, 0.2, dtype=np.float32)
+        return np.apply_along_axis(lambda f: np.convolve(f, kernel, mode="same"), 1, frames[:, :, 0])[:, :, None]
+
+
+def stand_in_classifier(inputs, batch_size=None):
+    """Pipeline-like classifier: label from RMS energy; a list of inputs gives a list of results."""
+    def predict(item):
+        y = np.asarray(item["array"], dtype=np.float32) if isinstance(item, dict) else np.zeros(1, np.float32)
+        rms = float(np.sqrt(np.mean(y ** 2))) if y.size else 0.0
+        score = min(1.0, rms * 4)
+        return [{"label": "loud", "score": score}, {"label": "quiet", "score": 1 - score}]
+    return [predict(i) for i in inputs] if isinstance(inputs, list) else predict(inputs)
+
+
+def install_stand_in_models():
+    """Route model registry loads to the stand-ins."""
+    from myapp.services import model_registry
+
+    model_registry.LOADERS["keras"] = lambda task, model_id, device: StandInReconstructor()
+    model_registry.LOADERS["audio-classification"] = lambda task, model_id, device: stand_in_classifier
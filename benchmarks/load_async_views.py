@@ -0,0 +1,175 @@
+"""
+Tail latency of mixed traffic through the ASGI application, sync vs offloaded views.
+
+    python benchmarks/load_async_views.py [--duration 15] [--slow 2] [--fast 4] [--size 6000x9000] [--burst 20]
+
+An in-process ASGI client drives ``DSP.asgi.application`` (no server, no
+network): ``--slow`` clients post a synthetic GRD product to /sar/process/ in a
+loop while ``--fast`` clients alternate a short audio analysis and a cached SAR
+tile. Each scenario reports p50/p95/p99 per request kind (answered requests
+only; clients wait ``Retry-After`` after a 429):
+
+- ``sync``: ASYNC_OFFLOAD_ENABLED off, i.e. the views run as the previous sync
+  views did under ASGI: one thread per request, no limit;
+- ``offloaded``: upload/processing views in their bounded pools.
+
+``--burst`` then sends that many simultaneous SAR requests to show the 429s
+past the endpoint's concurrency + queue.
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks._common import setup_django, print_table, synthetic_grd, use_temp_storage
+
+setup_django()
+STORAGE = use_temp_storage()  # SAFE products are indexed in the database: use a throwaway one
+
+import numpy as np
+import soundfile as sf
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import MULTIPART_CONTENT, BOUNDARY, encode_multipart
+
+from DSP.asgi import application
+from myapp.services import offload
+
+
+# -------------------------------
+# Stand-in ASGI client
+# -------------------------------
+async def request(method, path, body=b"", content_type=None, chunk=256 * 1024):
+    """(status, seconds) for one request; the body is sent in ``chunk``-byte messages."""
+    headers = [(b"host", b"localhost")]
+    if content_type:
+        headers += [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    chunks = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b""]
+    sent = iter(enumerate(chunks))
+    status = []
+
+    async def receive():
+        try:
+            i, data = next(sent)
+        except StopIteration:
+            await asyncio.sleep(3600)  # no disconnect while the view runs
+        return {"type": "http.request", "body": data, "more_body": i < len(chunks) - 1}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    return status[0], time.perf_counter() - start
+
+
+def multipart(**fields):
+    return encode_multipart(BOUNDARY, fields), MULTIPART_CONTENT
+
+
+def fixtures(size):
+    height, width = (int(v) for v in size.split("x"))
+    root = tempfile.mkdtemp(suffix=".SAFE")
+    os.makedirs(os.path.join(root, "measurement"))
+    synthetic_grd(os.path.join(root, "measurement", "s1a-iw-grd-vv-bench-001.tiff"), height, width)
+
+    wav = io.BytesIO()
+    t = np.arange(22050) / 22050
+    sf.write(wav, (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), 22050, format="WAV")
+    return root, wav.getvalue()
+
+
+async def scenario(duration, n_slow, n_fast, sar_body, audio_body, tile_path):
+    latencies = {"sar process": [], "audio analyze": [], "sar tile": []}
+    statuses = {}
+    stop = time.perf_counter() + duration
+
+    async def slow_client():
+        while time.perf_counter() < stop:
+            status, seconds = await request("POST", "/sar/process/", *sar_body)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 429:
+                await asyncio.sleep(offload.RETRY_AFTER)  # as a client honouring Retry-After would
+            else:
+                latencies["sar process"].append(seconds)
+
+    async def fast_client():
+        while time.perf_counter() < stop:
+            for kind, args in (("audio analyze", ("POST", "/analyze/", *audio_body)), ("sar tile", ("GET", tile_path))):
+                status, seconds = await request(*args)
+                statuses[status] = statuses.get(status, 0) + 1
+                latencies[kind].append(seconds)
+
+    await asyncio.gather(*[slow_client() for _ in range(n_slow)], *[fast_client() for _ in range(n_fast)])
+    return latencies, statuses
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--slow", type=int, default=2, help="concurrent SAR clients")
+    parser.add_argument("--fast", type=int, default=4, help="concurrent audio/tile clients")
+    parser.add_argument("--size", default="6000x9000", help="synthetic band HEIGHTxWIDTH")
+    parser.add_argument("--burst", type=int, default=20, help="simultaneous SAR requests for the 429 check")
+    args = parser.parse_args()
+
+    folder, wav = fixtures(args.size)
+    sar_body = multipart(folder_path=folder, polarisation="VV")
+    audio_body = multipart(audio=SimpleUploadedFile("tone.wav", wav, "audio/wav"))
+    tile_path = None
+
+    async def run():
+        nonlocal tile_path
+        offload.ENABLED = True
+        status, seconds = await request("POST", "/sar/process/", *sar_body)  # index, register, warm imports
+        print(f"first SAR request: {status} in {seconds * 1000:.0f} ms")
+        from myapp.services import sar_tiles
+        product = sar_tiles.product_id(os.path.join(folder, "measurement", "s1a-iw-grd-vv-bench-001.tiff"))
+        tile_path = f"/sar/tiles/{product}/0/0/0.png"
+        await request("POST", "/analyze/", *audio_body)
+
+        rows = []
+        for name, enabled in (("sync", False), ("offloaded", True)):
+            offload.ENABLED = enabled
+            latencies, statuses = await scenario(args.duration, args.slow, args.fast, sar_body, audio_body, tile_path)
+            for kind, values in latencies.items():
+                rows.append([name, kind, len(values), percentile(values, 50), percentile(values, 95),
+                             percentile(values, 99), round(statistics.mean(values) * 1000, 1) if values else "-"])
+            print(f"{name}: status counts {statuses}")
+        print_table(["views", "request", "n", "p50 ms", "p95 ms", "p99 ms", "mean ms"], rows)
+
+        offload.ENABLED = True
+        burst = await asyncio.gather(*[request("POST", "/sar/process/", *sar_body) for _ in range(args.burst)])
+        codes = [status for status, _ in burst]
+        limits = settings.ASYNC_VIEW_LIMITS.get("process_sar", (settings.ASYNC_VIEW_CONCURRENCY, settings.ASYNC_VIEW_QUEUE))
+        print(f"burst of {args.burst} SAR requests (concurrency {limits[0]}, queue {limits[1]}): "
+              f"{codes.count(200)} x 200, {codes.count(429)} x 429")
+        print(offload.gate_stats())
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(STORAGE, ignore_errors=True)
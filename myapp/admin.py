@@ -1,3 +1,7 @@
 from django.contrib import admin
 
+from .models import SafeProduct, SafeMeasurement
+
 # Register your models here.
+admin.site.register(SafeProduct)
+admin.site.register(SafeMeasurement)
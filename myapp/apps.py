@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.conf import settings
+        from myapp.services import model_registry
+        from myapp.views import lazy
+
+        lazy.preload(getattr(settings, 'PRELOAD_FEATURES', []))
+        if not getattr(settings, 'INFERENCE_WORKER_ENABLED', False):
+            model_registry.warm_up()  # otherwise the inference worker owns the models
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from myapp.services import inference_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the inference worker that owns the models and serves classification and "
+        "anti-aliasing reconstruction to the web workers (set INFERENCE_WORKER_ENABLED)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=inference_worker.ADDRESS,
+                            help="Unix socket path (default: INFERENCE_WORKER_SOCKET).")
+
+    def handle(self, *args, **options):
+        try:
+            inference_worker.serve(options["socket"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafeProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, unique=True)),
+                ('manifest_mtime', models.FloatField()),
+                ('mission', models.CharField(blank=True, max_length=16)),
+                ('product_type', models.CharField(blank=True, max_length=16)),
+                ('mode', models.CharField(blank=True, max_length=16)),
+                ('start_time', models.CharField(blank=True, max_length=32)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SafeMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024)),
+                ('polarisation', models.CharField(max_length=4)),
+                ('swath', models.CharField(max_length=8)),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField()),
+                ('geotransform', models.JSONField()),
+                ('overviews', models.JSONField()),
+                ('mtime', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='myapp.safeproduct')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class SafeProduct(models.Model):
+    """An indexed Sentinel-1 .SAFE folder (parsed from manifest.safe)."""
+
+    path = models.CharField(max_length=1024, unique=True)
+    manifest_mtime = models.FloatField()  # index is stale when manifest.safe changes
+    mission = models.CharField(max_length=16, blank=True)
+    product_type = models.CharField(max_length=16, blank=True)
+    mode = models.CharField(max_length=16, blank=True)
+    start_time = models.CharField(max_length=32, blank=True)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.path
+
+
+class SafeMeasurement(models.Model):
+    """One measurement raster of a product: a polarisation of a swath."""
+
+    product = models.ForeignKey(SafeProduct, on_delete=models.CASCADE, related_name="measurements")
+    path = models.CharField(max_length=1024)
+    polarisation = models.CharField(max_length=4)  # VV, VH, HH, HV
+    swath = models.CharField(max_length=8)  # IW, EW, S1-S6, ...
+    width = models.IntegerField()
+    height = models.IntegerField()
+    geotransform = models.JSONField()  # GDAL order: x0, dx, rx, y0, ry, dy
+    overviews = models.JSONField()  # decimation factors of band 1
+    mtime = models.FloatField()
+
+    def __str__(self):
+        return f"{self.swath} {self.polarisation}: {self.path}"
@@ -0,0 +1,107 @@
+"""
+Audio sessions for the sampling page.
+
+An upload is stored once under its content hash (``audio_id``) in the signal
+cache; ``render`` then produces the WAV rendition of that clip at any
+sampling rate. Rendered rates are kept in a small in-memory LRU bounded by
+``AUDIO_RENDER_CACHE_MAX_BYTES``, so moving the slider back to a rate that was
+already heard costs nothing, and a new rate costs one resample and no upload.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from scipy.io import wavfile
+
+from myapp.services import audio_stream, signal_cache, spectrum
+from myapp.services.resampling import ResamplerChain
+
+
+RENDER_CACHE_MAX_BYTES = getattr(settings, "AUDIO_RENDER_CACHE_MAX_BYTES", 64 * 1024 ** 2)
+MIN_PLAYBACK_SR = 8000  # browsers won't play lower rates; such renditions are upsampled
+PLAYBACK_SR = 44100
+
+_renders = OrderedDict()  # (audio_id, sr) -> WAV bytes, least recently used first
+_render_bytes = 0
+_lock = threading.Lock()
+
+
+def create(audio_file):
+    """Analyse an uploaded clip and keep it under its content hash; returns the ``AudioAnalysis``."""
+    analysis = spectrum.analyse(audio_file)
+    signal_cache.put_source(analysis.key, [audio_file], kind="audio",
+                            samplerate=int(analysis.samplerate), frames=int(analysis.frames))
+    return analysis
+
+
+def _source_path(entry):
+    names = sorted(os.listdir(entry["source_dir"]))
+    return os.path.join(entry["source_dir"], names[0])
+
+
+def get(audio_id):
+    """``AudioAnalysis`` for a stored session, or None if unknown/evicted."""
+    entry = signal_cache.get(audio_id)
+    if entry is None or entry.get("kind") != "audio":
+        return None
+    with open(_source_path(entry), "rb") as f:
+        return spectrum.analyse(f, key=audio_id)
+
+
+def playback_rate(sr):
+    """Rate a rendition at ``sr`` is written at (low rates are upsampled for playback)."""
+    return PLAYBACK_SR if sr < MIN_PLAYBACK_SR else sr
+
+
+def _render_wav(audio_id, analysis, sr):
+    playback_sr = playback_rate(sr)
+    chain = ResamplerChain([analysis.samplerate, sr, playback_sr])
+    if analysis.samples is not None:
+        chunks = [chain.process(analysis.samples)]
+    else:
+        with open(_source_path(signal_cache.get(audio_id)), "rb") as f:
+            with audio_stream.AudioStream(f) as stream:
+                chunks = [chain.process(block) for block in stream]
+    chunks.append(chain.flush())
+    audio = np.concatenate(chunks)
+
+    # Normalize
+    max_val = np.max(np.abs(audio)) if len(audio) else 0
+    if max_val > 0:
+        audio = audio / max_val * 0.85
+    audio_int16 = np.int16(np.clip(audio, -1.0, 1.0) * 32767)
+
+    buffer = io.BytesIO()
+    wavfile.write(buffer, playback_sr, audio_int16)
+    return buffer.getvalue()
+
+
+def render(audio_id, sr, analysis=None):
+    """
+    WAV bytes of session ``audio_id`` resampled to ``sr``, or None if the
+    session is unknown. ``analysis`` skips the session lookup when known.
+    """
+    global _render_bytes
+    key = (audio_id, int(sr))
+    with _lock:
+        wav = _renders.get(key)
+        if wav is not None:
+            _renders.move_to_end(key)
+            return wav
+
+    analysis = analysis or get(audio_id)
+    if analysis is None:
+        return None
+    wav = _render_wav(audio_id, analysis, int(sr))
+
+    with _lock:
+        if key not in _renders:
+            _renders[key] = wav
+            _render_bytes += len(wav)
+            while _render_bytes > RENDER_CACHE_MAX_BYTES and len(_renders) > 1:
+                _, evicted = _renders.popitem(last=False)
+                _render_bytes -= len(evicted)
+    return wav
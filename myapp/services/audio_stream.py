@@ -0,0 +1,67 @@
+"""
+Streaming audio decode for the audio endpoints.
+
+``AudioStream`` reads an uploaded file in fixed-size blocks with soundfile and
+mixes them to mono, so processing can start before the whole clip is decoded
+and peak memory is bounded by ``AUDIO_BLOCK_SIZE`` instead of the clip
+length. Formats libsndfile cannot read fall back to a full librosa decode.
+"""
+import numpy as np
+import soundfile as sf
+from django.conf import settings
+
+
+BLOCK_SIZE = getattr(settings, "AUDIO_BLOCK_SIZE", 65536)
+
+
+class AudioStream:
+    """Mono float32 blocks of an uploaded audio file, plus its sample rate and length."""
+
+    def __init__(self, audio_file, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._array = None
+        audio_file.seek(0)
+        try:
+            self._file = sf.SoundFile(audio_file)
+            self.samplerate = self._file.samplerate
+            self.frames = self._file.frames
+        except Exception:
+            # Not readable by libsndfile (e.g. some compressed formats): decode fully
+            import librosa
+            audio_file.seek(0)
+            self._file = None
+            self._array, self.samplerate = librosa.load(audio_file, sr=None)
+            self.frames = len(self._array)
+
+    def __iter__(self):
+        if self._file is None:
+            for start in range(0, len(self._array), self.block_size):
+                yield self._array[start:start + self.block_size]
+            return
+        self._file.seek(0)
+        for block in self._file.blocks(blocksize=self.block_size, dtype="float32", always_2d=True):
+            yield block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def decode_resampled(audio_file, target_sr, block_size=BLOCK_SIZE):
+    """
+    Decode ``audio_file`` and resample it to ``target_sr`` block by block.
+    Returns (y, original_sr); only the resampled output is held in full.
+    """
+    from myapp.services.resampling import ResamplerChain
+
+    with AudioStream(audio_file, block_size) as stream:
+        chain = ResamplerChain([stream.samplerate, target_sr])
+        chunks = [chain.process(block) for block in stream]
+        chunks.append(chain.flush())
+        return np.concatenate(chunks), stream.samplerate
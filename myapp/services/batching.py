@@ -0,0 +1,196 @@
+"""
+Micro-batching scheduler for the audio classifiers.
+
+Concurrent requests that hit the same model are collected for a short window
+(``BATCH_WINDOW_MS``) or until ``BATCH_MAX_SIZE`` items are waiting, grouped
+into buckets of similar length, and run through the Hugging Face pipeline in a
+single batched forward pass. Each caller blocks only on its own result, for
+at most ``BATCH_RESULT_TIMEOUT`` seconds.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from myapp.services import model_registry
+
+
+BATCHING_ENABLED = getattr(settings, "BATCHING_ENABLED", True)
+BATCH_MAX_SIZE = getattr(settings, "BATCH_MAX_SIZE", 8)
+BATCH_WINDOW_MS = getattr(settings, "BATCH_WINDOW_MS", 10)
+BATCH_RESULT_TIMEOUT = getattr(settings, "BATCH_RESULT_TIMEOUT", 120)  # seconds a caller waits for its results
+BATCH_BUCKET_RATIO = 2.0  # longest / shortest input allowed in one forward pass
+
+
+def input_length(item):
+    """Length used for bucketing: samples for arrays, bytes for file paths."""
+    if isinstance(item, dict) and "array" in item:
+        return len(item["array"])
+    if isinstance(item, str) and os.path.exists(item):
+        return os.path.getsize(item)
+    return 0
+
+
+class BatchScheduler:
+    """Collects submitted items and runs ``infer(list_of_items) -> list_of_results`` in batches."""
+
+    def __init__(self, infer, max_batch_size=BATCH_MAX_SIZE, window_ms=BATCH_WINDOW_MS,
+                 length_fn=input_length, bucket_ratio=BATCH_BUCKET_RATIO):
+        self.infer = infer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = window_ms / 1000.0
+        self.length_fn = length_fn
+        self.bucket_ratio = bucket_ratio
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_size": 0,
+            "batch_sizes": {},
+            "queue_wait_total": 0.0,
+            "inference_time_total": 0.0,
+        }
+
+    def submit(self, item, timeout=BATCH_RESULT_TIMEOUT):
+        """Queue one item and block until its result (or exception) is available."""
+        return self.submit_many([item], timeout)[0]
+
+    def submit_many(self, items, timeout=BATCH_RESULT_TIMEOUT):
+        """
+        Queue several items at once (batched together and with other callers)
+        and block for all results; raises TimeoutError after ``timeout`` seconds
+        in total (None waits forever).
+        """
+        futures = [Future() for _ in items]
+        self._ensure_worker()
+        now = time.perf_counter()
+        for item, future in zip(items, futures):
+            self._queue.put((item, future, now))
+        deadline = None if timeout is None else now + timeout
+        return [future.result(None if deadline is None else max(0.0, deadline - time.perf_counter()))
+                for future in futures]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, batch_sizes=dict(self._stats["batch_sizes"]))
+        batches = max(1, stats["batches"])
+        items = max(1, stats["items"])
+        stats["mean_batch_size"] = stats["items"] / batches
+        stats["mean_queue_wait"] = stats["queue_wait_total"] / items
+        stats["mean_inference_time"] = stats["inference_time_total"] / batches
+        return stats
+
+    # ---------------------------------------------------------------
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for bucket in self._buckets(batch):
+                self._run_bucket(bucket)
+
+    def _buckets(self, batch):
+        """Split a batch into runs of similar length so padding stays small."""
+        batch = sorted(batch, key=lambda entry: self.length_fn(entry[0]))
+        buckets = [[batch[0]]]
+        shortest = max(1, self.length_fn(batch[0][0]))
+        for entry in batch[1:]:
+            length = self.length_fn(entry[0])
+            if length > shortest * self.bucket_ratio:
+                buckets.append([entry])
+                shortest = max(1, length)
+            else:
+                buckets[-1].append(entry)
+        return buckets
+
+    def _run_bucket(self, bucket):
+        start = time.perf_counter()
+        queue_wait = sum(start - enqueued for _, _, enqueued in bucket)
+        try:
+            results = list(self.infer([item for item, _, _ in bucket]))
+            for (_, future, _), result in zip(bucket, results):
+                future.set_result(result)
+            if len(results) != len(bucket):
+                raise RuntimeError(f"model returned {len(results)} results for {len(bucket)} inputs")
+        except Exception as e:
+            for _, future, _ in bucket:
+                if not future.done():
+                    future.set_exception(e)
+        elapsed = time.perf_counter() - start
+
+        size = len(bucket)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += size
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], size)
+            self._stats["batch_sizes"][size] = self._stats["batch_sizes"].get(size, 0) + 1
+            self._stats["queue_wait_total"] += queue_wait
+            self._stats["inference_time_total"] += elapsed
+
+
+# -------------------------------
+# Per-model schedulers
+# -------------------------------
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def _pipeline_infer(task, model_id):
+    def infer(items):
+        classifier = model_registry.get_model(task, model_id)
+        return classifier(items, batch_size=len(items))
+    return infer
+
+
+def get_scheduler(task, model_id):
+    with _schedulers_lock:
+        key = (task, model_id)
+        if key not in _schedulers:
+            _schedulers[key] = BatchScheduler(_pipeline_infer(task, model_id))
+        return _schedulers[key]
+
+
+def classify(task, model_id, item):
+    """
+    Classify one input (file path or {"array", "sampling_rate"} dict) through the
+    shared scheduler for this model. Falls back to a direct call when batching is off.
+    """
+    if not BATCHING_ENABLED:
+        return model_registry.get_model(task, model_id)(item)
+    return get_scheduler(task, model_id).submit(item)
+
+
+def classify_many(task, model_id, items):
+    """Classify a list of inputs; they share forward passes with each other and with concurrent callers."""
+    if not items:
+        return []
+    if not BATCHING_ENABLED:
+        return model_registry.get_model(task, model_id)(items, batch_size=len(items))
+    return get_scheduler(task, model_id).submit_many(items)
+
+
+def scheduler_stats():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.items())
+    return [
+        {"task": task, "model_id": model_id, **scheduler.stats()}
+        for (task, model_id), scheduler in schedulers
+    ]
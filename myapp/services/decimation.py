@@ -0,0 +1,80 @@
+"""
+Level-of-detail decimation for plotting.
+
+Both methods work on channel-first arrays ``(n_channels, n_samples)`` and
+return sample indices (relative to the input) plus the selected values, so
+the caller can convert indices to time with its own offset and sampling rate.
+"""
+import numpy as np
+
+
+def minmax_decimate(x, width):
+    """
+    Keep the min and max of every bucket (``width`` buckets, two points each)
+    in the order they occur. Visually lossless for a plot ``width`` pixels wide.
+    Returns (indices, values) with shapes ``(2 * n_buckets,)`` and
+    ``(n_channels, 2 * n_buckets)``; the indices are shared by all channels.
+    """
+    n_channels, n = x.shape
+    if n <= 2 * width:
+        return np.arange(n), x
+
+    bucket = int(np.ceil(n / width))
+    n_buckets = int(np.ceil(n / bucket))
+    padded = np.empty((n_channels, n_buckets * bucket), dtype=x.dtype)
+    padded[:, :n] = x
+    padded[:, n:] = x[:, -1:]
+    blocks = padded.reshape(n_channels, n_buckets, bucket)
+
+    imin = blocks.argmin(axis=2)
+    imax = blocks.argmax(axis=2)
+    vmin = np.take_along_axis(blocks, imin[..., None], axis=2)[..., 0]
+    vmax = np.take_along_axis(blocks, imax[..., None], axis=2)[..., 0]
+    min_first = imin <= imax
+    values = np.empty((n_channels, n_buckets, 2), dtype=x.dtype)
+    values[..., 0] = np.where(min_first, vmin, vmax)
+    values[..., 1] = np.where(min_first, vmax, vmin)
+
+    starts = np.arange(n_buckets) * bucket
+    indices = np.stack([starts, np.minimum(starts + bucket // 2, n - 1)], axis=1).reshape(-1)
+    return indices, values.reshape(n_channels, -1)
+
+
+def lttb_indices(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets selection, vectorised across channels.
+    Returns an int array ``(n_channels, threshold)`` of sample indices.
+    """
+    n_channels, n = y.shape
+    if threshold >= n or threshold < 3:
+        return np.broadcast_to(np.arange(n), (n_channels, n))
+
+    rows = np.arange(n_channels)
+    out = np.empty((n_channels, threshold), dtype=np.int64)
+    out[:, 0] = 0
+    out[:, -1] = n - 1
+    every = (n - 2) / (threshold - 2)
+    a = np.zeros(n_channels, dtype=np.int64)
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = (avg_start + avg_end - 1) / 2.0
+        avg_y = y[:, avg_start:avg_end].mean(axis=1)
+
+        start = int(np.floor(i * every)) + 1
+        stop = int(np.floor((i + 1) * every)) + 1
+        xs = np.arange(start, stop)
+        ax = a[:, None]
+        ay = y[rows, a][:, None]
+        area = np.abs((ax - avg_x) * (y[:, start:stop] - ay) - (ax - xs) * (avg_y[:, None] - ay))
+        a = start + area.argmax(axis=1)
+        out[:, i + 1] = a
+    return out
+
+
+def lttb_decimate(y, threshold):
+    """LTTB decimation returning (indices, values), both ``(n_channels, threshold)``."""
+    indices = lttb_indices(y, threshold)
+    return indices, np.take_along_axis(y, indices, axis=1)
@@ -0,0 +1,210 @@
+"""
+Multi-source Doppler scene synthesis.
+
+A scene is a list of sources (frequency, velocity, trajectory, distance)
+around a listener at the origin. All sources are evaluated together as
+(n_sources, n_samples) arrays, one block of samples at a time, so audio can
+be streamed as WAV without holding the clip. Time and phase are kept in
+float64 (float32 cannot resolve 1/fs over long clips); amplitudes, panning
+and the mix are float32.
+
+Plot series are evaluated analytically at a fixed number of points, so their
+cost and size do not depend on the duration.
+"""
+import base64
+import json
+import struct
+
+import numpy as np
+from django.conf import settings
+
+
+V_SOUND = 343.0  # speed of sound (m/s)
+BLOCK_SIZE = getattr(settings, "AUDIO_BLOCK_SIZE", 65536)
+MAX_SOURCES = getattr(settings, "DOPPLER_MAX_SOURCES", 16)
+MAX_DURATION = getattr(settings, "DOPPLER_MAX_DURATION", 600)
+MAX_FS = 192000
+MAX_POINTS = 10000
+TRAJECTORIES = ("linear", "circular")
+
+
+# -------------------------------
+# Scene description
+# -------------------------------
+def parse_scene(data):
+    """
+    Validated, normalised scene dict from request data. Accepts either
+    ``sources`` (list of dicts) or the single-source ``frequency``/``velocity``
+    form. Raises ValueError on bad input.
+    """
+    duration = float(data.get("duration"))
+    fs = int(data.get("fs", 8000))
+    if not 0 < duration <= MAX_DURATION:
+        raise ValueError(f"duration must be in (0, {MAX_DURATION}] s")
+    if not 1 <= fs <= MAX_FS:
+        raise ValueError(f"fs must be in [1, {MAX_FS}] Hz")
+
+    raw_sources = data.get("sources")
+    if raw_sources is None:
+        raw_sources = [{"frequency": data.get("frequency"), "velocity": data.get("velocity")}]
+    if not 1 <= len(raw_sources) <= MAX_SOURCES:
+        raise ValueError(f"a scene needs 1-{MAX_SOURCES} sources")
+
+    sources = []
+    for src in raw_sources:
+        trajectory = src.get("trajectory", "linear")
+        if trajectory not in TRAJECTORIES:
+            raise ValueError(f"trajectory must be one of {', '.join(TRAJECTORIES)}")
+        source = {
+            "frequency": float(src.get("frequency")),
+            "velocity": float(src.get("velocity")),
+            "distance": float(src.get("distance", 5.0)),
+            "trajectory": trajectory,
+            # linear: time of closest approach; circular: orbit radius
+            "t_closest": float(src.get("t_closest", duration / 2.0)),
+            "radius": float(src.get("radius", float(src.get("distance", 5.0)) / 2.0)),
+            "level": float(src.get("level", 1.0)),
+        }
+        if abs(source["velocity"]) >= V_SOUND:
+            raise ValueError("source velocity must be below the speed of sound")
+        if source["distance"] <= 0 or source["level"] < 0:
+            raise ValueError("distance must be positive and level non-negative")
+        if trajectory == "circular" and not 0 < source["radius"] < source["distance"]:
+            raise ValueError("circular radius must be positive and smaller than distance")
+        sources.append(source)
+    return {"duration": duration, "fs": fs, "sources": sources}
+
+
+def scene_token(scene):
+    """URL-safe token carrying the whole scene, so audio can be fetched with a plain GET."""
+    raw = json.dumps(scene, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def scene_from_token(token):
+    padded = token + "=" * (-len(token) % 4)
+    return parse_scene(json.loads(base64.urlsafe_b64decode(padded.encode("ascii"))))
+
+
+# -------------------------------
+# Vectorised geometry
+# -------------------------------
+class _Params:
+    """Per-source parameters as (n_sources, 1) columns for broadcasting against time."""
+
+    def __init__(self, scene):
+        sources = scene["sources"]
+        col = lambda key: np.array([s[key] for s in sources], dtype=np.float64)[:, None]
+        self.f = col("frequency")
+        self.v = col("velocity")
+        self.d = col("distance")
+        self.t0 = col("t_closest")
+        self.radius = col("radius")
+        self.circular = np.array([s["trajectory"] == "circular" for s in sources])[:, None]
+        self.omega = self.v / self.radius
+
+        # Closest distance over the clip, so each source peaks at its own level
+        t_near = np.clip(self.t0, 0.0, scene["duration"])
+        linear_min = np.hypot(self.v * (t_near - self.t0), self.d)
+        self.r_min = np.where(self.circular, self.d - self.radius, linear_min)
+
+        levels = col("level")
+        total = levels.sum()
+        self.gain = (levels / total if total > 0 else levels).astype(np.float32)
+
+
+def _geometry(p, t):
+    """Distance, lateral position and radial (approaching) speed, each (n_sources, len(t))."""
+    # linear pass-by: x = v (t - t0), y = d
+    lx = p.v * (t - p.t0)
+    # circular orbit of centre (0, d): x = R cos(wt), y = d + R sin(wt)
+    wt = p.omega * t
+    cx, cy = p.radius * np.cos(wt), p.d + p.radius * np.sin(wt)
+    cvx, cvy = -p.v * np.sin(wt), p.v * np.cos(wt)
+
+    x = np.where(p.circular, cx, lx)
+    y = np.where(p.circular, cy, p.d)
+    vx = np.where(p.circular, cvx, p.v)
+    vy = np.where(p.circular, cvy, 0.0)
+    r = np.hypot(x, y)
+    v_rad = -(x * vx + y * vy) / r
+    return r, x, v_rad
+
+
+def observed_frequency(p, v_rad):
+    return p.f * V_SOUND / (V_SOUND - v_rad)
+
+
+def _amplitude(p, r):
+    """Inverse-square amplitude, 1 at each source's closest point, times its mix gain."""
+    return ((p.r_min / r) ** 2).astype(np.float32) * p.gain
+
+
+# -------------------------------
+# Audio
+# -------------------------------
+def n_frames(scene):
+    return int(scene["duration"] * scene["fs"])
+
+
+def synthesise_blocks(scene, block_size=BLOCK_SIZE):
+    """Yield (n, 2) float32 stereo blocks of the mixed scene."""
+    p = _Params(scene)
+    fs = scene["fs"]
+    total = n_frames(scene)
+    phase = np.zeros((len(scene["sources"]), 1))
+    for start in range(0, total, block_size):
+        t = np.arange(start, min(start + block_size, total), dtype=np.float64) / fs
+        r, x, v_rad = _geometry(p, t)
+        phi = phase + 2 * np.pi * np.cumsum(observed_frequency(p, v_rad), axis=1) / fs
+        phase = phi[:, -1:] % (2 * np.pi)
+
+        signal = np.sin(phi).astype(np.float32) * _amplitude(p, r)
+        pan = (x / r).astype(np.float32)
+        left = (signal * np.sqrt(0.5 * (1 - pan))).sum(axis=0)
+        right = (signal * np.sqrt(0.5 * (1 + pan))).sum(axis=0)
+        yield np.column_stack((left, right))
+
+
+def wav_header(fs, frames, channels=2, sample_width=2):
+    """44-byte PCM WAV header for a stream of known length."""
+    data_size = frames * channels * sample_width
+    return b"".join([
+        b"RIFF", struct.pack("<I", 36 + data_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, fs,
+                             fs * channels * sample_width, channels * sample_width, 8 * sample_width),
+        b"data", struct.pack("<I", data_size),
+    ])
+
+
+def wav_stream(scene, block_size=BLOCK_SIZE):
+    """Yield a 16-bit stereo WAV of the scene: header first, then one chunk per block."""
+    yield wav_header(scene["fs"], n_frames(scene))
+    for block in synthesise_blocks(scene, block_size):
+        yield np.int16(np.clip(block, -1.0, 1.0) * 32767).tobytes()
+
+
+# -------------------------------
+# Plot series
+# -------------------------------
+def plot_series(scene, points=2000):
+    """
+    Analytic series at ``points`` instants: observed frequency per source and
+    the amplitude envelope of the mono mix, plus frequency stats.
+    """
+    points = int(min(max(points, 2), MAX_POINTS, max(n_frames(scene), 2)))
+    p = _Params(scene)
+    t = np.linspace(0.0, scene["duration"], points, endpoint=False)
+    r, _, v_rad = _geometry(p, t)
+    f_o = observed_frequency(p, v_rad)
+    envelope = _amplitude(p, r).sum(axis=0)
+
+    max_freq, min_freq = float(f_o.max()), float(f_o.min())
+    return {
+        "time": t.round(6).tolist(),
+        "envelope": envelope.round(5).tolist(),
+        "frequency": f_o.round(3).tolist(),
+        "max_frequency": max_freq,
+        "min_frequency": min_freq,
+        "shift_ratio": max_freq / min_freq if min_freq != 0 else float("inf"),
+    }
@@ -0,0 +1,146 @@
+"""
+Sliding-window drone detection over long recordings.
+
+The upload is decoded block by block (``AudioStream``), resampled to the
+classifier rate and cut into overlapping windows of ``DRONE_WINDOW_SECS``
+every ``DRONE_HOP_SECS``. A vectorised gate skips near-silent windows: a
+window is classified only if its RMS level reaches ``DRONE_GATE_DB`` (dBFS),
+or if its strongest frame-to-frame spectral flux reaches ``DRONE_FLUX_GATE_DB``
+(a short onset in an otherwise quiet window). Windows that pass are classified
+``DRONE_BATCH_SIZE`` at a time and events are yielded in timeline order as
+soon as their batch is done, so memory is bounded by one decode block plus one
+batch of windows whatever the recording length.
+
+Events (one dict per NDJSON line):
+
+- ``{"type": "meta", "sample_rate", "duration", "window", "hop"}``;
+- ``{"type": "window", "index", "start", "end", "rms_db", "flux_db", "gated",
+  "label", "confidence"}`` (label and confidence are None for gated windows);
+- ``{"type": "summary", "windows", "classified", "gated", "labels", "top"}``.
+"""
+import numpy as np
+from django.conf import settings
+from numpy.lib.stride_tricks import sliding_window_view
+
+from myapp.services import inference_worker
+from myapp.services.audio_stream import AudioStream
+from myapp.services.metrics import stage
+
+
+WINDOW_SECS = getattr(settings, "DRONE_WINDOW_SECS", 1.0)
+HOP_SECS = getattr(settings, "DRONE_HOP_SECS", 0.5)
+GATE_DB = getattr(settings, "DRONE_GATE_DB", -45.0)
+FLUX_GATE_DB = getattr(settings, "DRONE_FLUX_GATE_DB", -40.0)
+BATCH_SIZE = getattr(settings, "DRONE_BATCH_SIZE", 16)
+SAMPLE_RATE = inference_worker.CLASSIFIER_SR
+FLUX_FRAME = 512  # samples per spectral frame of the flux gate
+FLOOR = 1e-10
+
+
+def _db(x):
+    return 20 * np.log10(np.maximum(x, FLOOR))
+
+
+def gate(windows):
+    """(rms_db, flux_db, passed) for a ``(n_windows, window_len)`` float32 array."""
+    rms_db = _db(np.sqrt(np.mean(np.square(windows, dtype=np.float32), axis=1)))
+
+    n_frames = windows.shape[1] // FLUX_FRAME
+    if n_frames < 2:
+        flux_db = np.full(len(windows), _db(0.0), dtype=np.float32)
+    else:
+        frames = windows[:, :n_frames * FLUX_FRAME].reshape(len(windows), n_frames, FLUX_FRAME)
+        magnitude = np.abs(np.fft.rfft(frames, axis=2)) * (2.0 / FLUX_FRAME)  # amplitude per bin
+        rise = np.maximum(np.diff(magnitude, axis=1), 0)
+        flux_db = _db(np.sqrt(np.sum(rise ** 2, axis=2)).max(axis=1))
+
+    passed = (rms_db >= GATE_DB) | (flux_db >= FLUX_GATE_DB)
+    return rms_db, flux_db, passed
+
+
+def _windows(stream, window, hop):
+    """(start sample, window view) pairs over a resampled stream, plus a final end-aligned window."""
+    from myapp.services.resampling import ResamplerChain
+
+    chain = ResamplerChain([stream.samplerate, SAMPLE_RATE])
+    buffered = np.zeros(0, dtype=np.float32)
+    offset = 0  # absolute sample index of buffered[0]
+    next_start = 0
+    for block in _with_flush(stream, chain):
+        buffered = np.concatenate([buffered, block])
+        if len(buffered) < window + next_start - offset:
+            continue
+        views = sliding_window_view(buffered, window)[next_start - offset::hop]
+        yield next_start, views
+        next_start += len(views) * hop
+        keep = next_start - hop  # the last full window stays buffered for the end-aligned tail
+        buffered = buffered[keep - offset:]
+        offset = keep
+
+    total = offset + len(buffered)
+    covered = next_start - hop + window if next_start else 0
+    if total > covered:
+        # Tail not reached by a full window (or a recording shorter than one): end-aligned, zero-padded
+        start = max(0, total - window)
+        tail = buffered[max(0, start - offset):]
+        yield start, np.pad(tail, (0, window - len(tail)))[None, :]
+
+
+def _with_flush(stream, chain):
+    for block in stream:
+        yield chain.process(block)
+    yield chain.flush()
+
+
+def detect(audio_file, model_id):
+    """Yield the timeline events of ``audio_file`` (see the module docstring)."""
+    window = int(round(WINDOW_SECS * SAMPLE_RATE))
+    hop = max(1, int(round(HOP_SECS * SAMPLE_RATE)))
+    counts = {"windows": 0, "classified": 0, "gated": 0}
+    labels = {}
+
+    with AudioStream(audio_file) as stream:
+        duration = stream.frames / stream.samplerate if stream.samplerate else 0.0
+        yield {"type": "meta", "sample_rate": stream.samplerate, "duration": round(duration, 3),
+               "window": WINDOW_SECS, "hop": HOP_SECS}
+
+        pending = []  # events in timeline order, waiting for their batch
+        batch = []  # (event, samples) of windows that passed the gate
+
+        def flush():
+            if batch:
+                items = [{"array": samples, "sampling_rate": SAMPLE_RATE} for _, samples in batch]
+                with stage("inference"):
+                    results = inference_worker.classify_many("audio-classification", model_id, items)
+                for (event, _), predictions in zip(batch, results):
+                    top = predictions[0]
+                    event.update(label=top["label"], confidence=round(float(top["score"]), 4))
+                    labels[top["label"]] = labels.get(top["label"], 0) + 1
+                batch.clear()
+            yield from pending
+            pending.clear()
+
+        for start, views in _windows(stream, window, hop):
+            with stage("gate"):
+                rms_db, flux_db, passed = gate(views)
+            for i in range(len(views)):
+                begin = (start + i * hop) / SAMPLE_RATE
+                event = {"type": "window", "index": counts["windows"], "start": round(begin, 3),
+                         "end": round(begin + window / SAMPLE_RATE, 3), "rms_db": round(float(rms_db[i]), 1),
+                         "flux_db": round(float(flux_db[i]), 1), "gated": not passed[i],
+                         "label": None, "confidence": None}
+                counts["windows"] += 1
+                pending.append(event)
+                if passed[i]:
+                    counts["classified"] += 1
+                    batch.append((event, np.array(views[i])))  # copied: a view would pin the whole block
+                    if len(batch) >= BATCH_SIZE:
+                        yield from flush()
+                else:
+                    counts["gated"] += 1
+            if not batch:
+                yield from flush()  # nothing waiting for the model: send gated windows right away
+        yield from flush()
+
+    top = max(labels, key=labels.get) if labels else None
+    yield {"type": "summary", **counts, "labels": labels, "top": top}
@@ -0,0 +1,108 @@
+"""
+Windowed access to cached EEG/ECG recordings.
+
+EEGLAB entries are opened once with ``preload=False`` and read with
+``raw.get_data(start=, stop=, picks=)``; WFDB entries (``format="wfdb"``)
+go through ``wfdb_reader``. Either way server memory is
+bounded by the requested window rather than by the recording length.
+
+A ``.set`` uploaded without its ``.fdt`` holds the samples inside the MATLAB
+file, which MNE may load whole (``raw.preload``) whatever ``preload`` asks for.
+Such raws count their bytes against ``EEG_OPEN_MAX_BYTES`` in the open-recording
+LRU, and one larger than the whole budget serves its request without being kept.
+"""
+import glob
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from myapp.services import wfdb_reader
+
+
+MAX_OPEN = 4  # lazily opened recordings kept per worker
+MAX_OPEN_BYTES = getattr(settings, "EEG_OPEN_MAX_BYTES", 512 * 1024 ** 2)  # preloaded samples kept open
+
+_open = OrderedDict()  # signal_id -> (raw, lock)
+_sizes = {}  # signal_id -> bytes of preloaded samples (0 when read lazily)
+_lock = threading.Lock()
+
+
+def open_raw(entry):
+    """mne Raw for a source-only entry (kept open in a small LRU, see the module docstring)."""
+    signal_id = entry["signal_id"]
+    with _lock:
+        if signal_id in _open:
+            _open.move_to_end(signal_id)
+            return _open[signal_id]
+
+    set_files = glob.glob(os.path.join(entry["source_dir"], "*.set"))
+    if not set_files:
+        raise FileNotFoundError("No .set file in cached recording")
+    import mne  # imported on first EEG read, not when the signal views load
+    raw = mne.io.read_raw_eeglab(set_files[0], preload=False, verbose="ERROR")
+    size = raw._data.nbytes if raw.preload else 0
+    if size > MAX_OPEN_BYTES:
+        print(f"⚠ {signal_id}: .set without .fdt preloads {size / 1024 ** 2:.0f} MB; not kept open")
+        return raw, threading.Lock()
+
+    with _lock:
+        if signal_id not in _open:
+            _sizes[signal_id] = size
+        handle = _open.setdefault(signal_id, (raw, threading.Lock()))
+        evicted = []
+        while len(_open) > MAX_OPEN or (len(_open) > 1 and sum(_sizes.values()) > MAX_OPEN_BYTES):
+            old_id, old_handle = _open.popitem(last=False)
+            del _sizes[old_id]
+            evicted.append(old_handle)
+    for old_raw, old_lock in evicted:
+        with old_lock:  # a read in progress finishes first
+            old_raw.close()
+    return handle
+
+
+def describe(entry):
+    """Channels, sampling rate and length of a source-only recording, without reading samples."""
+    if entry.get("format") == "wfdb":
+        return wfdb_reader.describe(entry)
+    raw, _ = open_raw(entry)
+    fs = float(raw.info.get("sfreq", 0) or 0)
+    return {
+        "channels": list(raw.ch_names),
+        "fs": int(fs) if fs.is_integer() else fs,  # e.g. 256.41 Hz must not become 256
+        "n_samples": int(raw.n_times),
+    }
+
+
+def n_samples(entry):
+    return int(entry["n_samples"])
+
+
+def supports_digital(entry):
+    """True when the recording can be read as int16 digital samples (integer WFDB records)."""
+    return entry.get("format") == "wfdb" and wfdb_reader.supports_digital(entry)
+
+
+def read_digital(entry, start, stop, picks=None):
+    """``(int16 samples, gain, baseline, invalid)`` of ``[start, stop)``; see wfdb_reader.read_digital."""
+    start = max(0, int(start))
+    stop = max(start, min(int(stop), n_samples(entry)))
+    return wfdb_reader.read_digital(entry, start, stop, picks)
+
+
+def read_window(entry, start, stop, picks=None):
+    """Samples ``[start, stop)`` of channels ``picks`` as float32 ``(n_picks, n)``."""
+    start = max(0, int(start))
+    stop = max(start, min(int(stop), n_samples(entry)))
+    if entry.get("format") == "wfdb":
+        return wfdb_reader.read_window(entry, start, stop, picks)
+
+    raw, raw_lock = open_raw(entry)
+    if stop == start:  # MNE raises "No data in this range" for empty segments
+        rows = len(raw.ch_names) if picks is None else len(picks)
+        return np.zeros((rows, 0), dtype=np.float32)
+    with raw_lock:
+        data = raw.get_data(start=start, stop=stop, picks=picks)
+    return data.astype(np.float32)
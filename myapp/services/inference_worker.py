@@ -0,0 +1,274 @@
+"""
+Out-of-process inference service.
+
+One worker process (``python manage.py inference_worker``) owns the models
+through the model registry and serves classification and anti-aliasing
+reconstruction to the web workers over a Unix socket. Audio is never pickled:
+the client copies it into a ``multiprocessing.shared_memory`` float32 buffer
+and sends only its name and length; reconstruction writes its output back
+into the same buffer. Requests from all web workers share the worker's
+batching schedulers, so concurrent uploads still run in one forward pass.
+
+With ``INFERENCE_WORKER_ENABLED`` off (the default) ``classify``,
+``classify_many`` and ``reconstruct`` run in-process exactly as before.
+"""
+import os
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing import connection, resource_tracker, shared_memory
+
+import numpy as np
+from django.conf import settings
+
+from myapp.services import batching, model_registry, reconstruction
+
+
+ENABLED = getattr(settings, "INFERENCE_WORKER_ENABLED", False)
+ADDRESS = str(getattr(settings, "INFERENCE_WORKER_SOCKET", os.path.join(tempfile.gettempdir(), "signalvista-inference.sock")))
+AUTHKEY = getattr(settings, "INFERENCE_WORKER_AUTHKEY", settings.SECRET_KEY).encode("utf-8")
+TIMEOUT = getattr(settings, "INFERENCE_WORKER_TIMEOUT", 120)  # seconds to wait for one reply
+FALLBACK = getattr(settings, "INFERENCE_WORKER_FALLBACK", True)  # run in-process if the worker is down
+CLASSIFIER_SR = 16000  # file inputs are decoded to this rate before they are shipped
+
+
+class InferenceUnavailable(ConnectionError):
+    """The inference worker could not be reached."""
+
+
+class InferenceError(RuntimeError):
+    """The inference worker ran the request and it failed."""
+
+
+# -------------------------------
+# In-process implementations (also what the worker runs)
+# -------------------------------
+def _local_classify(task, model_id, item):
+    return batching.classify(task, model_id, item)
+
+
+def _local_classify_many(task, model_id, items):
+    return batching.classify_many(task, model_id, items)
+
+
+def _local_reconstruct(model_id, y, frame_len, max_batch, overlap):
+    model = model_registry.get_model("keras", model_id)
+    return reconstruction.reconstruct(model, y, frame_len=frame_len, max_batch=max_batch, overlap=overlap)
+
+
+# -------------------------------
+# Shared-memory buffers
+# -------------------------------
+def _attach(name):
+    """Attach to a buffer created by the client; the client stays responsible for unlinking it."""
+    shm = shared_memory.SharedMemory(name=name)
+    # Python < 3.13 registers attached segments too and would unlink them when the worker exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class _Buffer:
+    """Client-side float32 shared-memory buffer holding one request's audio."""
+
+    def __init__(self, y):
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        self.length = len(y)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, y.nbytes))
+        self.array = np.ndarray((self.length,), dtype=np.float32, buffer=self.shm.buf)
+        self.array[:] = y
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+# -------------------------------
+# Client
+# -------------------------------
+_local = threading.local()  # one persistent connection per web thread
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        try:
+            conn = connection.Client(ADDRESS, family="AF_UNIX", authkey=AUTHKEY)
+        except (OSError, EOFError) as e:
+            raise InferenceUnavailable(f"inference worker not reachable at {ADDRESS}: {e}") from e
+        _local.conn = conn
+    return conn
+
+
+def _drop_connection():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        conn.close()
+
+
+def _call(request):
+    """Send one request and return the worker's result; reconnects once on a stale connection."""
+    for attempt in range(2):
+        conn = _connection()
+        try:
+            conn.send(request)
+            if not conn.poll(TIMEOUT):
+                _drop_connection()  # a late reply must not be read as the next request's
+                raise InferenceError(f"inference worker did not reply within {TIMEOUT}s")
+            ok, payload = conn.recv()
+            break
+        except (OSError, EOFError) as e:
+            _drop_connection()
+            if attempt:
+                raise InferenceUnavailable(f"inference worker connection lost: {e}") from e
+    if not ok:
+        raise InferenceError(payload)
+    return payload
+
+
+def _remote_classify(task, model_id, item):
+    if isinstance(item, dict):
+        y, sr = item["array"], item["sampling_rate"]
+    else:
+        from myapp.services.audio_stream import decode_resampled
+        with open(item, "rb") as f:
+            y, _ = decode_resampled(f, CLASSIFIER_SR)
+        sr = CLASSIFIER_SR
+    with _Buffer(y) as buffer:
+        return _call({"op": "classify", "task": task, "model_id": model_id,
+                      "shm": buffer.shm.name, "length": buffer.length, "sampling_rate": sr})
+
+
+def _remote_classify_many(task, model_id, items):
+    if not items:
+        return []
+    # Equal-length windows at one rate: shipped as a single (count, length) buffer
+    sr = items[0]["sampling_rate"]
+    frames = np.stack([np.asarray(item["array"], dtype=np.float32) for item in items])
+    with _Buffer(frames.ravel()) as buffer:
+        return _call({"op": "classify_many", "task": task, "model_id": model_id, "shm": buffer.shm.name,
+                      "length": buffer.length, "count": len(items), "sampling_rate": sr})
+
+
+def _remote_reconstruct(model_id, y, frame_len, max_batch, overlap):
+    with _Buffer(y) as buffer:
+        _call({"op": "reconstruct", "model_id": model_id, "shm": buffer.shm.name, "length": buffer.length,
+               "frame_len": frame_len, "max_batch": max_batch, "overlap": overlap})
+        return buffer.array.copy()  # the worker wrote the output in place
+
+
+def _dispatch(remote, local, *args):
+    if not ENABLED:
+        return local(*args)
+    try:
+        return remote(*args)
+    except InferenceUnavailable as e:
+        if not FALLBACK:
+            raise
+        print(f"⚠ {e}; running in-process")
+        return local(*args)
+
+
+def classify(task, model_id, item):
+    """
+    Classify one input (file path or {"array", "sampling_rate"} dict) in the
+    inference worker when enabled, otherwise through the local batching scheduler.
+    """
+    return _dispatch(_remote_classify, _local_classify, task, model_id, item)
+
+
+def classify_many(task, model_id, items):
+    """
+    Classify equal-length {"array", "sampling_rate"} inputs (one rate) as a
+    batch, in the inference worker when enabled; one result list per input.
+    """
+    return _dispatch(_remote_classify_many, _local_classify_many, task, model_id, items)
+
+
+def reconstruct(model_id, y, frame_len=48000, max_batch=16, overlap=0):
+    """Anti-aliasing reconstruction of ``y`` with the Keras model ``model_id`` (float32, same length)."""
+    return _dispatch(_remote_reconstruct, _local_reconstruct, model_id, y, frame_len, max_batch, overlap)
+
+
+def ping():
+    """Round-trip time to the worker in seconds and its registry stats."""
+    start = time.perf_counter()
+    stats = _call({"op": "stats"})
+    return time.perf_counter() - start, stats
+
+
+# -------------------------------
+# Worker
+# -------------------------------
+def _handle(request):
+    op = request["op"]
+    if op == "stats":
+        return {"pid": os.getpid(), "registry": model_registry.registry_stats(),
+                "schedulers": batching.scheduler_stats()}
+
+    shm = _attach(request["shm"])
+    y = np.ndarray((request["length"],), dtype=np.float32, buffer=shm.buf)
+    try:
+        if op == "classify":
+            # Copied: the batching scheduler may keep a reference after the reply
+            item = {"array": y.copy(), "sampling_rate": request["sampling_rate"]}
+            return _local_classify(request["task"], request["model_id"], item)
+        if op == "classify_many":
+            frames = y.reshape(request["count"], -1)
+            items = [{"array": frame.copy(), "sampling_rate": request["sampling_rate"]} for frame in frames]
+            return _local_classify_many(request["task"], request["model_id"], items)
+        if op == "reconstruct":
+            y[:] = _local_reconstruct(request["model_id"], y, request["frame_len"],
+                                      request["max_batch"], request["overlap"])
+            return None
+        raise ValueError(f"unknown op: {op}")
+    finally:
+        del y  # no views may outlive the mapping
+        shm.close()
+
+
+def _serve_connection(conn):
+    """Answer requests from one client connection until it closes."""
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (OSError, EOFError):
+                return
+            try:
+                reply = (True, _handle(request))
+            except Exception as e:
+                reply = (False, f"{type(e).__name__}: {e}")
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def serve(address=ADDRESS):
+    """Run the worker: accept clients on ``address``, one thread per connection, forever."""
+    if os.path.exists(address):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(address)
+            raise RuntimeError(f"an inference worker is already listening on {address}")
+        except OSError:
+            os.unlink(address)  # stale socket from a previous run
+        finally:
+            probe.close()
+
+    model_registry.warm_up()
+    with connection.Listener(address, family="AF_UNIX", authkey=AUTHKEY) as listener:
+        print(f"✅ Inference worker {os.getpid()} listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError) as e:  # failed handshake, keep serving
+                print(f"⚠ Rejected inference client: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(conn,), daemon=True).start()
@@ -0,0 +1,340 @@
+"""
+Per-stage timing, request histograms and opt-in memory/CPU profiling.
+
+Views are wrapped in ``@instrumented`` and mark their stages with
+``with stage("decode"):`` (also usable as a decorator). A streamed body runs
+after its view has returned; wrapping it in ``bind_endpoint`` keeps the
+endpoint label on the stages it records. Durations feed
+histograms in an in-process registry that ``/metrics`` exposes in the
+Prometheus text format, together with the model registry, batching, offload
+and cache counters of the modules already loaded. Each response carries a
+``Server-Timing`` header with its stages. With ``METRICS_ENABLED`` off,
+``@instrumented`` returns the view unchanged and ``stage`` times nothing.
+
+Opt-in per request, via settings or (when ``METRICS_DEBUG_HEADERS`` is on)
+request headers:
+
+- ``METRICS_TRACEMALLOC`` / ``X-Debug-Memory: 1``: tracemalloc peak of the
+  request, recorded in a histogram and the ``X-Memory-Peak`` header. The peak
+  is process-wide, so concurrent requests are included;
+- ``METRICS_PROFILE_SAMPLE_RATE`` / ``X-Debug-Profile: 1``: cProfile of the
+  request dumped (pstats format) under ``METRICS_PROFILE_DIR``.
+"""
+import bisect
+import contextvars
+import cProfile
+import functools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTE_BUCKETS = tuple(2 ** p for p in range(16, 34, 2))  # 64 KiB .. 8 GiB
+
+ENABLED = getattr(settings, "METRICS_ENABLED", True)
+TRACEMALLOC = getattr(settings, "METRICS_TRACEMALLOC", False)
+PROFILE_SAMPLE_RATE = getattr(settings, "METRICS_PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_DIR = str(getattr(settings, "METRICS_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "signalvista_profiles")))
+DEBUG_HEADERS = getattr(settings, "METRICS_DEBUG_HEADERS", settings.DEBUG)
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per label set."""
+
+    def __init__(self, name, help_text, labels, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for label_values, counts in sorted(series.items()):
+            labels = list(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {counts[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(zip(self.labels, label_values))} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+REQUEST_SECONDS = Histogram("signalvista_request_seconds", "View latency in seconds.", ("endpoint",))
+STAGE_SECONDS = Histogram("signalvista_stage_seconds", "Time spent in a stage of a view.", ("endpoint", "stage"))
+REQUEST_PEAK_BYTES = Histogram("signalvista_request_tracemalloc_peak_bytes",
+                               "tracemalloc peak during a request (process-wide).", ("endpoint",), BYTE_BUCKETS)
+REQUESTS = Counter("signalvista_requests_total", "Requests by endpoint and status code.", ("endpoint", "status"))
+PROFILES = Counter("signalvista_profiles_total", "cProfile dumps written.", ("endpoint",))
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, REQUEST_PEAK_BYTES, REQUESTS, PROFILES]
+
+
+# -------------------------------
+# Stages and requests
+# -------------------------------
+class _Request:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.stages = []
+
+
+_current = contextvars.ContextVar("signalvista_request", default=None)
+
+
+@contextmanager
+def stage(name):
+    """Time a block (or, as a decorator, a function) as stage ``name`` of the current view."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        request = _current.get()
+        endpoint = request.endpoint if request is not None else "-"
+        STAGE_SECONDS.observe(elapsed, endpoint, name)
+        if request is not None:
+            request.stages.append((name, elapsed))
+
+
+def bind_endpoint(iterator):
+    """
+    ``iterator`` with the calling view's endpoint bound while each item is
+    produced, so stages run as a streamed response is consumed are not
+    recorded under "-". Call it inside the instrumented view.
+    """
+    request = _current.get()
+    if not ENABLED or request is None:
+        return iterator
+    return _bound(request.endpoint, iter(iterator))
+
+
+def _bound(endpoint, iterator):
+    try:
+        while True:
+            # A fresh state per item: the Server-Timing header has already been sent
+            token = _current.set(_Request(endpoint))
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _wants(request, header, default):
+    if DEBUG_HEADERS and request.headers.get(header) == "1":
+        return True
+    return default
+
+
+_trace_lock = threading.Lock()
+_tracing = 0  # requests currently traced; tracemalloc runs while > 0
+
+
+def _start_trace():
+    global _tracing
+    with _trace_lock:
+        if _tracing == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if _tracing == 0:
+            tracemalloc.reset_peak()
+        _tracing += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_trace(baseline):
+    global _tracing
+    with _trace_lock:
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        _tracing -= 1
+        if _tracing == 0:
+            tracemalloc.stop()
+    return max(0, peak)
+
+
+def _dump_profile(profiler, endpoint):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}.prof")
+    profiler.dump_stats(path)
+    PROFILES.inc(endpoint)
+    print(f"✅ Profile of {endpoint} written to {path}")
+    return path
+
+
+def instrumented(view):
+    """Time a view, collect its stages and apply the opt-in tracemalloc/cProfile hooks."""
+    if not ENABLED:
+        return view
+    endpoint = view.__name__
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _Request(endpoint)
+        token = _current.set(state)
+        trace = _wants(request, "X-Debug-Memory", TRACEMALLOC)
+        profile = _wants(request, "X-Debug-Profile", PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+        baseline = _start_trace() if trace else None
+        profiler = cProfile.Profile() if profile else None
+        start = time.perf_counter()
+        status = 500
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            REQUEST_SECONDS.observe(elapsed, endpoint)
+            REQUESTS.inc(endpoint, str(status))
+            peak = _stop_trace(baseline) if trace else None
+            if peak is not None:
+                REQUEST_PEAK_BYTES.observe(peak, endpoint)
+            profile_path = _dump_profile(profiler, endpoint) if profiler is not None else None
+
+        timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in state.stages]
+        response["Server-Timing"] = ", ".join(timings + [f"total;dur={elapsed * 1000:.1f}"])
+        if peak is not None:
+            response["X-Memory-Peak"] = str(peak)
+        if profile_path is not None and DEBUG_HEADERS:
+            response["X-Profile-File"] = os.path.basename(profile_path)
+        return response
+
+    return wrapper
+
+
+# -------------------------------
+# Exposition
+# -------------------------------
+def _gauge(name, help_text, samples, kind="gauge"):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(labels)} {float(value):g}" for labels, value in samples]
+    return lines
+
+
+def _loaded(module):
+    """A service module if something already imported it (``/metrics`` never loads features)."""
+    return sys.modules.get(f"myapp.services.{module}")
+
+
+def _service_metrics():
+    lines = []
+    registry = _loaded("model_registry")
+    if registry is not None:
+        stats = registry.registry_stats()
+        key = lambda s: [("task", s["task"]), ("model_id", s["model_id"]), ("device", s["device"])]
+        lines += _gauge("signalvista_model_resident", "1 if the model is loaded.",
+                        [(key(s), int(s["resident"])) for s in stats])
+        lines += _gauge("signalvista_model_size_bytes", "Estimated model size.", [(key(s), s["size_bytes"]) for s in stats])
+        lines += _gauge("signalvista_model_loads_total", "Model loads.", [(key(s), s["loads"]) for s in stats], "counter")
+        lines += _gauge("signalvista_model_hits_total", "Registry hits.", [(key(s), s["hits"]) for s in stats], "counter")
+        lines += _gauge("signalvista_model_load_seconds_total", "Time spent loading.",
+                        [(key(s), s["load_time"]) for s in stats], "counter")
+
+    batching = _loaded("batching")
+    if batching is not None:
+        stats = batching.scheduler_stats()
+        key = lambda s: [("task", s["task"]), ("model_id", s["model_id"])]
+        lines += _gauge("signalvista_batches_total", "Forward passes run by the scheduler.",
+                        [(key(s), s["batches"]) for s in stats], "counter")
+        lines += _gauge("signalvista_batched_items_total", "Items classified by the scheduler.",
+                        [(key(s), s["items"]) for s in stats], "counter")
+        lines += _gauge("signalvista_batch_queue_wait_seconds_total", "Time items waited for a batch.",
+                        [(key(s), s["queue_wait_total"]) for s in stats], "counter")
+        lines += _gauge("signalvista_batch_inference_seconds_total", "Time spent in batched forward passes.",
+                        [(key(s), s["inference_time_total"]) for s in stats], "counter")
+
+    offload = _loaded("offload")
+    if offload is not None:
+        stats = offload.gate_stats()
+        key = lambda s: [("endpoint", s["endpoint"])]
+        lines += _gauge("signalvista_offload_in_flight", "Admitted requests not yet finished.",
+                        [(key(s), s["in_flight"]) for s in stats])
+        lines += _gauge("signalvista_offload_capacity", "Concurrency plus queue of the endpoint.",
+                        [(key(s), s["capacity"]) for s in stats])
+        lines += _gauge("signalvista_offload_rejected_total", "Requests answered with 429.",
+                        [(key(s), s["rejected"]) for s in stats], "counter")
+
+    spectrum = _loaded("spectrum")
+    if spectrum is not None:
+        stats = spectrum.cache_stats()
+        lines += _gauge("signalvista_audio_cache_bytes", "Bytes held by the audio analysis cache.", [([], stats["bytes"])])
+        lines += _gauge("signalvista_audio_cache_entries", "Entries in the audio analysis cache.", [([], stats["entries"])])
+    return lines
+
+
+def expose():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.expose()
+    lines += _service_metrics()
+    return "\n".join(lines) + "\n"
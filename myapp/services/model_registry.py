@@ -0,0 +1,173 @@
+"""
+Process-wide model registry.
+
+Every view that needs a model (drone detector, gender classifier, anti-aliasing
+network) resolves it through ``get_model`` so each model is built once per
+worker instead of once per request.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+MEMORY_BUDGET_MB = getattr(settings, "MODEL_REGISTRY_MEMORY_BUDGET_MB", 4096)
+RETRY_SECS = getattr(settings, "MODEL_REGISTRY_RETRY_SECS", 30)  # first back-off after a failed load
+MAX_RETRY_SECS = getattr(settings, "MODEL_REGISTRY_MAX_RETRY_SECS", 600)
+
+_models = OrderedDict()      # key -> (model, size_bytes), least recently used first
+_stats = {}                  # key -> {"loads", "hits", "load_time", "size_bytes"}
+_registry_lock = threading.Lock()
+_key_locks = {}
+_failures = {}               # key -> (exception, retry_at, consecutive failures)
+
+
+# -------------------------------
+# Loaders
+# -------------------------------
+def default_device():
+    """Return the pipeline device index: first GPU if available, CPU (-1) otherwise."""
+    try:
+        import torch
+        return 0 if torch.cuda.is_available() else -1
+    except ImportError:
+        return -1
+
+
+def _load_hf_pipeline(task, model_id, device):
+    from transformers import pipeline
+    return pipeline(task, model=model_id, device=device)
+
+
+def _load_keras_model(task, model_id, device):
+    import tensorflow as tf
+    return tf.keras.models.load_model(model_id, compile=False)
+
+
+LOADERS = {
+    "audio-classification": _load_hf_pipeline,
+    "keras": _load_keras_model,
+}
+
+
+def _estimate_size(model):
+    """Rough parameter memory of a loaded model in bytes (0 when unknown)."""
+    try:
+        if hasattr(model, "count_params"):  # keras
+            return int(model.count_params()) * 4
+        torch_model = getattr(model, "model", None)  # transformers pipeline
+        if torch_model is not None:
+            return sum(p.numel() * p.element_size() for p in torch_model.parameters())
+    except Exception:
+        pass
+    return 0
+
+
+# -------------------------------
+# Registry API
+# -------------------------------
+def _evict_over_budget(keep_key):
+    budget = MEMORY_BUDGET_MB * 1024 * 1024
+    total = sum(size for _, size in _models.values())
+    for key in list(_models.keys()):
+        if total <= budget:
+            break
+        if key == keep_key:
+            continue
+        _, size = _models.pop(key)
+        total -= size
+        print(f"♻ Evicted model {key} ({size / 1e6:.1f} MB) from registry")
+
+
+def get_model(task, model_id, device=None):
+    """
+    Return the model for (task, model_id, device), loading it on first use.
+
+    Concurrent first calls for the same key wait for a single load instead of
+    each building their own copy. A failed load is re-raised without retrying
+    for RETRY_SECS, doubling after each further failure up to MAX_RETRY_SECS,
+    so a missing model is not rebuilt per request but a transient failure
+    (network, memory) recovers by itself.
+    """
+    if device is None:
+        device = default_device() if task != "keras" else -1
+    key = (task, model_id, device)
+
+    with _registry_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            _stats[key]["hits"] += 1
+            return _models[key][0]
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _registry_lock:
+            if key in _models:  # loaded by another thread while we waited
+                _models.move_to_end(key)
+                _stats[key]["hits"] += 1
+                return _models[key][0]
+
+        failure = _failures.get(key)
+        if failure is not None and time.monotonic() < failure[1]:
+            raise failure[0]
+
+        start = time.perf_counter()
+        try:
+            model = LOADERS[task](task, model_id, device)
+        except Exception as e:
+            attempts = failure[2] + 1 if failure is not None else 1
+            delay = min(MAX_RETRY_SECS, RETRY_SECS * 2 ** (attempts - 1))
+            _failures[key] = (e, time.monotonic() + delay, attempts)
+            print(f"⚠ Loading {task} model {model_id} failed ({e}); retrying after {delay:.0f}s")
+            raise
+        _failures.pop(key, None)
+        load_time = time.perf_counter() - start
+        size = _estimate_size(model)
+
+        with _registry_lock:
+            _models[key] = (model, size)
+            stats = _stats.setdefault(key, {"loads": 0, "hits": 0, "load_time": 0.0, "size_bytes": 0})
+            stats["loads"] += 1
+            stats["load_time"] += load_time
+            stats["size_bytes"] = size
+            _evict_over_budget(key)
+
+    print(f"✅ Loaded {task} model {model_id} in {load_time:.2f}s")
+    return model
+
+
+def warm_up(specs=None):
+    """
+    Load the models listed in ``settings.MODEL_REGISTRY_WARMUP`` (or ``specs``).
+    Each entry is a (task, model_id) tuple. Failures are reported, not raised.
+    """
+    if specs is None:
+        specs = getattr(settings, "MODEL_REGISTRY_WARMUP", [])
+    for task, model_id in specs:
+        try:
+            get_model(task, model_id)
+        except Exception as e:
+            print(f"⚠ Could not warm up {task} model {model_id}: {e}")
+
+
+def registry_stats():
+    """Snapshot of per-model load/hit counters and whether each is still resident."""
+    with _registry_lock:
+        return [
+            {
+                "task": key[0],
+                "model_id": key[1],
+                "device": key[2],
+                "resident": key in _models,
+                **stats,
+            }
+            for key, stats in _stats.items()
+        ]
+
+
+def clear():
+    """Drop every cached model and remembered failure (counters are kept)."""
+    with _registry_lock:
+        _models.clear()
+        _failures.clear()
@@ -0,0 +1,355 @@
+"""
+Bounded offloading for the async upload/processing views.
+
+A view decorated with ``@offloaded()`` becomes async: its blocking body
+(upload parsing, decode, FFT, inference, encoding) runs in a thread pool of
+its own, so one slow SAR or EEG request no longer holds up the event loop or
+the other endpoints. Each endpoint admits at most ``concurrency + queue``
+requests; beyond that it answers 429 with ``Retry-After``. Under ASGI,
+``asgi_guard`` applies the same check before the request body is read, so a
+rejected upload is never received.
+
+Django's ASGI handler spools the request body to a temporary file in chunks
+(in memory up to ``FILE_UPLOAD_MAX_MEMORY_SIZE``) and the upload is parsed
+in the pool thread, so the event loop never buffers or parses it.
+
+Streaming views hand their blocking generator to ``streamed``: under ASGI it
+runs in the endpoint's pool as one admitted job and its items are sent as
+they are produced (Django would otherwise collect a sync iterator in full
+before sending it). Under WSGI the server iterates it, and it holds an
+admitted slot until it is exhausted or closed.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+
+ENABLED = getattr(settings, "ASYNC_OFFLOAD_ENABLED", True)
+DEFAULT_CONCURRENCY = getattr(settings, "ASYNC_VIEW_CONCURRENCY", 4)
+DEFAULT_QUEUE = getattr(settings, "ASYNC_VIEW_QUEUE", 16)
+LIMITS = getattr(settings, "ASYNC_VIEW_LIMITS", {})  # view name -> (concurrency, queue)
+RETRY_AFTER = 2  # seconds, sent with 429
+STREAM_BUFFER = 64  # items a streamed job may produce ahead of the client
+
+
+class Overloaded(Exception):
+    """The endpoint already has ``concurrency + queue`` requests admitted."""
+
+
+class _ClientGone(Exception):
+    """The consumer of a streamed job stopped reading."""
+
+
+class Gate:
+    """Thread pool of ``concurrency`` workers that admits at most ``concurrency + queue`` jobs."""
+
+    def __init__(self, name, concurrency, queue):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.capacity = self.concurrency + max(0, int(queue))
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"offload-{name}")
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "completed": 0, "rejected": 0, "peak": 0}
+
+    def reject_if_full(self):
+        """True (and counted as rejected) when no more requests can be admitted."""
+        with self._lock:
+            if self._stats["admitted"] - self._stats["completed"] < self.capacity:
+                return False
+            self._stats["rejected"] += 1
+            return True
+
+    def _admit(self):
+        with self._lock:
+            in_flight = self._stats["admitted"] - self._stats["completed"]
+            if in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                return False
+            self._stats["admitted"] += 1
+            self._stats["peak"] = max(self._stats["peak"], in_flight + 1)
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._stats["completed"] += 1
+
+    def _job(self, fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()  # pool threads outlive requests; do not keep stale DB connections
+            self._release()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` in the pool and await its result; raises Overloaded when the endpoint is full."""
+        if not self._admit():
+            raise Overloaded(self.name)
+        loop = asyncio.get_running_loop()
+        # A slot is freed when the job finishes, not when the client goes away
+        return await loop.run_in_executor(self.executor, self._job, fn, args, kwargs)
+
+    def stream(self, iterator, buffered=STREAM_BUFFER):
+        """
+        Admit a blocking ``iterator`` as one job and return an async iterator
+        over its items, produced in the pool at most ``buffered`` ahead of the
+        consumer. Raises Overloaded when the endpoint is full.
+        """
+        if not self._admit():
+            raise Overloaded(self.name)
+        return _Stream(self, iterator, buffered)
+
+    def hold(self, iterator):
+        """
+        Admit a blocking ``iterator`` consumed by the caller (WSGI) and return
+        it wrapped so the slot is held until it is exhausted or closed.
+        Raises Overloaded when the endpoint is full.
+        """
+        iterator = iter(iterator)
+        if not self._admit():
+            raise Overloaded(self.name)
+        return _Held(self, iterator)
+
+    async def _stream(self, iterator, buffered, gone):
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue(buffered)
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(items.put(item), loop)
+            while not gone.is_set():
+                try:
+                    return future.result(timeout=0.5)
+                except FutureTimeout:
+                    continue
+            future.cancel()
+            raise _ClientGone()
+
+        def pump():
+            try:
+                try:
+                    for item in iterator:
+                        put((True, item))
+                except _ClientGone:
+                    raise
+                except Exception as e:
+                    put((False, e))
+                    return
+                put((False, None))
+            except _ClientGone:
+                pass
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        loop.run_in_executor(self.executor, self._job, pump, (), {})
+        try:
+            while True:
+                more, item = await items.get()
+                if not more:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            gone.set()  # the job stops at its next item and frees its slot
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(endpoint=self.name, concurrency=self.concurrency, capacity=self.capacity,
+                     in_flight=stats["admitted"] - stats["completed"])
+        return stats
+
+
+class _Stream:
+    """
+    Async iterator over an admitted streamed job. The pump starts on the first
+    item; a stream closed (``close``/``aclose``, or garbage-collected) before
+    that releases its slot itself, e.g. when the client disconnects before the
+    response body is iterated.
+    """
+
+    def __init__(self, gate, iterator, buffered):
+        self._gate = gate
+        self._iterator = iterator
+        self._buffered = buffered
+        self._gone = threading.Event()
+        self._lock = threading.Lock()
+        self._items = None  # Gate._stream generator once started
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        with self._lock:
+            if self._items is None:
+                if self._closed:
+                    raise StopAsyncIteration
+                self._items = self._gate._stream(self._iterator, self._buffered, self._gone)
+        return await self._items.__anext__()
+
+    def close(self):
+        """Release the slot of a job that never started, or make a running one stop."""
+        with self._lock:
+            release = self._items is None and not self._closed
+            self._closed = True
+        self._gone.set()
+        if release:
+            self._gate._release()
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+
+    async def aclose(self):
+        self.close()
+        if self._items is not None:
+            await self._items.aclose()
+
+    def __del__(self):
+        self.close()
+
+
+class _Held:
+    """
+    Sync iterator holding a gate slot for its lifetime. WSGI servers close the
+    response (and with it this iterator) when the client disconnects, so the
+    slot is freed even if iteration never started.
+    """
+
+    def __init__(self, gate, iterator):
+        self._gate = gate
+        self._iterator = iterator
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._gate._release()
+
+    def __del__(self):
+        self.close()
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def gate(name):
+    with _gates_lock:
+        if name not in _gates:
+            concurrency, queue = LIMITS.get(name, (DEFAULT_CONCURRENCY, DEFAULT_QUEUE))
+            _gates[name] = Gate(name, concurrency, queue)
+        return _gates[name]
+
+
+def gate_stats():
+    with _gates_lock:
+        gates = list(_gates.values())
+    return [g.stats() for g in gates]
+
+
+def busy_response():
+    response = JsonResponse({"success": False, "error": "Server busy, please retry shortly."}, status=429)
+    response["Retry-After"] = str(RETRY_AFTER)
+    return response
+
+
+def offloaded(name=None):
+    """
+    Turn a blocking view into an async view that runs in its endpoint's pool
+    (named after the view unless ``name`` is given). With ASYNC_OFFLOAD_ENABLED
+    off it runs as a plain sync view would under ASGI: in its own thread, unbounded.
+    """
+    def decorator(view):
+        endpoint = name or view.__name__
+
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not ENABLED:
+                return await sync_to_async(view)(request, *args, **kwargs)
+            try:
+                return await gate(endpoint).run(view, request, *args, **kwargs)
+            except Overloaded:
+                return busy_response()
+
+        wrapper.offload_endpoint = endpoint
+        return wrapper
+    return decorator
+
+
+def streamed(name, request, iterator):
+    """
+    Response content for a blocking ``iterator``: under ASGI an async iterator
+    driven in the pool of ``name``; under WSGI the iterator itself (WSGI
+    servers already stream), holding a slot of ``name`` until it is consumed.
+    Raises Overloaded when the endpoint is full.
+    """
+    if not isinstance(request, ASGIRequest):
+        return gate(name).hold(iterator) if ENABLED else iterator
+    if ENABLED:
+        return gate(name).stream(iterator)
+
+    async def unbounded():
+        step = sync_to_async(next, thread_sensitive=False)
+        end = object()
+        while (item := await step(iterator, end)) is not end:
+            yield item
+    return unbounded()
+
+
+# -------------------------------
+# ASGI: reject before the body is read
+# -------------------------------
+def _endpoint_for(path):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    return getattr(match.func, "offload_endpoint", None)
+
+
+def asgi_guard(app):
+    """ASGI wrapper answering 429 for a full endpoint without reading the request body."""
+    async def guarded(scope, receive, send):
+        if ENABLED and scope["type"] == "http":
+            endpoint = _endpoint_for(scope["path"])
+            with _gates_lock:
+                existing = _gates.get(endpoint)
+            if existing is not None and existing.reject_if_full():
+                response = busy_response()
+                await send({
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response.items()],
+                })
+                await send({"type": "http.response.body", "body": response.content})
+                return
+        await app(scope, receive, send)
+    return guarded
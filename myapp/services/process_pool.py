@@ -0,0 +1,58 @@
+"""
+Shared process pools for the CPU-bound services (SAR strips, pair histograms).
+
+Workers start through ``forkserver``, not ``fork``: the web process runs
+threads (offload pools, batching scheduler) and holds open GDAL handles, and
+a forked child can inherit one of their locks held. A pool broken by a
+crashed worker is shut down and rebuilt, and the job retried once, instead
+of failing every later request.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+START_METHOD = "forkserver"
+
+
+def mp_context():
+    return multiprocessing.get_context(START_METHOD)
+
+
+def executor(workers):
+    """A fresh pool using the safe start method (for one-off ``with`` blocks)."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context())
+
+
+class WorkerPool:
+    """Lazily created, process-wide pool of ``workers`` processes."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = executor(self.workers)
+            return self._pool
+
+    def _discard(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, job):
+        """``job(pool)``, retried once on a fresh pool if a worker died."""
+        for attempt in range(2):
+            pool = self.get()
+            try:
+                return job(pool)
+            except BrokenProcessPool:
+                print("⚠ Process pool broken (a worker died); rebuilding it")
+                self._discard(pool)
+                if attempt:
+                    raise
@@ -0,0 +1,67 @@
+"""
+Batched anti-aliasing reconstruction.
+
+The signal is framed into fixed-length model inputs, stacked into one
+preallocated ``(n_frames, frame_len, 1)`` float32 tensor and run through the
+model in groups of at most ``max_batch`` frames. With ``overlap > 0`` frames
+are cross-faded (weighted overlap-add) so chunk boundaries do not click.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _crossfade_window(frame_len, overlap):
+    """Flat window with linear ramps of ``overlap`` samples at each end (never zero)."""
+    window = np.ones(frame_len, dtype=np.float32)
+    if overlap > 0:
+        ramp = np.linspace(0.0, 1.0, overlap + 2, dtype=np.float32)[1:-1]
+        window[:overlap] = ramp
+        window[-overlap:] = ramp[::-1]
+    return window
+
+
+def frame_signal(y, frame_len, hop):
+    """Zero-padded frames of ``y`` stacked as a ``(n_frames, frame_len, 1)`` float32 tensor."""
+    n = len(y)
+    n_frames = max(1, int(np.ceil(max(n - frame_len, 0) / hop)) + 1)
+    padded = np.zeros((n_frames - 1) * hop + frame_len, dtype=np.float32)
+    padded[:n] = y
+    frames = np.empty((n_frames, frame_len, 1), dtype=np.float32)
+    frames[:, :, 0] = sliding_window_view(padded, frame_len)[::hop]
+    return frames
+
+
+def reconstruct(model, y, frame_len=48000, max_batch=16, overlap=0):
+    """
+    Run ``model`` over ``y`` in batched frames and return the reconstructed signal
+    (same length as ``y``, float32).
+    """
+    overlap = int(min(max(overlap, 0), frame_len // 2))
+    hop = frame_len - overlap
+    n = len(y)
+    frames = frame_signal(y, frame_len, hop)
+    n_frames = len(frames)
+
+    if overlap == 0:
+        # Frames tile the signal exactly: write predictions straight into the output.
+        out = np.empty(n_frames * frame_len, dtype=np.float32)
+        for start in range(0, n_frames, max_batch):
+            stop = min(start + max_batch, n_frames)
+            pred = np.asarray(model.predict_on_batch(frames[start:stop]), dtype=np.float32)
+            out[start * frame_len:stop * frame_len] = pred.reshape(-1)
+        return out[:n]
+
+    window = _crossfade_window(frame_len, overlap)
+    total = (n_frames - 1) * hop + frame_len
+    out = np.zeros(total, dtype=np.float32)
+    weight = np.zeros(total, dtype=np.float32)
+    for start in range(0, n_frames, max_batch):
+        stop = min(start + max_batch, n_frames)
+        pred = np.asarray(model.predict_on_batch(frames[start:stop]), dtype=np.float32)
+        pred = pred.reshape(stop - start, frame_len)
+        for i, frame in enumerate(pred, start=start):
+            pos = i * hop
+            out[pos:pos + frame_len] += frame * window
+            weight[pos:pos + frame_len] += window
+    out /= weight
+    return out[:n]
@@ -0,0 +1,177 @@
+"""
+Joint histograms and recurrence matrices for ECG/EEG channel pairs.
+
+Each channel is quantised once into ``bins`` levels; a pair's joint histogram
+is then a single ``np.bincount`` over the combined codes, so all pairs of a
+recording cost one pass per pair instead of a per-sample loop. Large all-pairs
+requests are split across a process pool. Recurrence matrices are computed in
+row blocks so memory stays at ``block * n`` distances at a time.
+
+Results are cached as numpy arrays (uint8 matrices, int32 counts) under a
+byte budget, never as the JSON-ready lists built from them per response.
+"""
+import os
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from myapp.services import process_pool
+
+
+WORKERS = getattr(settings, "RECURRENCE_WORKERS", None) or os.cpu_count() or 1
+PARALLEL_MIN_WORK = getattr(settings, "RECURRENCE_PARALLEL_MIN_WORK", 50_000_000)  # pairs * samples
+RESULT_CACHE_MAX_BYTES = getattr(settings, "RECURRENCE_CACHE_MAX_BYTES", 64 * 1024 ** 2)
+RECURRENCE_BLOCK = 256  # rows of the recurrence matrix computed at once
+
+_results = OrderedDict()  # key -> (result, nbytes)
+_results_bytes = 0
+_results_lock = threading.Lock()
+_pool = process_pool.WorkerPool(WORKERS)
+
+
+# -------------------------------
+# Result cache
+# -------------------------------
+def _nbytes(result):
+    """Bytes held by the numpy arrays of a result dict (arrays or lists of arrays)."""
+    total = 0
+    for value in result.values():
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            total += getattr(item, "nbytes", 0)
+    return total
+
+
+def cached(key, compute):
+    """
+    Return the cached result for ``key`` or compute, store and return it.
+    Results larger than the whole budget are returned without being stored.
+    """
+    global _results_bytes
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key][0]
+    result = compute()
+    size = _nbytes(result)
+    if size > RESULT_CACHE_MAX_BYTES:
+        return result
+    with _results_lock:
+        if key not in _results:
+            _results[key] = (result, size)
+            _results_bytes += size
+        while _results_bytes > RESULT_CACHE_MAX_BYTES:
+            _, (_, evicted) = _results.popitem(last=False)
+            _results_bytes -= evicted
+    return result
+
+
+# -------------------------------
+# Joint histograms
+# -------------------------------
+def quantise(x, bins):
+    """
+    Per-channel bin codes (uint16, same shape as ``x``) and the (min, max) of each channel.
+    Non-finite samples (NaN from invalid digital values) get the code ``bins``,
+    which ``pair_histogram`` leaves out; the ranges cover the finite samples only.
+    """
+    finite = np.isfinite(x)
+    masked = np.where(finite, x, np.nan)
+    with warnings.catch_warnings():  # all-NaN channels warn; their range becomes (0, 0)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        lo = np.nan_to_num(np.nanmin(masked, axis=1, keepdims=True))
+        hi = np.nan_to_num(np.nanmax(masked, axis=1, keepdims=True))
+    span = np.where(hi > lo, hi - lo, 1.0)
+    scaled = np.floor((np.where(finite, x, lo) - lo) / span * (bins - 1))
+    codes = np.where(finite, scaled, bins).astype(np.uint16)
+    return codes, np.hstack([lo, hi])
+
+
+def pair_histogram(codes_x, codes_y, bins):
+    """Counts indexed [y_bin][x_bin] (the orientation Plotly heatmaps expect)."""
+    valid = (codes_x < bins) & (codes_y < bins)
+    if not valid.all():
+        codes_x, codes_y = codes_x[valid], codes_y[valid]
+    flat = codes_y.astype(np.int64) * bins + codes_x
+    return np.bincount(flat, minlength=bins * bins).reshape(bins, bins)
+
+
+def _pairs_worker(codes_path, pairs, bins):
+    codes = np.load(codes_path, mmap_mode="r")
+    return [pair_histogram(codes[i], codes[j], bins) for i, j in pairs]
+
+
+def pair_histograms(x, pairs, bins):
+    """
+    Joint histograms for every (i, j) in ``pairs`` over channel-first ``x``.
+    Returns (list of (bins, bins) int arrays, per-channel ranges).
+    """
+    codes, ranges = quantise(np.asarray(x, dtype=np.float32), bins)
+    work = len(pairs) * codes.shape[1]
+    if WORKERS <= 1 or len(pairs) < 2 or work < PARALLEL_MIN_WORK:
+        return [pair_histogram(codes[i], codes[j], bins) for i, j in pairs], ranges
+
+    # Share the codes with the workers through a memory-mapped file
+    fd, codes_path = tempfile.mkstemp(suffix=".npy")
+    os.close(fd)
+    try:
+        np.save(codes_path, codes)
+        chunk = max(1, int(np.ceil(len(pairs) / (WORKERS * 4))))
+        chunks = [pairs[k:k + chunk] for k in range(0, len(pairs), chunk)]
+
+        def submit_all(pool):
+            futures = [pool.submit(_pairs_worker, codes_path, c, bins) for c in chunks]
+            return [h for f in futures for h in f.result()]
+        hists = _pool.run(submit_all)
+    finally:
+        os.remove(codes_path)
+    return hists, ranges
+
+
+def bin_centres(lo, hi, bins):
+    return lo + (np.arange(bins) * (hi - lo)) / (bins - 1)
+
+
+# -------------------------------
+# Recurrence matrices
+# -------------------------------
+def embed(x, dim=1, delay=1):
+    """Time-delay embedding of a 1-D signal -> (n - (dim - 1) * delay, dim)."""
+    n = len(x) - (dim - 1) * delay
+    if n <= 0:
+        raise ValueError("signal too short for the requested embedding")
+    return np.stack([x[k * delay:k * delay + n] for k in range(dim)], axis=1)
+
+
+def _standardise(x):
+    std = x.std()
+    return (x - x.mean()) / (std if std > 0 else 1.0)
+
+
+def cross_recurrence(a, b, eps=None, dim=1, delay=1, eps_quantile=0.1, block=RECURRENCE_BLOCK):
+    """
+    Thresholded cross-recurrence matrix R[i, j] = |a_i - b_j| <= eps (uint8)
+    between the standardised, embedded signals ``a`` and ``b``. When ``eps`` is
+    None it is the ``eps_quantile`` of the pairwise distances (estimated on a sample).
+    """
+    ea = embed(_standardise(np.asarray(a, dtype=np.float32)), dim, delay)
+    eb = embed(_standardise(np.asarray(b, dtype=np.float32)), dim, delay)
+    n = min(len(ea), len(eb))
+    ea, eb = ea[:n], eb[:n]
+
+    if eps is None:
+        rng = np.random.default_rng(0)
+        i = rng.integers(0, n, 4096)
+        j = rng.integers(0, n, 4096)
+        eps = float(np.quantile(np.linalg.norm(ea[i] - eb[j], axis=1), eps_quantile))
+
+    out = np.empty((n, n), dtype=np.uint8)
+    eps_sq = eps * eps
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        diff = ea[start:stop, None, :] - eb[None, :, :]
+        out[start:stop] = np.einsum("ijk,ijk->ij", diff, diff) <= eps_sq
+    return out, eps
@@ -0,0 +1,151 @@
+"""
+Rational polyphase resampling engine.
+
+Rates are reduced to a small up/down ratio and the anti-aliasing FIR filter
+for each ratio is designed once and cached. ``resample`` handles whole
+signals; ``StreamingResampler`` produces exactly the same output as
+``resample`` but consumes the input in blocks and only keeps one filter
+length of history, so memory is bounded by the block size.
+"""
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from django.conf import settings
+from scipy.signal import firwin, resample_poly, upfirdn
+
+
+MAX_FACTOR = getattr(settings, "RESAMPLE_MAX_FACTOR", 2000)
+RATIO_TOLERANCE = 1e-3  # relative rate error accepted when approximating huge ratios
+
+
+def rational_ratio(orig_sr, new_sr):
+    """
+    (up, down) for ``orig_sr`` -> ``new_sr``, reduced by their gcd. Ratios with
+    factors above MAX_FACTOR are approximated when that stays within RATIO_TOLERANCE.
+    """
+    orig_sr, new_sr = int(orig_sr), int(new_sr)
+    g = gcd(orig_sr, new_sr)
+    up, down = new_sr // g, orig_sr // g
+    if max(up, down) <= MAX_FACTOR:
+        return up, down
+    exact = Fraction(new_sr, orig_sr)
+    approx = exact.limit_denominator(MAX_FACTOR)
+    if 0 < approx.numerator <= MAX_FACTOR and abs(approx - exact) <= RATIO_TOLERANCE * exact:
+        return approx.numerator, approx.denominator
+    return up, down
+
+
+@lru_cache(maxsize=64)
+def lowpass_filter(up, down, window=("kaiser", 5.0)):
+    """Anti-aliasing FIR filter (unit gain) for up/down, same design as resample_poly; cached."""
+    max_rate = max(up, down)
+    h = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=window)
+    h.flags.writeable = False
+    return h
+
+
+def resample(x, orig_sr, new_sr):
+    """Resample a whole 1-D signal with the cached polyphase filter (float32 output)."""
+    up, down = rational_ratio(orig_sr, new_sr)
+    x = np.asarray(x, dtype=np.float32)
+    if up == down:
+        return x.copy()
+    return resample_poly(x, up, down, window=lowpass_filter(up, down)).astype(np.float32)
+
+
+class StreamingResampler:
+    """Resample ``orig_sr`` -> ``new_sr`` incrementally with ``process(block)`` / ``flush()``."""
+
+    def __init__(self, orig_sr, new_sr):
+        self.up, self.down = rational_ratio(orig_sr, new_sr)
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            self._n_in = 0
+            return
+
+        h = lowpass_filter(self.up, self.down) * self.up
+        half_len = (len(h) - 1) // 2
+        n_pre_pad = self.down - half_len % self.down
+        self.h = np.concatenate([np.zeros(n_pre_pad), h])
+        self.n_pre_remove = (half_len + n_pre_pad) // self.down
+
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._buf_start = 0  # global input index of _buf[0], always a multiple of down
+        self._n_in = 0
+        self._next = 0  # next global upfirdn output index to produce
+        self._emitted = 0
+
+    def _first_input_for(self, g):
+        """Earliest input index (aligned to ``down``) contributing to output ``g``."""
+        s = max(0, -(-(g * self.down - (len(self.h) - 1)) // self.up))
+        return s - s % self.down
+
+    def _emit(self, limit=None):
+        avail_end = self._buf_start + len(self._buf)
+        if avail_end == 0:
+            return np.zeros(0, dtype=np.float32)
+        g_max = ((avail_end - 1) * self.up) // self.down
+        if limit is not None:
+            g_max = min(g_max, limit - 1)
+        if g_max < self._next:
+            return np.zeros(0, dtype=np.float32)
+
+        s0 = max(self._first_input_for(self._next), self._buf_start)
+        s1 = (g_max * self.down) // self.up + 1
+        y = upfirdn(self.h, self._buf[s0 - self._buf_start:s1 - self._buf_start], self.up, self.down)
+        offset = s0 * self.up // self.down
+        out = y[self._next - offset:g_max - offset + 1]
+        first = self._next
+        self._next = g_max + 1
+
+        keep = self._first_input_for(self._next)
+        if keep > self._buf_start:
+            self._buf = self._buf[keep - self._buf_start:]
+            self._buf_start = keep
+
+        # Drop the filter delay at the very beginning
+        skip = max(0, self.n_pre_remove - first)
+        out = out[skip:].astype(np.float32)
+        self._emitted += len(out)
+        return out
+
+    def process(self, block):
+        """Feed one block of input; return the output samples that are now final."""
+        block = np.asarray(block, dtype=np.float32)
+        self._n_in += len(block)
+        if self.passthrough:
+            return block
+        self._buf = np.concatenate([self._buf, block])
+        return self._emit()
+
+    def flush(self):
+        """Finish the stream and return the remaining output samples."""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        n_out = -(-self._n_in * self.up // self.down)
+        last = self.n_pre_remove + n_out  # one past the last global output index
+        needed = -(-(last - 1) * self.down // self.up) + 1
+        pad = max(0, needed - (self._buf_start + len(self._buf)))
+        self._buf = np.concatenate([self._buf, np.zeros(pad, dtype=np.float32)])
+        return self._emit(limit=last)
+
+
+class ResamplerChain:
+    """Several StreamingResamplers applied one after another (e.g. orig -> low -> playback)."""
+
+    def __init__(self, rates):
+        self.stages = [StreamingResampler(a, b) for a, b in zip(rates[:-1], rates[1:]) if a != b]
+
+    def process(self, block):
+        out = np.asarray(block, dtype=np.float32)
+        for stage in self.stages:
+            out = stage.process(out)
+        return out
+
+    def flush(self):
+        out = np.zeros(0, dtype=np.float32)
+        for stage in self.stages:
+            out = np.concatenate([stage.process(out), stage.flush()])
+        return out
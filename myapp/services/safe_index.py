@@ -0,0 +1,161 @@
+"""
+Index of Sentinel-1 .SAFE products.
+
+``manifest.safe`` is parsed once per product: mission, product type, mode
+and the measurement rasters it lists, each with polarisation, swath,
+dimensions, geotransform and overview levels (from the TIFF header only).
+The result is stored in the ``SafeProduct``/``SafeMeasurement`` tables and
+reused until the mtime of the manifest or a measurement file changes, so
+resolving a band costs a few stats and one indexed query instead of a
+directory walk.
+Folders without a manifest fall back to the measurement files on disk.
+"""
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import rasterio
+from django.db import DatabaseError, IntegrityError, transaction
+
+from myapp.models import SafeProduct, SafeMeasurement
+
+
+MANIFEST = "manifest.safe"
+# s1a-iw-grd-vv-20230101t000000-...-001.tiff -> swath "iw", polarisation "vv"
+_MEASUREMENT_RE = re.compile(r"^s1[a-d]-(?P<swath>[a-z0-9]+)-[a-z]+-(?P<pol>hh|hv|vh|vv)-", re.IGNORECASE)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _first_text(root, name):
+    for element in root.iter():
+        if _local(element.tag) == name and element.text:
+            return element.text.strip()
+    return ""
+
+
+def parse_manifest(folder_path):
+    """Product fields and measurement file paths listed in manifest.safe."""
+    root = ET.parse(os.path.join(folder_path, MANIFEST)).getroot()
+    files = []
+    for element in root.iter():
+        if _local(element.tag) == "fileLocation":
+            href = element.get("href", "")
+            if href.lower().endswith((".tiff", ".tif")) and "measurement" in href:
+                files.append(os.path.normpath(os.path.join(folder_path, href)))
+    product = {
+        "mission": _first_text(root, "familyName") + _first_text(root, "number"),
+        "product_type": _first_text(root, "productType"),
+        "mode": _first_text(root, "mode"),
+        "start_time": _first_text(root, "startTime"),
+    }
+    return product, files
+
+
+def _scan_measurements(folder_path):
+    """Measurement rasters on disk, for folders without a manifest."""
+    found = []
+    for root, _, files in os.walk(folder_path):
+        found.extend(os.path.join(root, f) for f in files if f.lower().endswith((".tiff", ".tif")))
+    return sorted(found)
+
+
+def describe_measurement(path):
+    """Polarisation, swath and raster header fields of one measurement file."""
+    match = _MEASUREMENT_RE.match(os.path.basename(path))
+    with rasterio.open(path) as src:
+        return {
+            "path": path,
+            "polarisation": match.group("pol").upper() if match else "",
+            "swath": match.group("swath").upper() if match else "",
+            "width": src.width,
+            "height": src.height,
+            "geotransform": list(src.transform.to_gdal()),
+            "overviews": list(src.overviews(1)),
+            "mtime": os.path.getmtime(path),
+        }
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _index_mtime(folder_path):
+    manifest = os.path.join(folder_path, MANIFEST)
+    return os.path.getmtime(manifest if os.path.exists(manifest) else folder_path)
+
+
+def _build(folder_path):
+    """Parse a product from disk: (product fields, list of measurement dicts)."""
+    if os.path.exists(os.path.join(folder_path, MANIFEST)):
+        product, files = parse_manifest(folder_path)
+    else:
+        product, files = {}, _scan_measurements(folder_path)
+    measurements = [describe_measurement(f) for f in files if os.path.exists(f)]
+    return product, measurements
+
+
+def _stored(folder_path, mtime):
+    """Indexed measurements of a product, or None when missing or stale."""
+    product = SafeProduct.objects.filter(path=folder_path).first()
+    if product is None or product.manifest_mtime != mtime:
+        return None
+    measurements = list(product.measurements.order_by("id").values(  # manifest order
+        "path", "polarisation", "swath", "width", "height", "geotransform", "overviews", "mtime"))
+    if all(_mtime(m["path"]) == m["mtime"] for m in measurements):
+        return measurements
+    return None
+
+
+def index(folder_path):
+    """
+    Measurements of a product as dicts, from the index when it is fresh,
+    otherwise re-parsed from disk and stored.
+    """
+    folder_path = os.path.abspath(folder_path)
+    mtime = _index_mtime(folder_path)
+    try:
+        measurements = _stored(folder_path, mtime)
+        if measurements is not None:
+            return measurements
+    except DatabaseError as e:
+        print(f"⚠ SAFE index unavailable (run manage.py migrate): {e}")
+        return _build(folder_path)[1]
+
+    fields, measurements = _build(folder_path)
+    try:
+        with transaction.atomic():
+            product, _ = SafeProduct.objects.update_or_create(
+                path=folder_path, defaults={"manifest_mtime": mtime, **fields})
+            product.measurements.all().delete()
+            SafeMeasurement.objects.bulk_create(SafeMeasurement(product=product, **m) for m in measurements)
+    except IntegrityError:
+        # Another request indexed the same product first; use its rows when they are fresh
+        print(f"♻ {folder_path} was indexed concurrently; re-reading the index")
+        return _stored(folder_path, mtime) or measurements
+    print(f"✅ Indexed {folder_path}: {len(measurements)} measurement(s)")
+    return measurements
+
+
+def resolve(folder_path, polarisation=None, swath=None):
+    """
+    Measurement dict for the requested band (first listed if unspecified) and
+    the list of all bands of the product. Raises LookupError if none matches.
+    """
+    measurements = index(folder_path)
+    if not measurements:
+        raise LookupError("No .tiff measurement file found in SAFE folder.")
+    matches = [
+        m for m in measurements
+        if (not polarisation or m["polarisation"] == polarisation.upper())
+        and (not swath or m["swath"] == swath.upper())
+    ]
+    if not matches:
+        available = ", ".join(f"{m['swath']} {m['polarisation']}" for m in measurements)
+        raise LookupError(f"No measurement for {swath or '*'} {polarisation or '*'} (available: {available})")
+    return matches[0], measurements
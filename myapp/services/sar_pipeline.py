@@ -0,0 +1,87 @@
+"""
+Block-parallel SAR preview: windowed read, block mean and dB per window.
+
+The band is split into row strips whose height is a multiple of the
+block-averaging factor. Each strip is read with its own rasterio window,
+block-averaged and converted to dB independently - in a process pool for
+large rasters - and written into a preallocated output, so no process ever
+holds more than one strip of the full-resolution band.
+"""
+import math
+import os
+
+import numpy as np
+import rasterio
+from django.conf import settings
+from rasterio.windows import Window
+
+from myapp.services import process_pool
+
+
+WORKERS = getattr(settings, "SAR_WORKERS", None) or os.cpu_count() or 1
+BLOCK_ROWS = getattr(settings, "SAR_BLOCK_ROWS", 2048)  # source rows per window (rounded to the factor)
+PARALLEL_MIN_PIXELS = getattr(settings, "SAR_PARALLEL_MIN_PIXELS", 16_000_000)
+EPS = 1e-6
+
+_pool = process_pool.WorkerPool(WORKERS)
+
+
+def block_mean(data, factor_row, factor_col):
+    """
+    Mean over (factor_row, factor_col) blocks. Partial blocks at the bottom and
+    right edges average only the pixels they contain.
+    """
+    rows, cols = data.shape
+    out_rows, out_cols = -(-rows // factor_row), -(-cols // factor_col)
+    padded = np.zeros((out_rows * factor_row, out_cols * factor_col), dtype=np.float32)
+    padded[:rows, :cols] = data
+    sums = padded.reshape(out_rows, factor_row, out_cols, factor_col).sum(axis=(1, 3))
+    counts = np.outer(
+        np.minimum(factor_row, rows - factor_row * np.arange(out_rows)),
+        np.minimum(factor_col, cols - factor_col * np.arange(out_cols)),
+    )
+    return sums / counts
+
+
+def _process_window(path, row_off, n_rows, factor_row, factor_col):
+    """Read one row strip, block-average it and convert to dB (runs in a worker)."""
+    with rasterio.open(path) as src:
+        data = src.read(1, window=Window(0, row_off, src.width, n_rows), out_dtype="float32")
+    db = block_mean(data, factor_row, factor_col)
+    np.log10(db + EPS, out=db)
+    db *= 10
+    return row_off // factor_row, db.astype(np.float32)
+
+
+def preview_factors(height, width, max_dim):
+    """Block-averaging factors that bring the band down to at most ``max_dim`` per side."""
+    return max(1, math.ceil(height / max_dim)), max(1, math.ceil(width / max_dim))
+
+
+def preview_db(path, max_dim, workers=None, block_rows=None):
+    """dB preview of band 1 with each side at most ``max_dim``, as float32."""
+    workers = workers or WORKERS
+    with rasterio.open(path) as src:
+        height, width = src.height, src.width
+    factor_row, factor_col = preview_factors(height, width, max_dim)
+    strip = max(1, (block_rows or BLOCK_ROWS) // factor_row) * factor_row
+    windows = [(row, min(strip, height - row)) for row in range(0, height, strip)]
+
+    out = np.empty((-(-height // factor_row), -(-width // factor_col)), dtype=np.float32)
+
+    def assemble(results):
+        for out_row, db in results:
+            out[out_row:out_row + db.shape[0]] = db
+
+    def submit_all(pool):
+        futures = [pool.submit(_process_window, path, row, n, factor_row, factor_col) for row, n in windows]
+        assemble(f.result() for f in futures)
+
+    if workers <= 1 or len(windows) < 2 or height * width < PARALLEL_MIN_PIXELS:
+        assemble(_process_window(path, row, n, factor_row, factor_col) for row, n in windows)
+    elif workers == WORKERS:
+        _pool.run(submit_all)
+    else:
+        with process_pool.executor(workers) as pool:
+            submit_all(pool)
+    return out
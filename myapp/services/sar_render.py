@@ -0,0 +1,83 @@
+"""
+SAR dB rendering without a plotting library.
+
+dB values are mapped to uint8 with a percentile contrast stretch computed
+from a histogram (one pass, no sort), optionally through a colormap LUT, and
+encoded straight to PNG/WebP. Axes and titles are drawn client-side.
+"""
+import numpy as np
+
+from myapp.services.image_encoding import ENCODERS
+
+
+HIST_BINS = 4096
+HIST_MAX_SAMPLES = 1_000_000  # larger images are strided before histogramming
+STRETCH_PERCENTILES = (2, 98)
+
+# Colormap anchors (9 evenly spaced stops), interpolated to 256 entries
+_ANCHORS = {
+    "viridis": [(68, 1, 84), (71, 45, 123), (59, 82, 139), (44, 114, 142), (33, 145, 140),
+                (40, 174, 128), (94, 201, 98), (173, 220, 48), (253, 231, 37)],
+    "inferno": [(0, 0, 4), (33, 12, 74), (87, 16, 110), (138, 34, 106), (188, 55, 84),
+                (228, 90, 49), (249, 142, 9), (249, 203, 53), (252, 255, 164)],
+    "magma": [(0, 0, 4), (29, 17, 71), (81, 18, 124), (131, 38, 129), (183, 55, 121),
+              (231, 82, 99), (252, 137, 97), (254, 196, 136), (252, 253, 191)],
+}
+
+
+def _lut(anchors):
+    anchors = np.asarray(anchors, dtype=np.float64)
+    stops = np.linspace(0, 255, len(anchors))
+    levels = np.arange(256)
+    return np.stack([np.interp(levels, stops, anchors[:, c]) for c in range(3)], axis=1).round().astype(np.uint8)
+
+
+LUTS = {name: _lut(anchors) for name, anchors in _ANCHORS.items()}
+COLORMAPS = ("gray",) + tuple(LUTS)
+
+
+def stretch_range(db, percentiles=STRETCH_PERCENTILES, bins=HIST_BINS):
+    """(vmin, vmax) at the given percentiles of the finite values, read off a histogram."""
+    values = np.ravel(db)
+    values = values[::max(1, values.size // HIST_MAX_SAMPLES)]
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return 0.0, 1.0
+    lo, hi = float(values.min()), float(values.max())
+    if hi <= lo:
+        return lo, lo + 1.0
+    width = (hi - lo) / bins
+    counts = np.bincount(np.minimum(((values - lo) / width).astype(np.intp), bins - 1), minlength=bins)
+    cdf = np.cumsum(counts) / values.size
+    vmin = lo + np.searchsorted(cdf, percentiles[0] / 100.0) * width
+    vmax = lo + (np.searchsorted(cdf, percentiles[1] / 100.0) + 1) * width
+    return float(vmin), float(max(vmax, vmin + width))
+
+
+def to_uint8(db, vmin, vmax):
+    scaled = np.asarray(db, dtype=np.float32) - np.float32(vmin)
+    scaled *= np.float32(255.0 / (vmax - vmin))
+    np.clip(scaled, 0, 255, out=scaled)
+    scaled[np.isnan(scaled)] = 0
+    return scaled.astype(np.uint8)
+
+
+def colorize(gray, cmap="gray"):
+    """Gray uint8 image, or (h, w, 3) RGB through the colormap LUT."""
+    if cmap == "gray":
+        return gray
+    if cmap not in LUTS:
+        raise ValueError(f"Unknown colormap: {cmap} (choose from {', '.join(COLORMAPS)})")
+    return LUTS[cmap][gray]
+
+
+def render(db, cmap="gray", fmt="png", db_range=None):
+    """
+    Encode a dB image. Returns (bytes, content_type, (vmin, vmax)); the range
+    is stretched from the image itself unless ``db_range`` is given.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unknown image format: {fmt}")
+    vmin, vmax = db_range or stretch_range(db)
+    encode, content_type = ENCODERS[fmt]
+    return encode(colorize(to_uint8(db, vmin, vmax), cmap)), content_type, (vmin, vmax)
@@ -0,0 +1,252 @@
+"""
+Multi-resolution dB tile pyramid for SAR measurement rasters.
+
+A product (one measurement .tiff) is registered once: its size and a
+product-wide contrast range (percentiles of the dB values of a decimated
+overview read) are stored in ``meta.json`` under ``SAR_TILE_CACHE_DIR``.
+Tiles follow the XYZ scheme: level ``max_zoom`` is full resolution and each
+level above halves it, so level 0 fits the whole image in one 256 px tile.
+Each tile is a windowed rasterio read with ``out_shape`` (GDAL averages, or
+uses overviews when the file has them), so the full band is never held in
+memory. Rendered tiles are stored as uint8 ``.npy`` files; coarse levels are
+built when the product is registered, deeper ones on first request. The cache
+is bounded by ``SAR_TILE_CACHE_MAX_BYTES`` (least recently used products go
+first), checked on registration and after every ``EVICT_EVERY`` bytes of tiles.
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import rasterio
+from django.conf import settings
+from rasterio.enums import Resampling
+from rasterio.windows import Window
+
+from myapp.services import sar_render, signal_cache
+from myapp.services.image_encoding import encode_png
+
+
+TILE_SIZE = 256
+CACHE_DIR = str(getattr(settings, "SAR_TILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sar_tiles")))
+MAX_BYTES = getattr(settings, "SAR_TILE_CACHE_MAX_BYTES", 4 * 1024 ** 3)
+PREBUILD_MAX_TILES = getattr(settings, "SAR_TILE_PREBUILD_MAX_TILES", 64)
+STATS_SIZE = 1024  # longest side of the overview read used for the contrast range
+EPS = 1e-6
+MAX_OPEN = 4  # rasterio datasets kept open per worker
+EVICT_EVERY = max(1, MAX_BYTES // 16)  # bytes of new tiles between eviction passes
+
+_open = OrderedDict()  # path -> (dataset, lock)
+_lock = threading.Lock()
+_written = 0  # tile bytes written since the last eviction pass
+_evict_lock = threading.Lock()
+
+
+def to_db(data):
+    return 10 * np.log10(data + EPS)
+
+
+def product_id(tiff_path):
+    """Stable id for a measurement file; changes when the file is rewritten."""
+    stat = os.stat(tiff_path)
+    key = f"{os.path.abspath(tiff_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _product_dir(pid):
+    if not pid.isalnum():
+        raise ValueError("invalid product_id")
+    return os.path.join(CACHE_DIR, pid)
+
+
+def _dataset(path):
+    """Open rasterio dataset and its lock (datasets are not thread-safe)."""
+    with _lock:
+        if path in _open:
+            _open.move_to_end(path)
+            return _open[path]
+    src = rasterio.open(path)
+    with _lock:
+        handle = _open.setdefault(path, (src, threading.Lock()))
+        evicted = [_open.popitem(last=False)[1] for _ in range(len(_open) - MAX_OPEN)]
+    if handle[0] is not src:
+        src.close()  # another thread opened it first
+    for old, old_lock in evicted:
+        with old_lock:  # a read in progress finishes first
+            old.close()
+    return handle
+
+
+@contextmanager
+def _locked_dataset(path):
+    """The open dataset of ``path`` with its lock held; reopened if it was evicted meanwhile."""
+    while True:
+        src, lock = _dataset(path)
+        with lock:
+            if not src.closed:
+                yield src
+                return
+
+
+def read_decimated(path, window=None, out_shape=None):
+    """Band 1 (or a window of it) as float32, averaged down to ``out_shape``."""
+    with _locked_dataset(path) as src:
+        return src.read(1, window=window, out_shape=out_shape,
+                        resampling=Resampling.average, out_dtype="float32")
+
+
+def register(tiff_path):
+    """Register a measurement file, compute its contrast range and prebuild coarse levels; returns meta."""
+    pid = product_id(tiff_path)
+    meta = get_meta(pid)
+    if meta is not None:
+        return meta
+
+    with _locked_dataset(tiff_path) as src:
+        width, height = src.width, src.height
+        overviews = src.overviews(1)
+    scale = max(1, math.ceil(max(width, height) / STATS_SIZE))
+    overview = read_decimated(tiff_path, out_shape=(math.ceil(height / scale), math.ceil(width / scale)))
+    valid = overview[overview > 0]
+    db = to_db(valid if valid.size else overview)
+    vmin, vmax = sar_render.stretch_range(db)
+
+    meta = {
+        "product_id": pid,
+        "path": os.path.abspath(tiff_path),
+        "width": width,
+        "height": height,
+        "tile_size": TILE_SIZE,
+        "max_zoom": max(0, math.ceil(math.log2(max(width, height) / TILE_SIZE))),
+        "overviews": list(overviews),
+        "db_range": [vmin, vmax],
+    }
+    product_dir = _product_dir(pid)
+    os.makedirs(product_dir, exist_ok=True)
+    _atomic_write(os.path.join(product_dir, "meta.json"), json.dumps(meta).encode("utf-8"))
+    _evict()
+    build_pyramid(pid, PREBUILD_MAX_TILES)
+    return meta
+
+
+def get_meta(pid):
+    """Meta of a registered product, or None if unknown/evicted."""
+    try:
+        product_dir = _product_dir(pid)
+        with open(os.path.join(product_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    try:
+        os.utime(product_dir, (now, now))  # mtime marks recency for LRU eviction
+    except OSError:
+        pass
+    return meta
+
+
+def level_shape(meta, z):
+    """(tiles_x, tiles_y) at level ``z``."""
+    scale = 2 ** (meta["max_zoom"] - z)
+    span = TILE_SIZE * scale
+    return math.ceil(meta["width"] / span), math.ceil(meta["height"] / span)
+
+
+def render_tile(meta, z, x, y):
+    """uint8 dB tile (h, w) for level ``z``; edge tiles are smaller than TILE_SIZE."""
+    scale = 2 ** (meta["max_zoom"] - z)
+    span = TILE_SIZE * scale
+    col_off, row_off = x * span, y * span
+    width = min(span, meta["width"] - col_off)
+    height = min(span, meta["height"] - row_off)
+    out_shape = (max(1, math.ceil(height / scale)), max(1, math.ceil(width / scale)))
+    data = read_decimated(meta["path"], Window(col_off, row_off, width, height), out_shape)
+    return sar_render.to_uint8(to_db(data), *meta["db_range"])
+
+
+def tile(pid, z, x, y):
+    """Cached uint8 tile for (z, x, y), rendering it on first request; None if out of range."""
+    meta = get_meta(pid)
+    if meta is None or not 0 <= z <= meta["max_zoom"]:
+        return None
+    tiles_x, tiles_y = level_shape(meta, z)
+    if not (0 <= x < tiles_x and 0 <= y < tiles_y):
+        return None
+
+    path = os.path.join(_product_dir(pid), str(z), str(x), f"{y}.npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+    data = render_tile(meta, z, x, y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buffer = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False)
+    with buffer:
+        np.save(buffer, data)
+    os.replace(buffer.name, path)
+    _count_written(os.path.getsize(path))
+    return data
+
+
+def build_pyramid(pid, max_tiles=None):
+    """Render levels from 0 down while the running tile count stays within ``max_tiles``."""
+    meta = get_meta(pid)
+    built = 0
+    for z in range(meta["max_zoom"] + 1):
+        tiles_x, tiles_y = level_shape(meta, z)
+        if max_tiles is not None and built + tiles_x * tiles_y > max_tiles:
+            break
+        for x in range(tiles_x):
+            for y in range(tiles_y):
+                tile(pid, z, x, y)
+        built += tiles_x * tiles_y
+    return built
+
+
+def tile_png(data, cmap="gray"):
+    """PNG of a tile padded to TILE_SIZE, optionally through a colormap; the padding is transparent."""
+    colored = sar_render.colorize(data, cmap)
+    if colored.ndim == 2:
+        colored = colored[:, :, None]
+    h, w, channels = colored.shape
+    out = np.zeros((TILE_SIZE, TILE_SIZE, channels + 1), dtype=np.uint8)
+    out[:h, :w, :channels] = colored
+    out[:h, :w, channels] = 255
+    return encode_png(out)
+
+
+def tile_raw(data, cmap=None):
+    """Raw uint8 bytes of a tile padded to TILE_SIZE x TILE_SIZE (row-major); colormaps are applied client-side."""
+    out = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+    out[:data.shape[0], :data.shape[1]] = data
+    return out.tobytes()
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _count_written(size):
+    global _written
+    with _evict_lock:
+        _written += size
+        due = _written >= EVICT_EVERY
+    if due:
+        _evict()
+
+
+def _evict():
+    """Drop least recently used products while the cache is over MAX_BYTES."""
+    global _written
+    with _evict_lock:
+        _written = 0
+        signal_cache.evict_lru(CACHE_DIR, MAX_BYTES, keep=1)  # never the product in use
@@ -0,0 +1,154 @@
+"""
+On-disk cache of parsed ECG/EEG uploads, keyed by content hash.
+
+Upload views hash the uploaded files with ``content_key`` and look the key up
+before parsing anything. The uploaded source files are kept under
+``SIGNAL_CACHE_DIR`` (``put_source``) with their header fields in meta.json,
+so a repeated upload of the same record skips parsing and follow-up
+endpoints (windowed decimation, ...) reference the ``signal_id`` instead of
+re-uploading; samples are read window by window (see ``eeg_reader``).
+The cache is bounded by ``SIGNAL_CACHE_MAX_BYTES``; least recently used
+entries are evicted first.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+CACHE_DIR = str(getattr(settings, "SIGNAL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "signal_cache")))
+MAX_BYTES = getattr(settings, "SIGNAL_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+
+_lock = threading.Lock()
+
+
+def content_key(kind, *uploaded_files):
+    """sha256 over the bytes of the uploaded files, namespaced by ``kind`` (ecg, eeg, ...)."""
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    for uploaded in uploaded_files:
+        for chunk in uploaded.chunks():
+            digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _entry_dir(signal_id):
+    if not signal_id.isalnum():
+        raise ValueError("invalid signal_id")
+    return os.path.join(CACHE_DIR, signal_id)
+
+
+def _store(signal_id, write):
+    """Build an entry in a temp dir with ``write(tmp_dir)`` and move it into place atomically."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    final_dir = _entry_dir(signal_id)
+    if not os.path.isdir(final_dir):
+        tmp_dir = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+        try:
+            write(tmp_dir)
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            # Another request stored the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        _evict(signal_id)
+    return get(signal_id)
+
+
+def put_source(signal_id, uploaded_files, **meta):
+    """
+    Keep the uploaded files themselves under ``signal_id`` and return the
+    cached entry. ``meta`` is written to meta.json.
+    """
+    def write(tmp_dir):
+        source_dir = os.path.join(tmp_dir, "source")
+        os.makedirs(source_dir)
+        for uploaded in uploaded_files:
+            with open(os.path.join(source_dir, os.path.basename(uploaded.name)), "wb") as f:
+                for chunk in uploaded.chunks():
+                    f.write(chunk)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+    return _store(signal_id, write)
+
+
+def update_meta(signal_id, **meta):
+    """Merge ``meta`` into an existing entry's meta.json."""
+    path = os.path.join(_entry_dir(signal_id), "meta.json")
+    with _lock:
+        with open(path) as f:
+            current = json.load(f)
+        current.update(meta)
+        with open(path, "w") as f:
+            json.dump(current, f)
+
+
+def get(signal_id):
+    """
+    Cached entry ``{"signal_id", "source_dir", "channels", "fs", ...}`` (the
+    uploaded files and their meta.json fields) or None if unknown/evicted.
+    """
+    try:
+        entry_dir = _entry_dir(signal_id)
+        with open(os.path.join(entry_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    try:
+        os.utime(entry_dir, (now, now))  # mtime marks recency for LRU eviction
+    except OSError:
+        pass
+    return {
+        "signal_id": signal_id,
+        "source_dir": os.path.join(entry_dir, "source"),
+        **meta,
+    }
+
+
+def dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def evict_lru(cache_dir, max_bytes, keep=0, protect=()):
+    """
+    Remove the least recently used (oldest mtime) entry directories of
+    ``cache_dir`` while it holds more than ``max_bytes``; the ``keep`` most
+    recent entries and the names in ``protect`` are never removed (they still
+    count towards the size). Names starting with "." are staging dirs.
+    """
+    entries = []
+    protected = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        if name in protect:
+            try:
+                protected += dir_size(path)
+            except OSError:
+                pass
+            continue
+        try:
+            entries.append((os.path.getmtime(path), dir_size(path), path))
+        except OSError:
+            continue
+    total = protected + sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries)[:len(entries) - keep]:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _evict(stored_id):
+    with _lock:
+        evict_lru(CACHE_DIR, MAX_BYTES, protect=(stored_id,))  # never the entry just stored
@@ -0,0 +1,122 @@
+"""
+Binary columnar transport for multi-channel signals.
+
+Wire format (all little-endian)::
+
+    uint32   header length N
+    N bytes  JSON header {"channels", "fs", "shape": [n_channels, n_samples], "dtype", "layout"}
+    padding  zero bytes up to a 4-byte boundary
+    data     n_channels * n_samples values of ``dtype``, channel after channel
+
+``dtype`` is float32 (physical units), or int16 digital samples when the
+client asked for them (``?samples=digital``) and the recording has them; the
+header then also carries per-channel ``gain``, ``baseline`` and ``invalid``,
+and the client computes physical = (digital - baseline) / gain (NaN where the
+sample equals ``invalid``).
+
+The body is streamed in blocks and can be gzip/zstd encoded via the standard
+Content-Encoding header, so the browser decompresses it transparently.
+"""
+import json
+import zlib
+
+import numpy as np
+from django.http import StreamingHttpResponse
+
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+STREAM_BLOCK_BYTES = 1 << 20
+
+
+def wants_binary(request):
+    """True when the client asked for the binary format (Accept header or ?format=binary)."""
+    if request.GET.get("format") == "binary":
+        return True
+    return BINARY_CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+def wants_digital(request):
+    """True when the client can convert int16 digital samples itself (?samples=digital)."""
+    return request.GET.get("samples") == "digital"
+
+
+def _choose_encoding(request):
+    requested = request.GET.get("compress", "")
+    accepted = request.headers.get("Accept-Encoding", "")
+    if requested == "zstd" and "zstd" in accepted:
+        try:
+            import zstandard  # noqa: F401
+            return "zstd"
+        except ImportError:
+            pass
+    if requested in ("gzip", "zstd") and "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def encode_header(meta):
+    header = json.dumps(meta).encode("utf-8")
+    prefix = np.uint32(len(header)).astype("<u4").tobytes() + header
+    return prefix + b"\0" * (-len(prefix) % 4)
+
+
+def _iter_payload(header, data):
+    yield header
+    if not data.nbytes:
+        return  # empty window (memoryview cannot cast zero-length shapes)
+    raw = memoryview(data).cast("B")
+    for start in range(0, len(raw), STREAM_BLOCK_BYTES):
+        yield bytes(raw[start:start + STREAM_BLOCK_BYTES])
+
+
+def _gzip_stream(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        out = compressor.compress(block)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _zstd_stream(blocks):
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for block in blocks:
+        out = compressor.compress(block)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def binary_signal_response(columns, channels, fs, request, extra=None, digital=None):
+    """
+    Stream ``columns`` (shape ``(n_channels, n_samples)``) as float32 in the
+    binary format above. With ``digital=(gain, baseline, invalid)``,
+    ``columns`` are int16 digital samples and are sent as such.
+    ``extra`` is merged into the JSON header.
+    """
+    meta = {"channels": list(channels), "fs": fs}
+    if digital is not None:
+        gain, baseline, invalid = digital
+        data = np.ascontiguousarray(columns, dtype="<i2")
+        meta.update(dtype="int16", gain=[float(g) for g in gain], baseline=[float(b) for b in baseline],
+                    invalid=[int(v) for v in invalid])
+    else:
+        data = np.ascontiguousarray(columns, dtype="<f4")
+        meta["dtype"] = "float32"
+    meta.update(shape=list(data.shape), layout="channels-first")
+    if extra:
+        meta.update(extra)
+
+    blocks = _iter_payload(encode_header(meta), data)
+    encoding = _choose_encoding(request)
+    if encoding == "gzip":
+        blocks = _gzip_stream(blocks)
+    elif encoding == "zstd":
+        blocks = _zstd_stream(blocks)
+
+    response = StreamingHttpResponse(blocks, content_type=BINARY_CONTENT_TYPE)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept, Accept-Encoding"
+    return response
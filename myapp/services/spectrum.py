@@ -0,0 +1,150 @@
+"""
+Spectral analysis shared by the audio endpoints.
+
+``analyse`` decodes an upload once and returns its magnitude spectrum, fmax
+(highest frequency above 1% of the peak) and Nyquist rate. Clips up to
+``SPECTRUM_EXACT_MAX_SAMPLES`` get a single ``rfft`` padded to a fast length;
+longer clips are Welch-averaged block by block so memory stays bounded.
+Results are cached in memory by upload content hash, together with the
+decoded mono samples when they fit, so the repeated /analyze/ and /resample/
+calls made while dragging the sampling-rate slider skip decode and FFT.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from scipy.fft import rfft, rfftfreq, next_fast_len
+from scipy.signal import get_window
+
+from myapp.services import audio_stream, signal_cache
+
+
+WELCH_NFFT = getattr(settings, "AUDIO_SPECTRUM_NFFT", 65536)
+EXACT_MAX_SAMPLES = getattr(settings, "SPECTRUM_EXACT_MAX_SAMPLES", 2 ** 22)
+CACHE_MAX_BYTES = getattr(settings, "AUDIO_CACHE_MAX_BYTES", 512 * 1024 ** 2)
+FMAX_RATIO = 0.01
+
+_cache = OrderedDict()  # key -> AudioAnalysis, least recently used first
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+class AudioAnalysis:
+    """Decoded-audio summary: spectrum, fmax, Nyquist rate and (if cached) the mono samples."""
+
+    def __init__(self, key, samplerate, frames, freqs, magnitude, samples=None):
+        self.key = key
+        self.samplerate = samplerate
+        self.frames = frames
+        self.freqs = freqs
+        self.magnitude = magnitude
+        self.samples = samples
+        self.fmax = fmax_threshold(freqs, magnitude)
+        self.nyquist_freq = 2 * self.fmax
+
+    @property
+    def nbytes(self):
+        samples = self.samples.nbytes if self.samples is not None else 0
+        return self.freqs.nbytes + self.magnitude.nbytes + samples
+
+
+class StreamingSpectrum:
+    """
+    Magnitude spectrum averaged over Hann-windowed, half-overlapping frames
+    (Welch), fed block by block. Clips shorter than one frame get a single
+    zero-padded frame.
+    """
+
+    def __init__(self, samplerate, frames, nfft=WELCH_NFFT):
+        self.samplerate = samplerate
+        self.nfft = min(nfft, next_fast_len(max(int(frames), 2), real=True))
+        self.hop = self.nfft // 2
+        self.window = get_window("hann", self.nfft).astype(np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._power = np.zeros(self.nfft // 2 + 1)
+        self._count = 0
+
+    def update(self, block):
+        data = np.concatenate([self._carry, block])
+        n_frames = 0 if len(data) < self.nfft else (len(data) - self.nfft) // self.hop + 1
+        for k in range(n_frames):
+            frame = data[k * self.hop:k * self.hop + self.nfft]
+            self._power += np.abs(rfft(frame * self.window)) ** 2
+        self._count += n_frames
+        self._carry = data[n_frames * self.hop:]
+
+    def finish(self):
+        """Return (freqs, magnitude) of the averaged spectrum."""
+        if self._count == 0:
+            frame = np.zeros(self.nfft, dtype=np.float32)
+            frame[:len(self._carry)] = self._carry[:self.nfft]
+            self._power += np.abs(rfft(frame * self.window)) ** 2
+            self._count = 1
+        freqs = rfftfreq(self.nfft, 1 / self.samplerate)
+        return freqs, np.sqrt(self._power / self._count).astype(np.float32)
+
+
+def magnitude_spectrum(x, samplerate):
+    """(freqs, magnitude) of one rfft over the whole signal, zero-padded to a fast length."""
+    n = next_fast_len(max(len(x), 2), real=True)
+    return rfftfreq(n, 1 / samplerate), np.abs(rfft(x, n)).astype(np.float32)
+
+
+def fmax_threshold(freqs, magnitude, ratio=FMAX_RATIO):
+    """Highest frequency whose magnitude exceeds ``ratio`` of the peak."""
+    significant = np.flatnonzero(magnitude > np.max(magnitude) * ratio)
+    if len(significant) > 0:
+        return float(freqs[significant[-1]])
+    return float(freqs[np.argmax(magnitude)])
+
+
+def analyse(audio_file, key=None):
+    """
+    Spectrum of ``audio_file`` as an ``AudioAnalysis``, served from the cache
+    when possible. ``key`` skips hashing when the content hash is already known.
+    """
+    key = key or signal_cache.content_key("audio", audio_file)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+
+    with audio_stream.AudioStream(audio_file) as stream:
+        samplerate, frames = stream.samplerate, stream.frames
+        keep = frames * 4 <= CACHE_MAX_BYTES // 4
+        if frames <= EXACT_MAX_SAMPLES:
+            samples = np.concatenate(list(stream) or [np.zeros(0, dtype=np.float32)])
+            freqs, magnitude = magnitude_spectrum(samples, samplerate)
+        else:
+            welch = StreamingSpectrum(samplerate, frames)
+            blocks = []
+            for block in stream:
+                welch.update(block)
+                if keep:
+                    blocks.append(block)
+            freqs, magnitude = welch.finish()
+            samples = np.concatenate(blocks) if keep else None
+
+    analysis = AudioAnalysis(key, samplerate, frames, freqs, magnitude, samples if keep else None)
+    _remember(analysis)
+    return analysis
+
+
+def _remember(analysis):
+    global _cache_bytes
+    with _lock:
+        if analysis.key in _cache:
+            return
+        _cache[analysis.key] = analysis
+        _cache_bytes += analysis.nbytes
+        while _cache_bytes > CACHE_MAX_BYTES and len(_cache) > 1:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.nbytes
+
+
+def cache_stats():
+    """Entry count and bytes held by the analysis cache."""
+    with _lock:
+        return {"entries": len(_cache), "bytes": _cache_bytes, "max_bytes": CACHE_MAX_BYTES}
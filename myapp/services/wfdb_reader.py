@@ -0,0 +1,117 @@
+"""
+Windowed access to cached WFDB (.dat/.hea) records.
+
+``describe`` reads only the header, so the ECG page can lay itself out
+(leads, sampling rate, duration) before any sample is read. Windows are read
+with ``rdrecord(sampfrom=, sampto=, channels=)``, so server memory is bounded
+by the requested window rather than by the record length.
+
+Records stored with at most 16 bits per sample (``DIGITAL_FORMATS``) are read
+as their int16 digital samples (``read_digital``) plus per-lead gain and
+baseline, i.e. physical = (digital - baseline) / gain. ``read_window``
+converts those to float32 in place; the binary transport can ship them as
+int16 and leave the conversion to the browser.
+"""
+import glob
+import os
+
+import numpy as np
+
+
+# Digital value marking a missing sample, per format of at most 16 bits per sample (as in
+# WFDB's signal spec). Format 8 stores first differences and has no such value, so its
+# records are read as physical samples.
+INVALID_VALUES = {
+    "16": -32768, "61": -32768, "160": -32768, "516": -32768,
+    "212": -2048,
+    "310": -512, "311": -512,
+    "80": -128, "508": -128,
+}
+DIGITAL_FORMATS = set(INVALID_VALUES)
+
+
+def record_base(entry):
+    """Record path without extension (what wfdb expects) of a source-only entry."""
+    headers = glob.glob(os.path.join(entry["source_dir"], "*.hea"))
+    if not headers:
+        raise FileNotFoundError("No .hea file in cached record")
+    return os.path.splitext(headers[0])[0]
+
+
+def header_info(header):
+    """Leads, sampling rate, length and units of a parsed ``wfdb.Record`` header."""
+    fs = float(header.fs or 0)
+    n_samples = int(header.sig_len or 0)
+    return {
+        "channels": list(header.sig_name or []),
+        "fs": int(fs) if fs.is_integer() else fs,
+        "n_samples": n_samples,
+        "units": list(header.units or []),
+        "duration": n_samples / fs if fs > 0 else 0.0,
+        "fmt": list(header.fmt or []),
+    }
+
+
+def describe_path(base):
+    """Header-only metadata of the record at ``base`` (no .dat read)."""
+    import wfdb
+    return header_info(wfdb.rdheader(base))
+
+
+def describe(entry):
+    """Channels, sampling rate and length of a source-only record, without reading samples."""
+    return describe_path(record_base(entry))
+
+
+def supports_digital(entry):
+    """True when every lead of the record fits int16 digital samples."""
+    fmt = entry.get("fmt")
+    return bool(fmt) and all(f in DIGITAL_FORMATS for f in fmt)
+
+
+def read_digital(entry, start, stop, picks=None):
+    """
+    Samples ``[start, stop)`` of leads ``picks`` as int16 ``(n_picks, n)``,
+    with the float32 ``gain``, ``baseline`` and ``invalid`` (missing-sample
+    marker) of each lead.
+    """
+    import wfdb
+
+    fmt = entry["fmt"]
+    rows = list(range(len(fmt))) if picks is None else list(picks)
+    if stop <= start or not rows:
+        data = np.zeros((len(rows), 0), dtype=np.int16)
+        header = wfdb.rdheader(record_base(entry))
+        gain = [header.adc_gain[r] for r in rows]
+        baseline = [header.baseline[r] for r in rows]
+    else:
+        record = wfdb.rdrecord(record_base(entry), sampfrom=int(start), sampto=int(stop), channels=rows,
+                               physical=False, return_res=16)
+        data = np.ascontiguousarray(record.d_signal.T, dtype=np.int16)
+        gain, baseline = record.adc_gain, record.baseline
+    invalid = [INVALID_VALUES[fmt[r]] for r in rows]
+    return (data, np.asarray(gain, dtype=np.float32), np.asarray(baseline, dtype=np.float32),
+            np.asarray(invalid, dtype=np.int16))
+
+
+def to_physical(data, gain, baseline, invalid):
+    """float32 physical values of int16 digital samples; missing samples become NaN."""
+    out = data.astype(np.float32)
+    out -= baseline[:, None]
+    out /= gain[:, None]
+    out[data == invalid[:, None]] = np.nan
+    return out
+
+
+def read_window(entry, start, stop, picks=None):
+    """Samples ``[start, stop)`` of leads ``picks`` as float32 ``(n_picks, n)``."""
+    import wfdb
+
+    if supports_digital(entry):
+        return to_physical(*read_digital(entry, start, stop, picks))
+    n_picks = len(entry["channels"]) if picks is None else len(picks)
+    if stop <= start or n_picks == 0:
+        return np.zeros((n_picks, 0), dtype=np.float32)
+    record = wfdb.rdrecord(record_base(entry), sampfrom=int(start), sampto=int(stop),
+                           channels=None if picks is None else list(picks), return_res=32)
+    return np.ascontiguousarray(record.p_signal.T, dtype=np.float32)
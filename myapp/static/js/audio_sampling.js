@@ -13,6 +13,8 @@ const predictedGender = document.getElementById("predictedGender");
 const confidenceLevel = document.getElementById("confidenceLevel");
 const processedAudioPlayer = document.getElementById("processedAudioPlayer");
 let nyquistFreq = 0;
+let audioId = null; // session id returned by /analyze/; renditions are fetched by rate
+let resampleTimer = null;
 
 function showError(message) {
   errorBox.textContent = message;
@@ -52,6 +54,7 @@ async function analyzeAudio() {
 
     if (data.success) {
       nyquistFreq = data.nyquist_freq;
+      audioId = data.audio_id;
 
       document.getElementById("fmax").textContent = data.fmax;
       document.getElementById("nyquist").textContent = data.nyquist_freq;
@@ -89,32 +92,23 @@ function updateSliderDisplay() {
   }
 }
 
-async function resampleAudio() {
-  const file = audioFileInput.files[0];
-  console.log(file);
-  if (!file) {
-    showError("Please select an audio file");
+function resampleAudio() {
+  if (!audioId) {
+    showError("Please analyze an audio file first");
     return;
   }
 
-  const formData = new FormData();
-  formData.append("audio", file);
+  // The server keeps the uploaded clip; each rate is a plain GET of a WAV
+  // that the browser can stream and seek with Range requests.
   const samplingRate = parseInt(samplingSlider.value);
-  formData.append("sampling_rate", samplingRate);
-  console.log(formData);
-
-  try {
-    const response = await fetch("/resample/", {
-      method: "POST",
-      body: formData,
-    });
+  audioPlayer.src = `/audio/${audioId}/rate/${samplingRate}/`;
+}
 
-    const data = await response.json();
-    audioPlayer.src = data.audio_data;
-  } catch (error) {
-    showError("Error: " + error.message);
-  }
+function scheduleResample(delay = 150) {
+  clearTimeout(resampleTimer);
+  resampleTimer = setTimeout(resampleAudio, delay);
 }
+
 async function predictAudio() {
   const file = predictAudioInput.files[0];
   if (!file) {
@@ -157,5 +151,9 @@ async function predictAudio() {
 
 samplingSlider.addEventListener("input", () => {
   updateSliderDisplay();
-  resampleAudio();
+  scheduleResample();
+});
+
+audioFileInput.addEventListener("change", () => {
+  audioId = null;
 });
@@ -21,6 +21,7 @@ document.getElementById("simulateBtn").addEventListener("click", async () => {
         velocity: vel,
         duration: dur,
         fs: fs, // Send sampling rate to backend
+        points: 2000, // plot series are evaluated at this many instants
       }),
     });
 
@@ -34,29 +35,27 @@ document.getElementById("simulateBtn").addEventListener("click", async () => {
       return;
     }
 
-    // --- Audio playback ---
-    const audioBlob = base64ToBlob(data.audio, "audio/wav");
-    const audioURL = URL.createObjectURL(audioBlob);
+    // --- Audio playback (WAV is streamed as it is synthesised) ---
     const player = document.getElementById("audioPlayer");
-    player.src = audioURL;
+    player.src = data.audio_url;
     player.play();
 
-    // --- Plot amplitude vs time ---
-    plotChart(
-      "ampChart",
-      "Amplitude vs Time",
-      data.time,
-      data.amplitude,
-      "#0059b3"
-    );
+    // --- Plot amplitude envelope vs time ---
+    plotChart("ampChart", data.time, [
+      { label: "Amplitude envelope", data: data.envelope, color: "#0059b3" },
+      { label: "", data: data.envelope.map((v) => -v), color: "#0059b3" },
+    ]);
 
-    // --- Plot frequency vs time ---
+    // --- Plot frequency vs time (one line per source) ---
+    const palette = ["#ff9800", "#e91e63", "#4caf50", "#9c27b0", "#00bcd4"];
     plotChart(
       "freqChart",
-      "Frequency vs Time",
       data.time,
-      data.frequency,
-      "#ff9800"
+      data.frequency.map((series, i) => ({
+        label: data.frequency.length > 1 ? `Frequency vs Time (source ${i + 1})` : "Frequency vs Time",
+        data: series,
+        color: palette[i % palette.length],
+      }))
     );
 
     // --- Show results ---
@@ -72,36 +71,27 @@ document.getElementById("simulateBtn").addEventListener("click", async () => {
   }
 });
 
-// Helper: Convert Base64 to Blob
-function base64ToBlob(base64, type = "application/octet-stream") {
-  const binary = atob(base64);
-  const bytes = new Uint8Array(binary.length);
-  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
-  return new Blob([bytes], { type });
-}
-
 // Helper: Plot chart
 let charts = {};
-function plotChart(canvasId, label, xData, yData, color) {
+function plotChart(canvasId, xData, series) {
   const ctx = document.getElementById(canvasId).getContext("2d");
   if (charts[canvasId]) charts[canvasId].destroy();
   charts[canvasId] = new Chart(ctx, {
     type: "line",
     data: {
       labels: xData,
-      datasets: [
-        {
-          label,
-          data: yData,
-          borderColor: color,
-          borderWidth: 2,
-          pointRadius: 0,
-          tension: 0.1,
-        },
-      ],
+      datasets: series.map(({ label, data, color }) => ({
+        label,
+        data,
+        borderColor: color,
+        borderWidth: 2,
+        pointRadius: 0,
+        tension: 0.1,
+      })),
     },
     options: {
       responsive: true,
+      plugins: { legend: { labels: { filter: (item) => item.text } } },
       scales: {
         x: { display: false },
       },
@@ -1,6 +1,10 @@
 const analyzeBtn = document.getElementById("analyzeBtn");
 const resampleBtn = document.getElementById("resampleBtn");
 const classifyBtn = document.getElementById("classifyBtn");
+const timelineBtn = document.getElementById("timelineBtn");
+const timelineDiv = document.getElementById("timeline");
+const timelineStatus = document.getElementById("timelineStatus");
+const timelineRows = document.getElementById("timelineRows");
 const resultDiv = document.getElementById("result");
 const classificationSpan = document.getElementById("classification");
 const confidenceSpan = document.getElementById("confidence");
@@ -57,6 +61,16 @@ classifyBtn.addEventListener("click", async () => {
   await classifyAudio();
 });
 
+// Step 4: Sliding-window detection over the whole (long) recording
+timelineBtn.addEventListener("click", async () => {
+  if (!currentAudioFile) {
+    alert("Please analyze an audio file first!");
+    return;
+  }
+
+  await detectTimeline(currentAudioFile);
+});
+
 // Update slider value display
 resampleSlider.addEventListener("input", (e) => {
   resampleValueSpan.textContent = e.target.value;
@@ -210,3 +224,64 @@ async function classifyAudio() {
 
   loadingDiv.style.display = "none";
 }
+
+// Stream the per-window timeline (NDJSON, one event per line) and render rows as they arrive
+async function detectTimeline(audioFile) {
+  const formData = new FormData();
+  formData.append("audio", audioFile);
+
+  timelineRows.innerHTML = "";
+  timelineStatus.textContent = "Processing...";
+  timelineDiv.style.display = "block";
+
+  try {
+    const response = await fetch("http://127.0.0.1:8000/drones/timeline/", {
+      method: "POST",
+      body: formData,
+    });
+    if (!response.ok) {
+      const data = await response.json();
+      throw new Error(data.error || response.statusText);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = "";
+    let duration = 0;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      pending += decoder.decode(value, { stream: true });
+      const lines = pending.split("\n");
+      pending = lines.pop();
+      for (const line of lines) {
+        if (!line) continue;
+        const event = JSON.parse(line);
+        if (event.type === "meta") {
+          duration = event.duration;
+        } else if (event.type === "window") {
+          if (!event.gated) addTimelineRow(event);
+          timelineStatus.textContent = `Processed ${event.end.toFixed(1)} / ${duration.toFixed(1)} s`;
+        } else if (event.type === "error") {
+          throw new Error(event.error);
+        } else if (event.type === "summary") {
+          timelineStatus.textContent =
+            `${event.windows} windows: ${event.classified} classified, ${event.gated} skipped as silent` +
+            (event.top ? ` — mostly "${event.top}"` : "");
+        }
+      }
+    }
+  } catch (error) {
+    timelineStatus.textContent = "Detection failed: " + error.message;
+  }
+}
+
+function addTimelineRow(event) {
+  const row = document.createElement("tr");
+  [event.start.toFixed(1), event.end.toFixed(1), event.label, event.confidence, event.rms_db].forEach((value) => {
+    const cell = document.createElement("td");
+    cell.textContent = value;
+    row.appendChild(cell);
+  });
+  timelineRows.appendChild(row);
+}
@@ -4,27 +4,139 @@ document.getElementById("load-btn").addEventListener("click", function () {
     alert("Please enter a folder path.");
     return;
   }
+  const cmap = document.getElementById("cmap").value;
 
   const formData = new URLSearchParams();
   formData.append("folder_path", folderPath);
+  formData.append("format", "png"); // binary image; metadata comes in X-Sar-Info
+  formData.append("cmap", cmap);
+  const polarisation = document.getElementById("polarisation").value;
+  if (polarisation) formData.append("polarisation", polarisation);
 
-  fetch("{% url 'process_sar' %}", {
+  const outputDiv = document.getElementById("output");
+  fetch("/sar/process/", {
     method: "POST",
     headers: {
       "Content-Type": "application/x-www-form-urlencoded",
     },
     body: formData.toString(),
   })
-    .then((response) => response.json())
-    .then((data) => {
-      const outputDiv = document.getElementById("output");
-      if (data.error) {
+    .then(async (response) => {
+      const type = response.headers.get("Content-Type") || "";
+      if (!type.startsWith("image/")) {
+        const data = await response.json();
         outputDiv.innerHTML = `<p style="color:red;">${data.error}</p>`;
-      } else if (data.image) {
-        outputDiv.innerHTML = `<img src="${data.image}" style="max-width: 100%;">`;
+        return;
       }
+      const info = JSON.parse(response.headers.get("X-Sar-Info"));
+      const bitmap = await createImageBitmap(await response.blob());
+      outputDiv.innerHTML = "";
+      outputDiv.appendChild(drawWithAxes(bitmap, info));
+      showTiles(info.tiles, cmap);
     })
     .catch((error) => {
       alert("An error occurred: " + error);
     });
 });
+
+// Image with title, tick labels and axis labels drawn on a canvas
+function drawWithAxes(bitmap, info) {
+  const margin = { left: 70, right: 20, top: 50, bottom: 50 };
+  const plotW = Math.min(1000, bitmap.width);
+  const plotH = Math.round(plotW * 0.8);
+  const canvas = document.createElement("canvas");
+  canvas.width = plotW + margin.left + margin.right;
+  canvas.height = plotH + margin.top + margin.bottom;
+  canvas.style.maxWidth = "100%";
+  const ctx = canvas.getContext("2d");
+  ctx.fillStyle = "#fff";
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+  ctx.drawImage(bitmap, margin.left, margin.top, plotW, plotH);
+
+  ctx.fillStyle = "#000";
+  ctx.strokeStyle = "#000";
+  ctx.font = "12px sans-serif";
+  ctx.strokeRect(margin.left, margin.top, plotW, plotH);
+
+  const ticks = (extent, pixels, along) => {
+    const step = niceStep(extent / 6);
+    for (let v = 0; v <= extent; v += step) {
+      const p = (v / extent) * pixels;
+      along(p, String(v));
+    }
+  };
+  ctx.textAlign = "center";
+  ticks(info.source_width, plotW, (p, label) => {
+    ctx.beginPath();
+    ctx.moveTo(margin.left + p, margin.top + plotH);
+    ctx.lineTo(margin.left + p, margin.top + plotH + 5);
+    ctx.stroke();
+    ctx.fillText(label, margin.left + p, margin.top + plotH + 18);
+  });
+  ctx.textAlign = "right";
+  ticks(info.source_height, plotH, (p, label) => {
+    ctx.beginPath();
+    ctx.moveTo(margin.left - 5, margin.top + p);
+    ctx.lineTo(margin.left, margin.top + p);
+    ctx.stroke();
+    ctx.fillText(label, margin.left - 8, margin.top + p + 4);
+  });
+
+  ctx.textAlign = "center";
+  ctx.fillText("Range bins", margin.left + plotW / 2, canvas.height - 12);
+  ctx.font = "14px sans-serif";
+  const band = info.polarisation ? ` ${info.swath} ${info.polarisation}` : "";
+  ctx.fillText(`Sentinel-1 GRD Image (dB)${band} — ${info.file_name}`, margin.left + plotW / 2, 22);
+  ctx.font = "12px sans-serif";
+  ctx.fillText(
+    `${info.db_range[0].toFixed(1)} to ${info.db_range[1].toFixed(1)} dB`,
+    margin.left + plotW / 2,
+    40
+  );
+  ctx.save();
+  ctx.translate(16, margin.top + plotH / 2);
+  ctx.rotate(-Math.PI / 2);
+  ctx.fillText("Azimuth lines", 0, 0);
+  ctx.restore();
+  return canvas;
+}
+
+function niceStep(raw) {
+  const power = Math.pow(10, Math.floor(Math.log10(raw)));
+  const unit = raw / power;
+  return (unit < 1.5 ? 1 : unit < 3.5 ? 2 : unit < 7.5 ? 5 : 10) * power;
+}
+
+// Pan/zoom viewer over the server-side tile pyramid (level max_zoom = full resolution)
+let tileMap = null;
+function showTiles(tiles, cmap = "gray") {
+  const container = document.getElementById("tile-map");
+  container.style.display = "block";
+  if (tileMap) tileMap.remove();
+
+  tileMap = L.map(container, { crs: L.CRS.Simple, minZoom: 0, maxZoom: tiles.max_zoom });
+  const bounds = L.latLngBounds(
+    tileMap.unproject([0, tiles.height], tiles.max_zoom),
+    tileMap.unproject([tiles.width, 0], tiles.max_zoom)
+  );
+  L.tileLayer(`${tiles.url}?cmap=${cmap}`, {
+    tileSize: tiles.tile_size,
+    minZoom: 0,
+    maxZoom: tiles.max_zoom,
+    noWrap: true,
+    bounds: bounds,
+  }).addTo(tileMap);
+  tileMap.setMaxBounds(bounds.pad(0.1));
+  tileMap.fitBounds(bounds);
+
+  // Axes: cursor position in range bins / azimuth lines
+  const Position = L.Control.extend({
+    onAdd: () => L.DomUtil.create("div", "leaflet-control-attribution"),
+  });
+  const position = new Position({ position: "bottomleft" }).addTo(tileMap);
+  tileMap.on("mousemove", (e) => {
+    const p = tileMap.project(e.latlng, tiles.max_zoom);
+    position.getContainer().textContent =
+      `Range bin ${Math.round(p.x)}, azimuth line ${Math.round(p.y)}`;
+  });
+}
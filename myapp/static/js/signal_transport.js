@@ -0,0 +1,177 @@
+// Decoder for the binary columnar signal format (myapp/services/signal_transport.py).
+// Signals are returned channel-first: columns[ch] is a Float32Array of samples.
+// int16 digital payloads are converted to physical units here:
+// (digital - baseline) / gain, NaN for the channel's invalid marker.
+
+function decodeSignalBuffer(buffer) {
+  const view = new DataView(buffer);
+  const headerLen = view.getUint32(0, true);
+  const header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 4, headerLen))
+  );
+  const offset = 4 + headerLen + ((4 - ((4 + headerLen) % 4)) % 4);
+  const [nChannels, nSamples] = header.shape;
+  const columns = [];
+  if (header.dtype === "int16") {
+    const flat = new Int16Array(buffer, offset, nChannels * nSamples);
+    for (let ch = 0; ch < nChannels; ch++) {
+      const digital = flat.subarray(ch * nSamples, (ch + 1) * nSamples);
+      const col = new Float32Array(nSamples);
+      const gain = header.gain[ch];
+      const baseline = header.baseline[ch];
+      const invalid = header.invalid[ch];
+      for (let i = 0; i < nSamples; i++) {
+        const v = digital[i];
+        col[i] = v === invalid ? NaN : (v - baseline) / gain;
+      }
+      columns.push(col);
+    }
+    return { ...header, columns };
+  }
+  const flat = new Float32Array(buffer, offset, nChannels * nSamples);
+  for (let ch = 0; ch < nChannels; ch++) {
+    columns.push(flat.subarray(ch * nSamples, (ch + 1) * nSamples));
+  }
+  return { ...header, columns };
+}
+
+// Convert the legacy JSON rows ([[ch0, ch1, ...], ...]) into columns.
+function rowsToColumns(rows, nChannels) {
+  const columns = [];
+  for (let ch = 0; ch < nChannels; ch++) {
+    const col = new Float32Array(rows.length);
+    for (let i = 0; i < rows.length; i++) col[i] = rows[i][ch];
+    columns.push(col);
+  }
+  return columns;
+}
+
+function binaryUrl(url) {
+  const sep = url.includes("?") ? "&" : "?";
+  return url + sep + "format=binary&compress=gzip&samples=digital";
+}
+
+async function readSignalResponse(response) {
+  const type = response.headers.get("Content-Type") || "";
+  if (type.startsWith("application/octet-stream")) {
+    return decodeSignalBuffer(await response.arrayBuffer());
+  }
+  const data = await response.json();
+  if (data.error) return data;
+  const channels = data.channels || [];
+  return { ...data, columns: rowsToColumns(data.signals || [], channels.length) };
+}
+
+// POST formData to url asking for the binary format; falls back to JSON.
+// Resolves to { channels, fs, columns, ... } or { error }.
+async function fetchSignals(url, formData) {
+  const response = await fetch(binaryUrl(url), {
+    method: "POST",
+    body: formData,
+    headers: { Accept: "application/octet-stream, application/json" },
+  });
+  return readSignalResponse(response);
+}
+
+// GET a page of an already uploaded signal, same result shape as fetchSignals.
+async function fetchSignalPage(url) {
+  const response = await fetch(binaryUrl(url), {
+    headers: { Accept: "application/octet-stream, application/json" },
+  });
+  return readSignalResponse(response);
+}
+
+function numSamples(columns) {
+  return columns.length ? columns[0].length : 0;
+}
+
+// Min/max without spreading (Math.min(...arr) overflows the stack on long arrays).
+function minMax(arr) {
+  let min = Infinity;
+  let max = -Infinity;
+  for (let i = 0; i < arr.length; i++) {
+    const v = arr[i];
+    if (v < min) min = v;
+    if (v > max) max = v;
+  }
+  return [min, max];
+}
+
+// Evenly spaced index picking of every column down to `count` samples.
+function pickColumns(columns, count) {
+  const len = numSamples(columns);
+  const idx = new Uint32Array(count);
+  for (let i = 0; i < count; i++) {
+    idx[i] = Math.round((i * (len - 1)) / Math.max(1, count - 1));
+  }
+  return columns.map((col) => Float32Array.from(idx, (j) => col[j]));
+}
+
+// Server-side min/max (or LTTB) decimation of a cached upload between
+// startSec and stopSec for a plot `width` pixels wide.
+// Resolves to { channels, x: [[...]], y: [[...]] } or { error }.
+async function fetchWindow(signalId, startSec, stopSec, width, picks, method = "minmax") {
+  const params = new URLSearchParams({
+    start: startSec,
+    stop: stopSec,
+    width: Math.round(width),
+    channels: picks.join(","),
+    method,
+  });
+  const response = await fetch(`/signals/${signalId}/window/?${params}`);
+  return response.json();
+}
+
+// Server-side pair analysis of a cached upload: kind is "histogram" (joint
+// amplitude histogram) or "recurrence" (cross-recurrence matrix).
+async function fetchPairAnalysis(signalId, kind, params) {
+  const query = new URLSearchParams(params);
+  const response = await fetch(`/signals/${signalId}/${kind}/?${query}`);
+  return response.json();
+}
+
+// Plot a fetchPairAnalysis result into `target`; `unit` labels the histogram axes.
+function plotPairAnalysis(target, kind, data, name1, name2, unit) {
+  if (kind === "histogram") {
+    Plotly.react(
+      target,
+      [
+        {
+          z: data.z,
+          x: data.x,
+          y: data.y,
+          type: "heatmap",
+          colorscale: "Viridis",
+          colorbar: { title: "Frequency" },
+        },
+      ],
+      {
+        title: `Recurrence Heatmap: ${name1} vs ${name2}`,
+        xaxis: { title: `${name1} Amplitude (${unit})` },
+        yaxis: { title: `${name2} Amplitude (${unit})` },
+      }
+    );
+    return;
+  }
+  Plotly.react(
+    target,
+    [
+      {
+        z: data.z,
+        x: data.times,
+        y: data.times,
+        type: "heatmap",
+        colorscale: [
+          [0, "white"],
+          [1, "black"],
+        ],
+        showscale: false,
+      },
+    ],
+    {
+      title: `Cross-Recurrence: ${name1} vs ${name2} (eps = ${data.eps.toFixed(3)})`,
+      xaxis: { title: `${name2} time (s)` },
+      yaxis: { title: `${name1} time (s)` },
+    }
+  );
+}
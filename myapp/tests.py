@@ -1,3 +1,1423 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from multiprocessing import connection, shared_memory
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+
+from myapp.models import SafeProduct
+from myapp.services import (batching, decimation, doppler_scene, drone_timeline, eeg_reader, image_encoding, inference_worker,
+                            metrics, model_registry, offload, reconstruction, recurrence, resampling, safe_index,
+                            sar_pipeline, sar_render, sar_tiles, signal_cache, signal_transport, spectrum,
+                            wfdb_reader)
+from myapp.views import lazy
+from myapp.views.audio_sampling_view import _range_response
+
+
+# -------------------------------
+# Model registry
+# -------------------------------
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+
+    def count_params(self):
+        return self.size // 4
+
+
+class ModelRegistryTests(SimpleTestCase):
+    task = "test-task"
+
+    def setUp(self):
+        self.loads = []
+        self.fail = False
+
+        def load(task, model_id, device):
+            self.loads.append(model_id)
+            if self.fail:
+                raise OSError(f"cannot load {model_id}")
+            return FakeModel(int(model_id.split("-")[1]) * 1024 ** 2)
+
+        patcher = mock.patch.dict(model_registry.LOADERS, {self.task: load})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        model_registry.clear()
+        self.addCleanup(model_registry.clear)
+
+    def test_loads_once_and_counts_hits(self):
+        first = model_registry.get_model(self.task, "m-1", device=-1)
+        self.assertIs(model_registry.get_model(self.task, "m-1", device=-1), first)
+        self.assertEqual(self.loads, ["m-1"])
+        stats = {s["model_id"]: s for s in model_registry.registry_stats()}
+        self.assertGreaterEqual(stats["m-1"]["hits"], 1)
+        self.assertEqual(stats["m-1"]["size_bytes"], 1024 ** 2)
+
+    def test_concurrent_first_calls_share_one_load(self):
+        threads = [threading.Thread(target=model_registry.get_model, args=(self.task, "m-2", -1)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.loads, ["m-2"])
+
+    def test_least_recently_used_model_is_evicted_over_budget(self):
+        with mock.patch.object(model_registry, "MEMORY_BUDGET_MB", 5):
+            model_registry.get_model(self.task, "a-2", device=-1)
+            model_registry.get_model(self.task, "b-2", device=-1)
+            model_registry.get_model(self.task, "a-2", device=-1)  # b is now least recently used
+            model_registry.get_model(self.task, "c-2", device=-1)
+        resident = {s["model_id"] for s in model_registry.registry_stats() if s["resident"]}
+        self.assertEqual(resident, {"a-2", "c-2"})
+
+    def test_failed_load_backs_off_then_retries(self):
+        self.fail = True
+        now = [1000.0]
+        with mock.patch.object(model_registry.time, "monotonic", lambda: now[0]), \
+                mock.patch.object(model_registry, "RETRY_SECS", 10), \
+                mock.patch.object(model_registry, "MAX_RETRY_SECS", 15):
+            # Loads at t=0, 10 (back-off 10 s), 25 (doubled, capped at 15 s), 40
+            for expected_loads, advance in ((1, 9), (1, 1), (2, 14), (2, 1), (3, 15)):
+                with self.assertRaises(OSError):
+                    model_registry.get_model(self.task, "m-1", device=-1)
+                self.assertEqual(len(self.loads), expected_loads)
+                now[0] += advance
+            self.fail = False
+            self.assertIsInstance(model_registry.get_model(self.task, "m-1", device=-1), FakeModel)
+            self.assertEqual(len(self.loads), 4)
+
+
+# -------------------------------
+# Batching scheduler
+# -------------------------------
+class BatchSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+    def infer(self, items):
+        self.calls.append(list(items))
+        return [f"result-{item}" for item in items]
+
+    def test_buckets_group_similar_lengths(self):
+        scheduler = batching.BatchScheduler(self.infer, length_fn=len, bucket_ratio=2.0)
+        entries = [(s, None, 0) for s in ["aaaaaaaaaa", "a", "aa", "aaaaa", "aaa", "aaaaaaaaaaaaaaaaaaaa"]]
+        lengths = [[len(item) for item, _, _ in bucket] for bucket in scheduler._buckets(entries)]
+        self.assertEqual(lengths, [[1, 2], [3, 5], [10, 20]])
+
+    def test_results_fan_out_to_concurrent_callers(self):
+        scheduler = batching.BatchScheduler(self.infer, max_batch_size=8, window_ms=200, length_fn=lambda item: 1)
+        results = {}
+
+        def call(i):
+            results[i] = scheduler.submit(i)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        self.assertEqual(scheduler.submit_many([10, 11]), ["result-10", "result-11"])
+        for t in threads:
+            t.join()
+        self.assertEqual(results, {i: f"result-{i}" for i in range(6)})
+        self.assertLess(len(self.calls), 8)  # callers shared forward passes
+        self.assertEqual(scheduler.stats()["items"], 8)
+
+    def test_short_result_list_fails_leftover_callers(self):
+        scheduler = batching.BatchScheduler(lambda items: ["only one"], window_ms=100, length_fn=lambda item: 1)
+        with self.assertRaisesRegex(RuntimeError, "1 results for 3 inputs"):
+            scheduler.submit_many(["a", "b", "c"], timeout=5)
+
+    def test_infer_exception_reaches_every_caller(self):
+        def infer(items):
+            raise ValueError("model failed")
+        scheduler = batching.BatchScheduler(infer, length_fn=lambda item: 1)
+        with self.assertRaisesRegex(ValueError, "model failed"):
+            scheduler.submit("a", timeout=5)
+
+    def test_waits_are_bounded(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def infer(items):
+            release.wait(5)
+            return items
+        scheduler = batching.BatchScheduler(infer, length_fn=lambda item: 1)
+        with self.assertRaises(TimeoutError):
+            scheduler.submit("a", timeout=0.1)
+
+
+# -------------------------------
+# Anti-aliasing reconstruction
+# -------------------------------
+class MovingAverageModel:
+    """Keras-like model: 5-tap moving average of each frame, counting calls."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def _forward(self, x):
+        kernel = np.ones(5, dtype=np.float32) / 5
+        return np.stack([np.convolve(f[:, 0], kernel, mode="same")[:, None] for f in x])
+
+    def predict(self, x, verbose=0):
+        return self._forward(x)
+
+    def predict_on_batch(self, x):
+        self.batch_sizes.append(len(x))
+        return self._forward(x)
+
+
+def loop_reconstruction(model, y, model_len):
+    """The per-chunk predict loop reconstruct replaced."""
+    chunks = []
+    for i in range(0, len(y), model_len):
+        chunk = y[i:i + model_len]
+        len_chunk = len(chunk)
+        if len_chunk < model_len:
+            chunk = np.pad(chunk, (0, model_len - len_chunk), mode='constant')
+        pred = np.squeeze(model.predict(chunk[np.newaxis, ..., np.newaxis], verbose=0))
+        chunks.append(pred[:len_chunk])
+    return np.concatenate(chunks)
+
+
+class ReconstructionTests(SimpleTestCase):
+    def setUp(self):
+        self.y = np.random.default_rng(0).standard_normal(10 * 480 + 123).astype(np.float32)
+
+    def test_matches_per_chunk_loop(self):
+        for n in (len(self.y), 480, 100):
+            with self.subTest(n=n):
+                model = MovingAverageModel()
+                got = reconstruction.reconstruct(model, self.y[:n], frame_len=480, max_batch=4)
+                self.assertEqual(got.dtype, np.float32)
+                np.testing.assert_allclose(got, loop_reconstruction(model, self.y[:n], 480), atol=1e-6)
+
+    def test_frames_are_batched(self):
+        model = MovingAverageModel()
+        reconstruction.reconstruct(model, self.y, frame_len=480, max_batch=4)
+        self.assertEqual(model.batch_sizes, [4, 4, 3])
+
+    def test_overlap_add_preserves_an_identity_model(self):
+        class Identity:
+            def predict_on_batch(self, x):
+                return x
+        got = reconstruction.reconstruct(Identity(), self.y, frame_len=480, max_batch=4, overlap=64)
+        self.assertEqual(len(got), len(self.y))
+        np.testing.assert_allclose(got, self.y, atol=1e-5)
+
+
+# -------------------------------
+# Resampling
+# -------------------------------
+class StreamingResamplerTests(SimpleTestCase):
+    RATES = [(44100, 16000), (16000, 44100), (48000, 8000), (8000, 11025), (22050, 22050)]
+
+    def stream(self, resampler, x, block_sizes):
+        out, pos, k = [], 0, 0
+        while pos < len(x):
+            size = block_sizes[k % len(block_sizes)]
+            out.append(resampler.process(x[pos:pos + size]))
+            pos += size
+            k += 1
+        out.append(resampler.flush())
+        return np.concatenate(out)
+
+    def test_matches_one_shot_resample(self):
+        x = np.random.default_rng(0).standard_normal(20000).astype(np.float32)
+        for orig_sr, new_sr in self.RATES:
+            for block_sizes in ([1024], [1, 7, 4096, 333], [len(x)]):
+                with self.subTest(orig_sr=orig_sr, new_sr=new_sr, blocks=block_sizes):
+                    expected = resampling.resample(x, orig_sr, new_sr)
+                    got = self.stream(resampling.StreamingResampler(orig_sr, new_sr), x, block_sizes)
+                    self.assertEqual(len(got), len(expected))
+                    np.testing.assert_allclose(got, expected, atol=1e-5)
+
+    def test_input_shorter_than_filter(self):
+        x = np.random.default_rng(1).standard_normal(5).astype(np.float32)
+        got = self.stream(resampling.StreamingResampler(44100, 16000), x, [2])
+        np.testing.assert_allclose(got, resampling.resample(x, 44100, 16000), atol=1e-5)
+
+    def test_chain_matches_successive_resamples(self):
+        x = np.random.default_rng(2).standard_normal(30000).astype(np.float32)
+        expected = resampling.resample(resampling.resample(x, 44100, 8000), 8000, 22050)
+        got = self.stream(resampling.ResamplerChain([44100, 8000, 22050]), x, [4096])
+        self.assertEqual(len(got), len(expected))
+        np.testing.assert_allclose(got, expected, atol=1e-5)
+
+
+# -------------------------------
+# Binary signal transport
+# -------------------------------
+def decode_binary(body):
+    """Python mirror of the browser decoder in signal_transport.js."""
+    n = int(np.frombuffer(body[:4], dtype="<u4")[0])
+    meta = json.loads(body[4:4 + n])
+    offset = 4 + n + (-(4 + n) % 4)
+    dtype = {"float32": "<f4", "int16": "<i2"}[meta["dtype"]]
+    return meta, np.frombuffer(body[offset:], dtype=dtype).reshape(meta["shape"])
+
+
+class SignalTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.x = np.random.default_rng(0).standard_normal((3, 1001)).astype(np.float32)
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_float32_round_trip(self):
+        request = RequestFactory().get("/?format=binary")
+        self.assertTrue(signal_transport.wants_binary(request))
+        with mock.patch.object(signal_transport, "STREAM_BLOCK_BYTES", 1000):  # several blocks
+            response = signal_transport.binary_signal_response(self.x, ["a", "b", "c"], 250, request,
+                                                               extra={"start_sample": 7})
+            body = self.body(response)
+        meta, data = decode_binary(body)
+        self.assertEqual(response["Content-Type"], signal_transport.BINARY_CONTENT_TYPE)
+        self.assertEqual((meta["channels"], meta["fs"], meta["shape"]), (["a", "b", "c"], 250, [3, 1001]))
+        self.assertEqual((meta["dtype"], meta["layout"], meta["start_sample"]), ("float32", "channels-first", 7))
+        np.testing.assert_array_equal(data, self.x)
+
+    def test_int16_digital_round_trip(self):
+        request = RequestFactory().get("/?format=binary&samples=digital")
+        self.assertTrue(signal_transport.wants_digital(request))
+        digital = np.array([[1, -2, 32767], [-32768, 0, 5]], dtype=np.int16)
+        response = signal_transport.binary_signal_response(
+            digital, ["I", "II"], 360, request, digital=([200.0, 100.0], [0.0, 10.0], [-32768, -32768]))
+        meta, data = decode_binary(self.body(response))
+        self.assertEqual(meta["dtype"], "int16")
+        self.assertEqual((meta["gain"], meta["baseline"], meta["invalid"]), ([200.0, 100.0], [0.0, 10.0], [-32768, -32768]))
+        np.testing.assert_array_equal(data, digital)
+
+    def test_gzip_encoding(self):
+        request = RequestFactory().get("/?format=binary&compress=gzip", HTTP_ACCEPT_ENCODING="gzip, br")
+        response = signal_transport.binary_signal_response(self.x, ["a", "b", "c"], 250, request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        _, data = decode_binary(zlib.decompress(self.body(response), 31))
+        np.testing.assert_array_equal(data, self.x)
+
+    def test_empty_window(self):
+        request = RequestFactory().get("/")
+        self.assertFalse(signal_transport.wants_binary(request))
+        response = signal_transport.binary_signal_response(self.x[:, :0], ["a", "b", "c"], 250, request)
+        self.assertNotIn("Content-Encoding", response)
+        meta, data = decode_binary(self.body(response))
+        self.assertEqual(data.shape, (3, 0))
+
+
+# -------------------------------
+# Signal cache
+# -------------------------------
+class TempCacheMixin:
+    """Point a cache module's CACHE_DIR (and optionally MAX_BYTES) at a fresh temp dir."""
+
+    def use_temp_cache(self, module, max_bytes=None):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        patches = {"CACHE_DIR": cache_dir}
+        if max_bytes is not None:
+            patches["MAX_BYTES"] = max_bytes
+        for name, value in patches.items():
+            patcher = mock.patch.object(module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return cache_dir
+
+
+class SignalCacheTests(TempCacheMixin, SimpleTestCase):
+    def upload(self, name, size):
+        return SimpleUploadedFile(name, bytes(size))
+
+    def age(self, signal_id, seconds):
+        past = time.time() - seconds
+        os.utime(os.path.join(signal_cache.CACHE_DIR, signal_id), (past, past))
+
+    def test_content_key_depends_on_kind_and_bytes(self):
+        key = signal_cache.content_key("eeg", self.upload("a.set", 10))
+        self.assertEqual(key, signal_cache.content_key("eeg", self.upload("renamed.set", 10)))
+        self.assertNotEqual(key, signal_cache.content_key("ecg", self.upload("a.set", 10)))
+        self.assertNotEqual(key, signal_cache.content_key("eeg", self.upload("a.set", 11)))
+        self.assertTrue(key.isalnum())
+
+    def test_put_source_get_and_update_meta(self):
+        self.use_temp_cache(signal_cache)
+        entry = signal_cache.put_source("abc1", [self.upload("rec.hea", 5), self.upload("rec.dat", 20)],
+                                        format="wfdb")
+        self.assertEqual(entry["format"], "wfdb")
+        self.assertEqual(sorted(os.listdir(entry["source_dir"])), ["rec.dat", "rec.hea"])
+        signal_cache.update_meta("abc1", channels=["I"], fs=360)
+        entry = signal_cache.get("abc1")
+        self.assertEqual((entry["signal_id"], entry["channels"], entry["fs"]), ("abc1", ["I"], 360))
+        # Storing the same content again keeps the first entry
+        self.assertEqual(signal_cache.put_source("abc1", [self.upload("x", 1)])["fs"], 360)
+
+    def test_unknown_or_invalid_ids(self):
+        self.use_temp_cache(signal_cache)
+        self.assertIsNone(signal_cache.get("missing"))
+        self.assertIsNone(signal_cache.get("../etc"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.use_temp_cache(signal_cache, max_bytes=2500)
+        for i, signal_id in enumerate(["old", "used", "mid"]):
+            signal_cache.put_source(signal_id, [self.upload("f", 1000)])
+            self.age(signal_id, 100 - i)
+        signal_cache.get("used")  # touched: now the most recent
+        signal_cache.put_source("new", [self.upload("f", 1000)])
+        self.assertEqual(sorted(os.listdir(signal_cache.CACHE_DIR)), ["new", "used"])
+        self.assertIsNone(signal_cache.get("old"))
+        self.assertIsNone(signal_cache.get("mid"))
+        self.assertIsNotNone(signal_cache.get("used"))
+
+    def test_entry_just_stored_is_never_evicted(self):
+        self.use_temp_cache(signal_cache, max_bytes=1500)
+        signal_cache.put_source("first", [self.upload("f", 1000)])
+        self.age("first", -100)  # newer mtime than the next entry will have
+        entry = signal_cache.put_source("big", [self.upload("f", 5000)])
+        self.assertIsNotNone(entry)
+        self.assertIsNone(signal_cache.get("first"))
+
+
+# -------------------------------
+# EEG windows
+# -------------------------------
+def export_eeglab(path, data, fs):
+    import mne
+
+    info = mne.create_info(["Fz", "Cz", "Pz", "Oz"][:len(data)], fs, "eeg")
+    mne.export.export_raw(path, mne.io.RawArray(data, info, verbose="ERROR"), fmt="eeglab", verbose="ERROR")
+    return path
+
+
+class EegReaderTests(SimpleTestCase):
+    fs = 256.41
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dir = tempfile.mkdtemp()
+        cls.data = np.random.default_rng(0).standard_normal((4, 3000)) * 1e-5
+        export_eeglab(os.path.join(cls.dir, "rec.set"), cls.data, cls.fs)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.entry = {"signal_id": f"eegtest{id(self)}", "source_dir": self.dir}
+        self.entry.update(eeg_reader.describe(self.entry))
+        self.addCleanup(eeg_reader._open.pop, self.entry["signal_id"], None)
+        self.addCleanup(eeg_reader._sizes.pop, self.entry["signal_id"], None)
+
+    def test_describe_keeps_fractional_sampling_rate(self):
+        self.assertEqual(self.entry["channels"], ["Fz", "Cz", "Pz", "Oz"])
+        self.assertAlmostEqual(self.entry["fs"], self.fs, places=2)
+        self.assertEqual(eeg_reader.n_samples(self.entry), 3000)
+
+    def test_read_window_matches_the_recording(self):
+        window = eeg_reader.read_window(self.entry, 100, 612, [2, 0])
+        self.assertEqual(window.dtype, np.float32)
+        np.testing.assert_allclose(window, self.data[[2, 0], 100:612], rtol=1e-5, atol=1e-12)
+
+    def test_window_is_clipped_to_the_recording(self):
+        self.assertEqual(eeg_reader.read_window(self.entry, 2900, 10 ** 6).shape, (4, 100))
+        self.assertEqual(eeg_reader.read_window(self.entry, -50, 10, [1]).shape, (1, 10))
+        self.assertEqual(eeg_reader.read_window(self.entry, 500, 400, [1]).shape, (1, 0))
+
+    def test_eeglab_recordings_have_no_digital_path(self):
+        self.assertFalse(eeg_reader.supports_digital(self.entry))
+
+
+class SignalWindowTests(TempCacheMixin, SimpleTestCase):
+    def setUp(self):
+        self.use_temp_cache(signal_cache)
+        self.addCleanup(eeg_reader._open.clear)
+        self.addCleanup(eeg_reader._sizes.clear)
+        self.data = np.random.default_rng(9).standard_normal((3, 3000)) * 1e-5
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        with open(export_eeglab(os.path.join(upload_dir, "rec.set"), self.data, 250), "rb") as f:
+            self.signal_id = Client().post("/eeg/upload/", {"set_file": f}).json()["signal_id"]
+
+    def window(self, **params):
+        return Client().get(f"/signals/{self.signal_id}/window/", params).json()
+
+    def test_upload_keeps_only_the_source(self):
+        entry = signal_cache.get(self.signal_id)
+        self.assertNotIn("columns", entry)
+        self.assertEqual(os.listdir(entry["source_dir"]), ["rec.set"])
+        self.assertEqual((entry["channels"], entry["fs"], entry["n_samples"]), (["Fz", "Cz", "Pz"], 250, 3000))
+
+    def test_minmax_window_matches_the_whole_recording(self):
+        result = self.window(width=50, channels="2,0", start=2, stop=10)
+        window = self.data[[2, 0], 500:2500].astype(np.float32)
+        indices, values = decimation.minmax_decimate(window, 50)
+        np.testing.assert_allclose(result["y"], values, rtol=1e-6)
+        np.testing.assert_allclose(result["x"], np.broadcast_to((indices + 500) / 250, values.shape))
+        self.assertEqual((result["channels"], result["start"], result["stop"]), (["Pz", "Fz"], 2.0, 10.0))
+
+    def test_lttb_and_bad_parameters(self):
+        result = self.window(width=20, method="lttb")
+        self.assertEqual(np.shape(result["y"]), (3, 40))
+        self.assertEqual(result["x"][0][0], 0.0)
+        self.assertIn("Invalid parameters", self.window(start="nan")["error"])
+        self.assertIn("Unknown method", self.window(method="mean")["error"])
+
+
+# -------------------------------
+# Joint histograms and recurrence
+# -------------------------------
+class RecurrenceTests(SimpleTestCase):
+    def test_pair_histograms_match_histogram2d(self):
+        x = np.random.default_rng(1).standard_normal((3, 5000)).astype(np.float32)
+        bins = 16
+        hists, ranges = recurrence.pair_histograms(x, [(0, 1), (2, 0)], bins)
+        for (i, j), hist in zip([(0, 1), (2, 0)], hists):
+            # bins - 1 equal steps from min to max, plus one more so the max falls in the last bin
+            edges = [np.append(np.linspace(lo, hi, bins), hi + (hi - lo) / (bins - 1)) for lo, hi in ranges[[j, i]]]
+            expected, _, _ = np.histogram2d(x[j], x[i], bins=edges)
+            np.testing.assert_array_equal(hist, expected)
+        np.testing.assert_allclose(ranges, np.stack([x.min(axis=1), x.max(axis=1)], axis=1))
+
+    def test_non_finite_samples_are_left_out(self):
+        x = np.random.default_rng(2).standard_normal((3, 200)).astype(np.float32)
+        x[0, [3, 50]] = np.nan
+        x[1, 7] = np.inf
+        x[2] = np.nan
+        hists, ranges = recurrence.pair_histograms(x, [(0, 1), (0, 2)], 8)
+        self.assertEqual(hists[0].sum(), 197)
+        self.assertEqual(hists[1].sum(), 0)
+        self.assertTrue(np.isfinite(ranges).all())
+        self.assertEqual(ranges[0].tolist(), [np.nanmin(x[0]), np.nanmax(x[0])])
+        json.dumps(ranges.tolist(), allow_nan=False)
+
+    def test_cross_recurrence_matches_pairwise_distances(self):
+        rng = np.random.default_rng(3)
+        a, b = rng.standard_normal(300), rng.standard_normal(320)
+        matrix, eps = recurrence.cross_recurrence(a, b, eps=0.5, dim=2, delay=3, block=64)
+        ea = recurrence.embed((a - a.mean()) / a.std(), 2, 3)
+        eb = recurrence.embed((b - b.mean()) / b.std(), 2, 3)[:len(ea)]
+        distances = np.linalg.norm(ea[:, None, :] - eb[None, :, :], axis=2)
+        self.assertEqual(eps, 0.5)
+        self.assertEqual(matrix.shape, (297, 297))
+        clear = np.abs(distances - 0.5) > 1e-4  # float32 vs float64 right at the threshold
+        np.testing.assert_array_equal(matrix.astype(bool)[clear], (distances <= 0.5)[clear])
+
+    def test_estimated_threshold_gives_the_requested_density(self):
+        a = np.sin(np.linspace(0, 40, 2000))
+        matrix, eps = recurrence.cross_recurrence(a, a[::-1], eps_quantile=0.2)
+        self.assertGreater(eps, 0)
+        self.assertAlmostEqual(matrix.mean(), 0.2, delta=0.03)
+
+
+# -------------------------------
+# Audio spectrum
+# -------------------------------
+def wav_upload(samples, samplerate, name="clip.wav"):
+    import io
+
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, samplerate, format="WAV", subtype="FLOAT")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="audio/wav")
+
+
+class SpectrumTests(SimpleTestCase):
+    def empty_cache(self):
+        stack = contextlib.ExitStack()
+        stack.enter_context(mock.patch.dict(spectrum._cache, clear=True))
+        stack.enter_context(mock.patch.object(spectrum, "_cache_bytes", 0))
+        return stack
+
+    def test_fmax_is_the_highest_component_above_the_ratio(self):
+        freqs = np.arange(8.0) * 100
+        magnitude = np.array([0, 1, 10, 0.5, 0, 0.2, 0, 0], dtype=np.float32)
+        self.assertEqual(spectrum.fmax_threshold(freqs, magnitude), 500.0)
+        self.assertEqual(spectrum.fmax_threshold(freqs, magnitude, ratio=0.03), 300.0)
+        self.assertEqual(spectrum.fmax_threshold(freqs, magnitude, ratio=0.1), 200.0)
+        self.assertEqual(spectrum.fmax_threshold(freqs, np.zeros(8)), 0.0)
+
+    def test_streamed_welch_matches_scipy(self):
+        from scipy.signal import welch
+
+        rate, nfft = 8000, 1024
+        x = np.random.default_rng(4).standard_normal(20_000).astype(np.float32)
+        spec = spectrum.StreamingSpectrum(rate, len(x), nfft=nfft)
+        for start in range(0, len(x), 3001):  # blocks that do not line up with frames
+            spec.update(x[start:start + 3001])
+        freqs, magnitude = spec.finish()
+
+        ref_freqs, power = welch(x, rate, window="hann", nperseg=nfft, noverlap=nfft // 2,
+                                 detrend=False, scaling="spectrum")
+        power[1:-1] /= 2  # one-sided doubling
+        expected = np.sqrt(power) * spec.window.sum()
+        np.testing.assert_allclose(freqs, ref_freqs)
+        np.testing.assert_allclose(magnitude, expected, rtol=1e-4)
+
+    def test_long_clips_take_the_welch_path(self):
+        rate = 8000
+        t = np.arange(3 * rate) / rate
+        tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        with mock.patch.object(spectrum, "EXACT_MAX_SAMPLES", rate), self.empty_cache():
+            analysis = spectrum.analyse(wav_upload(tone, rate))
+            nfft = spectrum.StreamingSpectrum(rate, len(tone)).nfft
+            self.assertEqual(len(analysis.freqs), nfft // 2 + 1)
+            self.assertAlmostEqual(analysis.freqs[np.argmax(analysis.magnitude)], 440, delta=rate / nfft)
+            self.assertEqual(len(analysis.samples), len(tone))
+            self.assertIs(spectrum.analyse(wav_upload(tone, rate)), analysis)
+
+    def test_short_clips_take_one_exact_fft(self):
+        rate = 8000
+        t = np.arange(rate // 2) / rate
+        tone = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+        with self.empty_cache():
+            analysis = spectrum.analyse(wav_upload(tone, rate))
+        self.assertGreaterEqual(len(analysis.freqs), len(tone) // 2 + 1)
+        self.assertAlmostEqual(analysis.fmax, 1000, delta=60)
+        self.assertEqual(analysis.nyquist_freq, 2 * analysis.fmax)
+
+
+# -------------------------------
+# Doppler scenes
+# -------------------------------
+class DopplerSceneTests(SimpleTestCase):
+    def scene(self, **extra):
+        return doppler_scene.parse_scene(dict({"duration": 2, "fs": 4000, "sources": [
+            {"frequency": 440, "velocity": 30, "distance": 10},
+            {"frequency": 700, "velocity": 20, "distance": 8, "trajectory": "circular", "radius": 3, "level": 0.5},
+        ]}, **extra))
+
+    def test_single_source_form_and_validation(self):
+        scene = doppler_scene.parse_scene({"duration": "1.5", "frequency": "500", "velocity": "25"})
+        self.assertEqual(scene["fs"], 8000)
+        self.assertEqual(scene["sources"][0]["t_closest"], 0.75)
+        for bad in ({"duration": 0, "frequency": 1, "velocity": 1},
+                    {"duration": 1, "frequency": 1, "velocity": 400},
+                    {"duration": 1, "sources": []},
+                    {"duration": 1, "sources": [{"frequency": 1, "velocity": 1, "trajectory": "spiral"}]},
+                    {"duration": 1, "sources": [{"frequency": 1, "velocity": 1, "trajectory": "circular",
+                                                 "distance": 2, "radius": 2}]}):
+            with self.assertRaises(ValueError):
+                doppler_scene.parse_scene(bad)
+
+    def test_token_round_trip(self):
+        scene = self.scene()
+        self.assertEqual(doppler_scene.scene_from_token(doppler_scene.scene_token(scene)), scene)
+
+    def test_blocks_are_seamless(self):
+        scene = self.scene()
+        whole = np.concatenate(list(doppler_scene.synthesise_blocks(scene, block_size=10 ** 6)))
+        pieces = np.concatenate(list(doppler_scene.synthesise_blocks(scene, block_size=333)))
+        self.assertEqual(whole.shape, (8000, 2))
+        np.testing.assert_allclose(pieces, whole, atol=1e-4)
+
+    def test_linear_pass_by_matches_the_closed_form(self):
+        scene = doppler_scene.parse_scene({"duration": 2, "fs": 4000, "frequency": 440, "velocity": 30})
+        series = doppler_scene.plot_series(scene, points=400)
+        t = np.asarray(series["time"])
+        x = 30 * (t - 1.0)
+        v_rad = -x * 30 / np.hypot(x, 5.0)
+        np.testing.assert_allclose(series["frequency"][0], 440 * 343 / (343 - v_rad), atol=1e-3)
+        self.assertAlmostEqual(max(series["envelope"]), 1.0, places=3)
+        self.assertGreater(series["max_frequency"], 440)
+        self.assertLess(series["min_frequency"], 440)
+
+    def test_wav_stream_is_a_valid_wav(self):
+        import io
+
+        import soundfile as sf
+
+        scene = self.scene()
+        body = b"".join(doppler_scene.wav_stream(scene, block_size=1000))
+        self.assertEqual(len(body), 44 + 8000 * 2 * 2)
+        audio, rate = sf.read(io.BytesIO(body), dtype="float32")
+        self.assertEqual((rate, audio.shape), (4000, (8000, 2)))
+        expected = np.concatenate(list(doppler_scene.synthesise_blocks(scene)))
+        np.testing.assert_allclose(audio, expected, atol=2 / 32767)
+
+
+# -------------------------------
+# SAR tiles
+# -------------------------------
+def write_tiff(path, data):
+    import rasterio
+
+    with rasterio.open(path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+                       dtype=data.dtype.name, transform=rasterio.Affine(10, 0, 0, 0, -10, 0)) as dst:
+        dst.write(data, 1)
+    return path
+
+
+def expected_tile(data, db_range):
+    return sar_render.to_uint8(sar_tiles.to_db(data), *db_range)
+
+
+class SarTileTests(TempCacheMixin, SimpleTestCase):
+    def setUp(self):
+        self.dir = self.use_temp_cache(sar_tiles)
+        self.rasters = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.rasters, ignore_errors=True)
+        self.addCleanup(self.close_datasets)
+        self.data = np.random.default_rng(5).gamma(4.0, 50.0, (600, 1000)).astype(np.float32)
+        self.path = write_tiff(os.path.join(self.rasters, "a.tiff"), self.data)
+
+    def close_datasets(self):
+        while sar_tiles._open:
+            sar_tiles._open.popitem()[1][0].close()
+
+    def test_register_builds_the_coarse_levels(self):
+        meta = sar_tiles.register(self.path)
+        self.assertEqual((meta["width"], meta["height"], meta["max_zoom"]), (1000, 600, 2))
+        self.assertLess(*meta["db_range"])
+        self.assertEqual([sar_tiles.level_shape(meta, z) for z in range(3)], [(1, 1), (2, 2), (4, 3)])
+        self.assertEqual(sar_tiles.build_pyramid(meta["product_id"], max_tiles=5), 5)
+        level_dir = os.path.join(self.dir, meta["product_id"], "2")
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(level_dir)), 12)
+        self.assertEqual(sar_tiles.register(self.path), meta)
+
+    def test_full_resolution_tiles_match_the_raster(self):
+        meta = sar_tiles.register(self.path)
+        pid = meta["product_id"]
+        np.testing.assert_array_equal(sar_tiles.tile(pid, 2, 1, 1),
+                                      expected_tile(self.data[256:512, 256:512], meta["db_range"]))
+        edge = sar_tiles.tile(pid, 2, 3, 2)
+        np.testing.assert_array_equal(edge, expected_tile(self.data[512:, 768:], meta["db_range"]))
+        for z, x, y in ((2, 4, 0), (2, 0, 3), (3, 0, 0), (-1, 0, 0)):
+            self.assertIsNone(sar_tiles.tile(pid, z, x, y))
+        self.assertIsNone(sar_tiles.tile("unknown", 0, 0, 0))
+
+    def test_overview_tiles_average_the_raster(self):
+        meta = sar_tiles.register(self.path)
+        top = sar_tiles.tile(meta["product_id"], 0, 0, 0)
+        averaged = self.data.reshape(150, 4, 250, 4).mean(axis=(1, 3))
+        self.assertEqual(top.shape, (150, 250))
+        self.assertLessEqual(np.abs(top.astype(int) - expected_tile(averaged, meta["db_range"])).max(), 1)
+
+    def test_tile_png_pads_with_transparency(self):
+        import io
+
+        from PIL import Image
+
+        meta = sar_tiles.register(self.path)
+        data = sar_tiles.tile(meta["product_id"], 2, 3, 2)
+        image = np.asarray(Image.open(io.BytesIO(sar_tiles.tile_png(data, "viridis"))))
+        self.assertEqual(image.shape, (256, 256, 4))
+        np.testing.assert_array_equal(image[:88, :232, :3], sar_render.LUTS["viridis"][data])
+        self.assertTrue((image[:88, :232, 3] == 255).all() and (image[88:, :, 3] == 0).all())
+        self.assertEqual(len(sar_tiles.tile_raw(data)), 256 * 256)
+
+    def test_least_recently_used_products_are_evicted(self):
+        first = sar_tiles.register(self.path)["product_id"]
+        old = time.time() - 60
+        os.utime(os.path.join(self.dir, first), (old, old))
+        other = write_tiff(os.path.join(self.rasters, "b.tiff"), self.data[:300, :300])
+        with mock.patch.object(sar_tiles, "MAX_BYTES", 1):
+            second = sar_tiles.register(other)["product_id"]
+        self.assertIsNone(sar_tiles.get_meta(first))
+        self.assertIsNotNone(sar_tiles.tile(second, 0, 0, 0))
+
+
+# -------------------------------
+# SAR rendering
+# -------------------------------
+def decode_image(data):
+    import io
+
+    from PIL import Image
+
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+
+class SarRenderTests(SimpleTestCase):
+    def test_png_round_trips_every_channel_count(self):
+        rng = np.random.default_rng(6)
+        for shape in ((7, 5), (7, 5, 1), (7, 5, 2), (7, 5, 3), (7, 5, 4)):
+            image = rng.integers(0, 256, shape, dtype=np.uint8)
+            decoded = decode_image(image_encoding.encode_png(image))
+            np.testing.assert_array_equal(decoded, image.reshape(decoded.shape))
+
+    def test_stretch_range_is_within_a_bin_of_the_percentiles(self):
+        db = np.random.default_rng(7).normal(-10, 4, (300, 400)).astype(np.float32)
+        vmin, vmax = sar_render.stretch_range(db)
+        width = (db.max() - db.min()) / sar_render.HIST_BINS
+        lo, hi = np.percentile(db, sar_render.STRETCH_PERCENTILES)
+        self.assertLessEqual(abs(vmin - lo), 2 * width)
+        self.assertLessEqual(abs(vmax - hi), 2 * width)
+
+    def test_stretch_range_ignores_non_finite_values(self):
+        db = np.linspace(0, 100, 1001)
+        dirty = np.concatenate([db, [np.nan, np.inf, -np.inf]])
+        self.assertEqual(sar_render.stretch_range(dirty), sar_render.stretch_range(db))
+        self.assertEqual(sar_render.stretch_range(np.full(10, 3.0)), (3.0, 4.0))
+        self.assertEqual(sar_render.stretch_range(np.full(10, np.nan)), (0.0, 1.0))
+
+    def test_render_maps_the_range_onto_uint8(self):
+        db = np.array([[-20.0, -10.0, 0.0, np.nan]])
+        data, content_type, db_range = sar_render.render(db, "magma", "png", db_range=(-20.0, 0.0))
+        self.assertEqual((content_type, db_range), ("image/png", (-20.0, 0.0)))
+        gray = sar_render.to_uint8(db, -20.0, 0.0)
+        self.assertEqual(gray.tolist(), [[0, 127, 255, 0]])
+        np.testing.assert_array_equal(decode_image(data), sar_render.LUTS["magma"][gray])
+        with self.assertRaises(ValueError):
+            sar_render.render(db, "jet")
+        with self.assertRaises(ValueError):
+            sar_render.render(db, fmt="bmp")
+
+
+# -------------------------------
+# SAR preview
+# -------------------------------
+def loop_block_mean(data, factor_row, factor_col):
+    rows = range(0, data.shape[0], factor_row)
+    cols = range(0, data.shape[1], factor_col)
+    return np.array([[data[r:r + factor_row, c:c + factor_col].mean() for c in cols] for r in rows])
+
+
+class SarPreviewTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.data = np.random.default_rng(8).gamma(4.0, 50.0, (203, 157)).astype(np.float32)
+        self.path = write_tiff(os.path.join(self.dir, "m.tiff"), self.data)
+
+    def expected(self, max_dim):
+        factors = sar_pipeline.preview_factors(*self.data.shape, max_dim)
+        return 10 * np.log10(loop_block_mean(self.data, *factors) + sar_pipeline.EPS)
+
+    def test_block_mean_averages_partial_edge_blocks(self):
+        for factors in ((1, 1), (3, 4), (10, 10), (203, 157), (300, 1)):
+            np.testing.assert_allclose(sar_pipeline.block_mean(self.data, *factors),
+                                       loop_block_mean(self.data, *factors), rtol=1e-5)
+
+    def test_preview_is_independent_of_the_strip_height(self):
+        expected = self.expected(40)
+        for block_rows in (1, 7, 64, 10_000):
+            preview = sar_pipeline.preview_db(self.path, 40, workers=1, block_rows=block_rows)
+            self.assertEqual(preview.shape, (34, 40))
+            np.testing.assert_allclose(preview, expected, rtol=1e-5)
+
+    def test_parallel_preview_matches_the_serial_one(self):
+        with mock.patch.object(sar_pipeline, "PARALLEL_MIN_PIXELS", 0):
+            preview = sar_pipeline.preview_db(self.path, 50, workers=2, block_rows=40)
+        np.testing.assert_allclose(preview, self.expected(50), rtol=1e-5)
+
+
+# -------------------------------
+# SAFE index
+# -------------------------------
+MANIFEST_TEMPLATE = """<?xml version="1.0"?>
+<xfdu:XFDU xmlns:xfdu="urn:ccsds:schema:xfdu:1" xmlns:safe="http://www.esa.int/safe/sentinel-1.0">
+  <metadataSection><metadataObject><metadataWrap><xmlData>
+    <safe:platform><safe:familyName>SENTINEL-1</safe:familyName><safe:number>A</safe:number></safe:platform>
+  </xmlData></metadataWrap></metadataObject></metadataSection>
+  <dataObjectSection>{locations}</dataObjectSection>
+</xfdu:XFDU>
+"""
+
+
+class SafeIndexTests(TestCase):
+    names = ["s1a-iw-grd-vv-20230101t000000-001.tiff", "s1a-iw-grd-vh-20230101t000000-002.tiff"]
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(suffix=".SAFE")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        os.makedirs(os.path.join(self.folder, "measurement"))
+        for k, name in enumerate(self.names):
+            write_tiff(os.path.join(self.folder, "measurement", name), np.full((8 + k, 6), k + 1, np.uint16))
+        locations = "".join(f'<dataObject><byteStream><fileLocation href="./measurement/{name}"/></byteStream>'
+                            f'</dataObject>' for name in self.names)
+        with open(os.path.join(self.folder, safe_index.MANIFEST), "w") as f:
+            f.write(MANIFEST_TEMPLATE.format(locations=locations))
+
+    def test_resolve_picks_bands_in_manifest_order(self):
+        band, bands = safe_index.resolve(self.folder)
+        self.assertEqual([(m["swath"], m["polarisation"], m["height"]) for m in bands], [("IW", "VV", 8), ("IW", "VH", 9)])
+        self.assertEqual(band, bands[0])
+        self.assertEqual(safe_index.resolve(self.folder, polarisation="vh")[0], bands[1])
+        self.assertEqual(SafeProduct.objects.get().mission, "SENTINEL-1A")
+        with self.assertRaisesMessage(LookupError, "available: IW VV, IW VH"):
+            safe_index.resolve(self.folder, polarisation="vv", swath="ew")
+
+    def test_fresh_index_is_reused_and_stale_one_rebuilt(self):
+        first = safe_index.index(self.folder)
+        with mock.patch.object(safe_index, "_build", side_effect=AssertionError("re-parsed")):
+            self.assertEqual(safe_index.index(self.folder), first)
+        path = first[1]["path"]
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        self.assertEqual(safe_index.index(self.folder)[1]["mtime"], os.path.getmtime(path))
+        self.assertEqual(SafeProduct.objects.get().measurements.count(), 2)
+
+    def test_folders_without_manifest_fall_back_to_the_files(self):
+        os.remove(os.path.join(self.folder, safe_index.MANIFEST))
+        self.assertEqual(sorted(m["polarisation"] for m in safe_index.index(self.folder)), ["VH", "VV"])
+        shutil.rmtree(os.path.join(self.folder, "measurement"))
+        with self.assertRaises(LookupError):
+            safe_index.resolve(self.folder)
+
+    def test_concurrent_indexing_reads_back_the_winner(self):
+        build, write = safe_index._build, SafeProduct.objects.update_or_create
+        raced, writes = [], []
+
+        def racing_build(folder_path):
+            if not raced:
+                raced.append(folder_path)
+                safe_index.index(folder_path)  # another request indexes the product meanwhile
+            return build(folder_path)
+
+        def racing_write(**kwargs):
+            writes.append(kwargs)
+            if len(writes) == 1:
+                return write(**kwargs)
+            raise IntegrityError("UNIQUE constraint failed: myapp_safeproduct.path")
+
+        with mock.patch.object(safe_index, "_build", side_effect=racing_build), \
+                mock.patch.object(SafeProduct.objects, "update_or_create", side_effect=racing_write), \
+                mock.patch.object(safe_index, "_stored", wraps=safe_index._stored) as stored:
+            measurements = safe_index.index(self.folder)
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(stored.call_count, 3)  # first lookup, the winner's lookup, the re-read
+        self.assertEqual(measurements, safe_index.index(self.folder))
+        self.assertEqual(SafeProduct.objects.get().measurements.count(), 2)
+
+
+# -------------------------------
+# Lazy views
+# -------------------------------
+class LazyViewTests(SimpleTestCase):
+    def setUp(self):
+        module = types.ModuleType("lazy_test_views")
+        module.page = lambda request, n: HttpResponse(f"page {n}")
+
+        async def upload(request):
+            return HttpResponse("uploaded")
+        upload.offload_endpoint = "upload"
+        module.upload = upload
+
+        for patcher in (mock.patch.dict(sys.modules, {"lazy_test_views": module}),
+                        mock.patch.dict(lazy.FEATURE_MODULES, {"test": "lazy_test_views"}, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(lazy.importlib, "import_module", wraps=lazy.importlib.import_module)
+        self.imports = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get("/")
+
+    def test_module_is_imported_once_on_first_call(self):
+        view = lazy.lazy_view("test", "page")
+        self.assertEqual((view.__name__, view.__module__), ("page", "lazy_test_views"))
+        self.imports.assert_not_called()
+        self.assertEqual(view(self.request, 3).content, b"page 3")
+        self.assertEqual(view(self.request, 4).content, b"page 4")
+        self.imports.assert_called_once_with("lazy_test_views")
+
+    def test_async_views_are_awaited_and_keep_their_offload_endpoint(self):
+        view = lazy.lazy_view("test", "upload", asynchronous=True)
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertFalse(hasattr(view, "offload_endpoint"))
+        self.assertEqual(asyncio.run(view(self.request)).content, b"uploaded")
+        self.assertEqual(view.offload_endpoint, "upload")
+
+    def test_preload_reports_failures_without_raising(self):
+        lazy.preload(["test", "unknown"])
+        self.imports.assert_called_once_with("lazy_test_views")
+        lazy.FEATURE_MODULES["broken"] = "lazy_test_missing"
+        lazy.preload(["*"])
+        self.assertEqual([c.args[0] for c in self.imports.call_args_list[1:]], ["lazy_test_views", "lazy_test_missing"])
+
+    def test_url_conf_does_not_import_feature_dependencies(self):
+        script = ("import sys, django; django.setup(); import myapp.urls; "
+                  "print(sorted(m for m in ('rasterio', 'mne', 'wfdb', 'scipy') if m in sys.modules))")
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="DSP.settings")
+        out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, check=True,
+                             cwd=settings.BASE_DIR)
+        self.assertEqual(out.stdout.strip().splitlines()[-1], "[]")
+
+
+# -------------------------------
+# Inference worker
+# -------------------------------
+class InferenceWorkerTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.address = os.path.join(self.dir, "inference.sock")
+        for name, value in (("ENABLED", True), ("ADDRESS", self.address)):
+            patcher = mock.patch.object(inference_worker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(inference_worker._drop_connection)
+        self.local = mock.patch.object(inference_worker, "_local_reconstruct",
+                                       side_effect=lambda model_id, y, *args: y * 2).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def start_worker(self):
+        """Serve the socket from a thread of this process (so the local implementations stay patched)."""
+        listener = connection.Listener(self.address, family="AF_UNIX", authkey=inference_worker.AUTHKEY)
+        self.addCleanup(listener.close)
+        # Worker and client share this process's resource tracker entry: attach without unregistering it
+        mock.patch.object(inference_worker, "_attach", lambda name: shared_memory.SharedMemory(name=name)).start()
+
+        def accept():
+            while True:
+                try:
+                    conn = listener.accept()
+                except OSError:
+                    return
+                threading.Thread(target=inference_worker._serve_connection, args=(conn,), daemon=True).start()
+        threading.Thread(target=accept, daemon=True).start()
+
+    def test_disabled_runs_in_process(self):
+        with mock.patch.object(inference_worker, "ENABLED", False), \
+                mock.patch.object(inference_worker, "_connection", side_effect=AssertionError("connected")):
+            out = inference_worker.reconstruct("m", np.ones(4, np.float32))
+        np.testing.assert_array_equal(out, np.full(4, 2.0))
+
+    def test_unreachable_worker_falls_back_in_process(self):
+        out = inference_worker.reconstruct("m", np.ones(4, np.float32))
+        np.testing.assert_array_equal(out, np.full(4, 2.0))
+        self.local.assert_called_once()
+        with mock.patch.object(inference_worker, "FALLBACK", False):
+            with self.assertRaises(inference_worker.InferenceUnavailable):
+                inference_worker.reconstruct("m", np.ones(4, np.float32))
+
+    def test_worker_writes_the_result_into_shared_memory(self):
+        self.start_worker()
+        y = np.arange(10, dtype=np.float32)
+        np.testing.assert_array_equal(inference_worker.reconstruct("m", y, frame_len=4), y * 2)
+        self.assertEqual(self.local.call_args.args[2:], (4, 16, 0))
+        self.assertEqual(inference_worker.ping()[1].keys(), {"pid", "registry", "schedulers"})
+
+    def test_worker_errors_are_not_retried_in_process(self):
+        self.start_worker()
+        self.local.side_effect = ValueError("bad frame")
+        with self.assertRaisesMessage(inference_worker.InferenceError, "ValueError: bad frame"):
+            inference_worker.reconstruct("m", np.ones(4, np.float32))
+        self.assertEqual(self.local.call_count, 1)
+
+    def test_batched_windows_travel_as_one_buffer(self):
+        self.start_worker()
+        items = [{"array": np.full(5, k, np.float32), "sampling_rate": 16000} for k in range(3)]
+        with mock.patch.object(inference_worker, "_local_classify_many",
+                               side_effect=lambda task, model_id, items: [[float(i["array"][0])] for i in items]):
+            self.assertEqual(inference_worker.classify_many("drone", "m", items), [[0.0], [1.0], [2.0]])
+        self.assertEqual(inference_worker.classify_many("drone", "m", []), [])
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+def exposed(text, name):
+    """{labels: value} of the samples of metric ``name`` in an exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            key, value = line.rsplit(" ", 1)
+            samples[key[len(name):]] = float(value)
+    return samples
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ("endpoint",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, 'a"b')
+        text = "\n".join(histogram.expose())
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertEqual(exposed(text, "test_seconds_bucket"), {
+            '{endpoint="a\\"b",le="0.1"}': 1, '{endpoint="a\\"b",le="1.0"}': 3, '{endpoint="a\\"b",le="+Inf"}': 4})
+        self.assertEqual(exposed(text, "test_seconds_count"), {'{endpoint="a\\"b"}': 4})
+        self.assertAlmostEqual(exposed(text, "test_seconds_sum")['{endpoint="a\\"b"}'], 4.05)
+
+    def test_instrumented_view_records_stages_and_status(self):
+        @metrics.instrumented
+        def metrics_test_view(request):
+            with metrics.stage("work"):
+                pass
+            return HttpResponse(status=201)
+
+        response = metrics_test_view(RequestFactory().get("/"))
+        self.assertRegex(response["Server-Timing"], r"^work;dur=[\d.]+, total;dur=[\d.]+$")
+        text = metrics.expose()
+        self.assertEqual(exposed(text, "signalvista_requests_total")['{endpoint="metrics_test_view",status="201"}'], 1)
+        self.assertIn('{endpoint="metrics_test_view",stage="work"}', exposed(text, "signalvista_stage_seconds_count"))
+
+    def test_streamed_stages_keep_their_endpoint(self):
+        def body():
+            for k in range(3):
+                with metrics.stage("chunk"):
+                    yield b"x"
+
+        @metrics.instrumented
+        def metrics_stream_view(request):
+            return StreamingHttpResponse(metrics.bind_endpoint(body()))
+
+        response = metrics_stream_view(RequestFactory().get("/"))
+        self.assertEqual(b"".join(response.streaming_content), b"xxx")  # consumed after the view returned
+        counts = exposed(metrics.expose(), "signalvista_stage_seconds_count")
+        self.assertEqual(counts['{endpoint="metrics_stream_view",stage="chunk"}'], 3)
+        self.assertIs(metrics.bind_endpoint(body), body)  # outside a view there is nothing to bind
+
+    def test_expose_includes_loaded_services(self):
+        gate = offload.gate("metrics_test_gate")
+        self.addCleanup(offload._gates.pop, "metrics_test_gate", None)
+        text = metrics.expose()
+        self.assertEqual(exposed(text, "signalvista_offload_capacity")['{endpoint="metrics_test_gate"}'], gate.capacity)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_signal_and_doppler_views_are_instrumented(self):
+        scene = doppler_scene.parse_scene({"duration": 0.2, "fs": 8000, "frequency": 440, "velocity": 20})
+        response = Client().get(f"/doppler/audio/?scene={doppler_scene.scene_token(scene)}")
+        self.assertIn("total;dur=", response["Server-Timing"])
+        b"".join(response.streaming_content)
+        response.close()
+        counts = exposed(metrics.expose(), "signalvista_stage_seconds_count")
+        self.assertIn('{endpoint="doppler_audio",stage="synthesise"}', counts)
+        self.assertIn("Server-Timing", Client().get("/signals/unknown/window/"))
+
+
+# -------------------------------
+# Drone timeline
+# -------------------------------
+class FakeStream:
+    """An AudioStream stand-in yielding ``signal`` in blocks of the given sizes (cycled)."""
+
+    def __init__(self, signal, samplerate, sizes):
+        self.signal, self.samplerate, self.sizes = signal, samplerate, sizes
+
+    def __iter__(self):
+        start, k = 0, 0
+        while start < len(self.signal):
+            size = self.sizes[k % len(self.sizes)]
+            yield self.signal[start:start + size]
+            start, k = start + size, k + 1
+
+
+class DroneTimelineTests(SimpleTestCase):
+    rate = drone_timeline.SAMPLE_RATE
+
+    def windows(self, signal, sizes, window=1000, hop=400):
+        return [(start, np.array(view)) for start, views in
+                drone_timeline._windows(FakeStream(signal, self.rate, sizes), window, hop)
+                for start, view in zip(range(start, 10 ** 9, hop), views)]
+
+    def test_windows_are_independent_of_the_block_size(self):
+        signal = np.arange(5321, dtype=np.float32)
+        expected = self.windows(signal, [10 ** 6])
+        self.assertEqual([start for start, _ in expected], list(range(0, 4001, 400)) + [4321])
+        for start, view in expected:
+            np.testing.assert_array_equal(view, signal[start:start + 1000])
+        for sizes in ([1], [999, 7], [4096]):
+            got = self.windows(signal, sizes)
+            self.assertEqual([start for start, _ in got], [start for start, _ in expected])
+            np.testing.assert_array_equal(np.stack([v for _, v in got]), np.stack([v for _, v in expected]))
+
+    def test_exact_fit_has_no_extra_tail_and_short_input_is_padded(self):
+        self.assertEqual([start for start, _ in self.windows(np.ones(1800, np.float32), [500])], [0, 400, 800])
+        (start, view), = self.windows(np.ones(300, np.float32), [128])
+        self.assertEqual(start, 0)
+        np.testing.assert_array_equal(view, np.r_[np.ones(300), np.zeros(700)])
+
+    def test_gate_levels(self):
+        t = np.arange(self.rate) / self.rate
+        loud = 0.1 * np.sin(2 * np.pi * 440 * t)
+        quiet = 0.001 * np.sin(2 * np.pi * 440 * t)
+        click = quiet.copy()
+        click[8000:8040] += 0.3
+        rms_db, flux_db, passed = drone_timeline.gate(np.stack([loud, quiet, click, np.zeros_like(t)]).astype(np.float32))
+        self.assertAlmostEqual(rms_db[0], 20 * np.log10(0.1 / np.sqrt(2)), places=2)
+        self.assertAlmostEqual(rms_db[1], 20 * np.log10(0.001 / np.sqrt(2)), places=2)
+        self.assertLess(flux_db[1], drone_timeline.FLUX_GATE_DB)
+        self.assertGreaterEqual(flux_db[2], drone_timeline.FLUX_GATE_DB)
+        self.assertEqual(passed.tolist(), [True, False, True, False])
+        self.assertAlmostEqual(rms_db[3], drone_timeline._db(0.0), places=3)
+
+    def test_windows_shorter_than_two_flux_frames_gate_on_level_only(self):
+        _, flux_db, passed = drone_timeline.gate(np.full((2, 700), [[0.5], [0.0]], dtype=np.float32))
+        self.assertEqual(flux_db.tolist(), [drone_timeline._db(0.0)] * 2)
+        self.assertEqual(passed.tolist(), [True, False])
+
+    def test_detect_yields_windows_in_order_with_their_labels(self):
+        t = np.arange(3 * self.rate) / self.rate
+        signal = np.where(t < 1.5, 0.2 * np.sin(2 * np.pi * 300 * t), 0.0).astype(np.float32)
+
+        def classify_many(task, model_id, items):
+            return [[{"label": "drone", "score": 0.9}] for _ in items]
+
+        with mock.patch.object(drone_timeline, "BATCH_SIZE", 2), \
+                mock.patch.object(drone_timeline.inference_worker, "classify_many", side_effect=classify_many) as model:
+            events = list(drone_timeline.detect(wav_upload(signal, self.rate), "m"))
+        meta, windows, summary = events[0], events[1:-1], events[-1]
+        self.assertEqual((meta["type"], meta["duration"]), ("meta", 3.0))
+        self.assertEqual([w["index"] for w in windows], list(range(len(windows))))
+        self.assertEqual(windows[-1]["end"], 3.0)
+        gated = [w["gated"] for w in windows]
+        self.assertEqual(gated, [w["start"] + 0.05 >= 1.5 for w in windows])
+        self.assertTrue(all(w["label"] == "drone" for w in windows if not w["gated"]))
+        self.assertEqual(summary, {"type": "summary", "windows": len(windows), "classified": gated.count(False),
+                                   "gated": gated.count(True), "labels": {"drone": gated.count(False)},
+                                   "top": "drone"})
+        self.assertTrue(all(len(call.args[2]) <= 2 for call in model.call_args_list))
+
+
+# -------------------------------
+# Decimation
+# -------------------------------
+def lttb_reference(y, threshold):
+    """Textbook single-channel LTTB."""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = (avg_start + avg_end - 1) / 2.0
+        avg_y = y[avg_start:avg_end].mean()
+        start, stop = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        areas = [abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a])) for j in range(start, stop)]
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    return selected + [n - 1]
+
+
+class DecimationTests(SimpleTestCase):
+    def setUp(self):
+        self.x = np.cumsum(np.random.default_rng(0).standard_normal((3, 10007)), axis=1).astype(np.float32)
+
+    def test_minmax_keeps_bucket_extremes_in_order(self):
+        width = 100
+        indices, values = decimation.minmax_decimate(self.x, width)
+        bucket = int(np.ceil(self.x.shape[1] / width))
+        self.assertEqual(values.shape, (3, len(indices)))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        for c in range(3):
+            for b, start in enumerate(range(0, self.x.shape[1], bucket)):
+                block = self.x[c, start:start + bucket]
+                pair = values[c, 2 * b:2 * b + 2]
+                self.assertEqual(sorted(pair), [block.min(), block.max()])
+                expected_first = block.min() if block.argmin() <= block.argmax() else block.max()
+                self.assertEqual(pair[0], expected_first)
+
+    def test_minmax_short_input_is_returned_whole(self):
+        indices, values = decimation.minmax_decimate(self.x[:, :150], 100)
+        np.testing.assert_array_equal(indices, np.arange(150))
+        np.testing.assert_array_equal(values, self.x[:, :150])
+
+    def test_lttb_matches_reference_per_channel(self):
+        indices, values = decimation.lttb_decimate(self.x, 200)
+        self.assertEqual(indices.shape, (3, 200))
+        for c in range(3):
+            self.assertEqual(indices[c].tolist(), lttb_reference(self.x[c], 200))
+            np.testing.assert_array_equal(values[c], self.x[c, indices[c]])
+
+    def test_lttb_threshold_above_length_keeps_everything(self):
+        indices, values = decimation.lttb_decimate(self.x[:, :50], 200)
+        np.testing.assert_array_equal(indices[0], np.arange(50))
+        np.testing.assert_array_equal(values, self.x[:, :50])
+
+
+# -------------------------------
+# HTTP Range
+# -------------------------------
+class RangeResponseTests(SimpleTestCase):
+    body = bytes(range(100))
+
+    def get(self, range_header=None):
+        headers = {"HTTP_RANGE": range_header} if range_header is not None else {}
+        return _range_response(RequestFactory().get("/", **headers), self.body, "audio/wav")
+
+    def test_no_range_returns_full_body(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_closed_open_and_suffix_ranges(self):
+        cases = {
+            "bytes=0-9": (0, 9),
+            "bytes=90-": (90, 99),
+            "bytes=-10": (90, 99),
+            "bytes=95-500": (95, 99),
+            "bytes=-500": (0, 99),
+        }
+        for header, (start, stop) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.content, self.body[start:stop + 1])
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{stop}/100")
+
+    def test_unsatisfiable_range(self):
+        for header in ("bytes=100-", "bytes=50-10"):
+            with self.subTest(header=header):
+                response = self.get(header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_malformed_range_is_ignored(self):
+        for header in ("bytes=-", "bytes=a-b", "items=0-1", "bytes=0-1,5-6"):
+            with self.subTest(header=header):
+                response = self.get(header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.body)
+
+
+# -------------------------------
+# Offload gating
+# -------------------------------
+class OffloadGateTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def blocking(self, *args):
+        self.release.wait(5)
+        return "done"
+
+    async def test_rejects_past_concurrency_plus_queue(self):
+        gate = offload.Gate("test_gate", concurrency=1, queue=1)
+        jobs = [asyncio.ensure_future(gate.run(self.blocking)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with self.assertRaises(offload.Overloaded):
+            await gate.run(self.blocking)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*jobs), ["done", "done"])
+        self.assertEqual(await gate.run(self.blocking), "done")  # slots are freed again
+        stats = gate.stats()
+        self.assertEqual((stats["admitted"], stats["rejected"], stats["in_flight"]), (3, 1, 0))
+
+    async def test_offloaded_view_answers_429_with_retry_after(self):
+        name = "test_offloaded_view"
+        offload._gates[name] = offload.Gate(name, concurrency=1, queue=0)
+        self.addCleanup(offload._gates.pop, name, None)
+
+        @offload.offloaded(name)
+        def view(request):
+            self.blocking()
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/")
+        first = asyncio.ensure_future(view(request))
+        await asyncio.sleep(0.05)
+        busy = await view(request)
+        self.assertEqual(busy.status_code, 429)
+        self.assertEqual(busy["Retry-After"], str(offload.RETRY_AFTER))
+        self.release.set()
+        self.assertEqual((await first).status_code, 200)
+
+    async def test_unstarted_stream_releases_its_slot(self):
+        gate = offload.Gate("test_stream", concurrency=1, queue=0)
+        stream = gate.stream(iter(range(3)))
+        with self.assertRaises(offload.Overloaded):
+            gate.stream(iter(range(3)))
+        stream.close()
+        self.assertEqual(gate.stats()["in_flight"], 0)
+        self.assertEqual([item async for item in gate.stream(iter(range(3)))], [0, 1, 2])
+
+    def use_gate(self, name, concurrency=1, queue=0):
+        offload._gates[name] = offload.Gate(name, concurrency, queue)
+        self.addCleanup(offload._gates.pop, name, None)
+        return offload._gates[name]
+
+    def test_wsgi_stream_holds_its_slot_until_consumed(self):
+        gate = self.use_gate("test_wsgi_stream")
+        request = RequestFactory().get("/")
+        content = offload.streamed("test_wsgi_stream", request, iter(range(3)))
+        with self.assertRaises(offload.Overloaded):
+            offload.streamed("test_wsgi_stream", request, iter(range(3)))
+        self.assertEqual(next(content), 0)
+        self.assertEqual(gate.stats()["in_flight"], 1)
+        self.assertEqual(list(content), [1, 2])
+        self.assertEqual(gate.stats()["in_flight"], 0)
+
+        unread = StreamingHttpResponse(offload.streamed("test_wsgi_stream", request, iter(range(3))))
+        unread.close()  # what a WSGI server does when the client goes away
+        self.assertEqual(gate.stats()["in_flight"], 0)
+
+    def test_streamed_view_keeps_its_slot_under_wsgi(self):
+        gate = self.use_gate("doppler_audio", concurrency=2)
+        scene = doppler_scene.parse_scene({"duration": 0.5, "fs": 8000, "frequency": 440, "velocity": 20})
+        url = f"/doppler/audio/?scene={doppler_scene.scene_token(scene)}"
+        response = Client().get(url)
+        self.assertEqual(gate.stats()["in_flight"], 1)  # the view's job is done, the stream is not
+        self.assertEqual(Client().get(url).status_code, 429)
+        body = b"".join(response.streaming_content)
+        response.close()
+        self.assertEqual(len(body), 44 + 4000 * 4)
+        self.assertEqual(gate.stats()["in_flight"], 0)
+
+
+# -------------------------------
+# WFDB digital samples
+# -------------------------------
+class WfdbDigitalTests(SimpleTestCase):
+    def setUp(self):
+        import wfdb
+
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        t = np.arange(2000) / 250
+        self.physical = np.stack([np.sin(2 * np.pi * t), 0.5 * np.cos(2 * np.pi * 3 * t) + 0.1], axis=1)
+        self.physical[100, 1] = np.nan  # stored as the format's missing-sample value
+        wfdb.wrsamp("rec", fs=250, units=["mV", "mV"], sig_name=["I", "II"], p_signal=self.physical,
+                    fmt=["16", "212"], adc_gain=[1000.0, 200.0], baseline=[0, 10], write_dir=self.dir)
+        self.entry = {"source_dir": self.dir, **wfdb_reader.describe_path(f"{self.dir}/rec")}
+
+    def test_digital_round_trip(self):
+        self.assertTrue(wfdb_reader.supports_digital(self.entry))
+        data, gain, baseline, invalid = wfdb_reader.read_digital(self.entry, 50, 1500, [1, 0])
+        self.assertEqual(data.dtype, np.int16)
+        self.assertEqual(data.shape, (2, 1450))
+        np.testing.assert_array_equal(gain, [200.0, 1000.0])
+        np.testing.assert_array_equal(baseline, [10, 0])
+
+        physical = wfdb_reader.to_physical(data, gain, baseline, invalid)
+        self.assertEqual(physical.dtype, np.float32)
+        expected = self.physical[50:1500, [1, 0]].T
+        np.testing.assert_array_equal(np.isnan(physical), np.isnan(expected))
+        np.testing.assert_allclose(physical, expected, atol=0.5 / gain[:, None].min(), equal_nan=True)
+
+    def test_read_window_uses_the_same_values(self):
+        digital = wfdb_reader.to_physical(*wfdb_reader.read_digital(self.entry, 0, 2000))
+        np.testing.assert_array_equal(wfdb_reader.read_window(self.entry, 0, 2000), digital)
+
+    def test_empty_window(self):
+        data, gain, _, _ = wfdb_reader.read_digital(self.entry, 10, 10, [0])
+        self.assertEqual(data.shape, (1, 0))
+        self.assertEqual(gain.tolist(), [1000.0])
+
+    def write(self, name, fmt):
+        import wfdb
+
+        signal = self.physical[:, :1] / 4
+        wfdb.wrsamp(name, fs=250, units=["mV"], sig_name=["I"], p_signal=signal, fmt=[fmt], adc_gain=[100.0],
+                    baseline=[0], write_dir=self.dir)
+        return {"source_dir": self.dir, **wfdb_reader.describe_path(f"{self.dir}/{name}")}
+
+    def test_missing_samples_in_every_digital_format(self):
+        self.physical[100, 0] = np.nan
+        for fmt in ("16", "80", "212", "508", "516"):  # the formats wfdb can write
+            with self.subTest(fmt=fmt):
+                shutil.rmtree(self.dir)
+                os.makedirs(self.dir)
+                entry = self.write("rec", fmt)
+                self.assertTrue(wfdb_reader.supports_digital(entry))
+                window = wfdb_reader.read_window(entry, 90, 110)
+                self.assertEqual(np.flatnonzero(np.isnan(window[0])).tolist(), [10])
+
+    def test_formats_without_a_missing_sample_value_are_read_as_physical(self):
+        self.assertFalse(wfdb_reader.supports_digital({"fmt": ["16", "8"]}))  # 8: first differences
+        self.assertFalse(wfdb_reader.supports_digital({"fmt": ["24"]}))
+        self.assertTrue(wfdb_reader.supports_digital({"fmt": ["61", "160", "310", "311"]}))
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import home_view, ecg_view, eeg_view, sar_view, doppler_view, drones_view, \
-    audio_sampling_view  # import from views folder
+from .views import home_view  # import from views folder
 from .views.home_view import audio_sampling
+from .views.lazy import lazy_view  # feature views (and their dependencies) load on first request
+# asynchronous=True: upload/processing views that run in bounded pools (myapp/services/offload.py)
 
 urlpatterns = [
 
@@ -18,33 +19,51 @@ urlpatterns = [
 
 
     #   ECG  #
-    path('ecg/upload/', ecg_view.ecg_upload, name='ecg_upload'),
+    path('ecg/header/', lazy_view('ecg', 'ecg_header'), name='ecg_header'),
+    path('ecg/upload/', lazy_view('ecg', 'ecg_upload', asynchronous=True), name='ecg_upload'),
+    path('ecg/<str:signal_id>/page/', lazy_view('ecg', 'ecg_page'), name='ecg_page'),
 
 
     #   EEG   #
-path('eeg/upload/', eeg_view.eeg_upload, name='eeg_upload'),
+path('eeg/upload/', lazy_view('eeg', 'eeg_upload', asynchronous=True), name='eeg_upload'),
+path('eeg/<str:signal_id>/page/', lazy_view('eeg', 'eeg_page'), name='eeg_page'),
+
+
+    #   ECG / EEG signals (cached uploads)   #
+    path('signals/<str:signal_id>/window/', lazy_view('signals', 'signal_window', asynchronous=True), name='signal_window'),
+    path('signals/<str:signal_id>/histogram/', lazy_view('signals', 'signal_histogram', asynchronous=True), name='signal_histogram'),
+    path('signals/<str:signal_id>/recurrence/', lazy_view('signals', 'signal_recurrence', asynchronous=True), name='signal_recurrence'),
 
 
 
     #   SAR   #
-path('sar/process/', sar_view.process_sar, name='process_sar'),
+path('sar/process/', lazy_view('sar', 'process_sar', asynchronous=True), name='process_sar'),
+path('sar/tiles/<str:product_id>/<int:z>/<int:x>/<int:y>.<str:fmt>', lazy_view('sar', 'sar_tile'), name='sar_tile'),
 
 
 
     #   Doppler   #
-path('doppler/simulate/', doppler_view.simulate_doppler, name='doppler_simulate'),
+path('doppler/simulate/', lazy_view('doppler', 'simulate_doppler'), name='doppler_simulate'),
+path('doppler/audio/', lazy_view('doppler', 'doppler_audio', asynchronous=True), name='doppler_audio'),
 
 
     #   Drones   #
 
-path('drones/analyze/',drones_view.drone_upload,name='drone_upload'),
+path('drones/analyze/',lazy_view('drones', 'drone_upload', asynchronous=True),name='drone_upload'),
+path('drones/timeline/', lazy_view('drones', 'drone_timeline', asynchronous=True), name='drone_timeline'),
 
 
 
     #   audio sampling   #
 
-    path('analyze/', audio_sampling_view.analyze_audio, name='analyze_audio'),
-    path('resample/', audio_sampling_view.resample_audio, name='resample_audio'),
-    path('predict/', audio_sampling_view.predict_audio, name='predict_audio'),
+    path('analyze/', lazy_view('audio', 'analyze_audio', asynchronous=True), name='analyze_audio'),
+    path('resample/', lazy_view('audio', 'resample_audio', asynchronous=True), name='resample_audio'),
+    path('predict/', lazy_view('audio', 'predict_audio', asynchronous=True), name='predict_audio'),
+    path('audio/<str:audio_id>/rate/<int:sr>/', lazy_view('audio', 'audio_rate'), name='audio_rate'),
+
+
+    #   metrics (Prometheus)   #
+
+    path('metrics', lazy_view('metrics', 'metrics_view'), name='metrics'),
 
 ]
\ No newline at end of file
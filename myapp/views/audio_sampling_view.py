@@ -1,27 +1,21 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
-import numpy as np
-from scipy.io import wavfile
-from scipy.fft import fft
-from scipy import signal
-import librosa
 import io
 import base64
+import re
 import traceback
-import io
-import base64
-import numpy as np
-import librosa
 import soundfile as sf
-import tensorflow as tf
-from transformers import pipeline
-from django.http import JsonResponse
+from django.conf import settings
+from myapp.services import model_registry, batching, audio_stream
+from myapp.services import resampling, audio_sessions, inference_worker
+from myapp.services.offload import offloaded
+from myapp.services.metrics import instrumented, stage
 
 
 
 
+@offloaded()
+@instrumented
 @require_http_methods(["POST"])
 def analyze_audio(request):
     try:
@@ -30,33 +24,17 @@ def analyze_audio(request):
 
         audio_file = request.FILES['audio']
 
-        # Load audio
-        audio_data, sample_rate = librosa.load(audio_file, sr=None)
-
-        # FFT for frequency analysis
-        fft_values = np.abs(fft(audio_data))
-        freqs = np.fft.fftfreq(len(audio_data), 1 / sample_rate)
-
-        # Positive frequencies
-        positive_freqs = freqs[:len(freqs) // 2]
-        positive_fft = fft_values[:len(fft_values) // 2]
-
-        # Find significant frequency range
-        threshold = np.max(positive_fft) * 0.01
-        significant_indices = np.where(positive_fft > threshold)[0]
-
-        if len(significant_indices) > 0:
-            fmax = positive_freqs[significant_indices[-1]]
-        else:
-            fmax = positive_freqs[np.argmax(positive_fft)]
-
-        nyquist_freq = 2 * fmax
+        # Spectrum, fmax and Nyquist rate (cached by content hash); the clip is
+        # kept as a session so renditions can be fetched by rate without re-uploading
+        with stage("fft"):
+            analysis = audio_sessions.create(audio_file)
 
         return JsonResponse({
             'success': True,
-            'fmax': round(fmax, 2),
-            'nyquist_freq': round(nyquist_freq, 2),
-            'original_sr': int(sample_rate),
+            'audio_id': analysis.key,
+            'fmax': round(analysis.fmax, 2),
+            'nyquist_freq': round(analysis.nyquist_freq, 2),
+            'original_sr': int(analysis.samplerate),
         })
 
     except Exception as e:
@@ -64,61 +42,78 @@ def analyze_audio(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 ANTI_ALIAS_MODEL_PATH = "anti_alias_model.h5"
+GENDER_MODEL_ID = "prithivMLmods/Common-Voice-Gender-Detection"
 
-try:
-    aa_model = tf.keras.models.load_model(ANTI_ALIAS_MODEL_PATH, compile=False)
-    MODEL_LOADED = True
-    print("✅ Anti-aliasing model loaded successfully!")
-except Exception as e:
-    print(f"⚠ Could not load anti-aliasing model: {e}")
-    MODEL_LOADED = False
-    aa_model = None
+AA_MODEL_SR = 16000
+AA_MODEL_LEN = 48000  # samples per model input (3 s at 16 kHz)
+AA_MAX_BATCH = getattr(settings, "AA_MAX_BATCH", 16)  # frames per predict call, caps memory
+AA_OVERLAP = getattr(settings, "AA_OVERLAP", 0)  # cross-faded samples between frames
 
-# Load Hugging Face Gender Classifier
-try:
-    classifier = pipeline("audio-classification", model="prithivMLmods/Common-Voice-Gender-Detection")
-    print("✅ Gender classifier loaded successfully!")
-except Exception as e:
-    print(f"⚠ Could not load gender classifier: {e}")
-    classifier = None
+
+def get_aa_model():
+    """Anti-aliasing Keras model from the registry, or None if it cannot be loaded."""
+    try:
+        return model_registry.get_model("keras", ANTI_ALIAS_MODEL_PATH)
+    except Exception as e:
+        print(f"⚠ Could not load anti-aliasing model: {e}")
+        return None
+
+
+def get_gender_classifier():
+    """Hugging Face gender classifier from the registry, or None if it cannot be loaded."""
+    try:
+        return model_registry.get_model("audio-classification", GENDER_MODEL_ID)
+    except Exception as e:
+        print(f"⚠ Could not load gender classifier: {e}")
+        return None
 
 
 # -------------------------------
 # Helper: Apply Anti-Aliasing
 # -------------------------------
 def apply_model_reconstruction(y_input, sr_input):
-    if not MODEL_LOADED:
+    # With the inference worker enabled the model lives there; a load failure surfaces below
+    if not inference_worker.ENABLED and get_aa_model() is None:
         print("⚠ Model not available, performing standard upsampling.")
-        return librosa.resample(y_input, orig_sr=sr_input, target_sr=16000)
+        return resampling.resample(y_input, sr_input, 16000)
 
     try:
-        model_sr = 16000
-        model_len = 48000
-        y_upsampled = librosa.resample(y_input, orig_sr=sr_input, target_sr=model_sr)
-
-        reconstructed_chunks = []
-        for i in range(0, len(y_upsampled), model_len):
-            chunk = y_upsampled[i:i + model_len]
-            len_chunk = len(chunk)
-            if len_chunk < model_len:
-                chunk = np.pad(chunk, (0, model_len - len_chunk), mode='constant')
-
-            model_input = chunk[np.newaxis, ..., np.newaxis]
-            pred_chunk = np.squeeze(aa_model.predict(model_input, verbose=0))
-            if len_chunk < model_len:
-                pred_chunk = pred_chunk[:len_chunk]
-            reconstructed_chunks.append(pred_chunk)
-
-        y_reconstructed = np.concatenate(reconstructed_chunks)
-        return y_reconstructed
+        y_upsampled = y_input
+        if sr_input != AA_MODEL_SR:
+            y_upsampled = resampling.resample(y_input, sr_input, AA_MODEL_SR)
+        return inference_worker.reconstruct(
+            ANTI_ALIAS_MODEL_PATH, y_upsampled,
+            frame_len=AA_MODEL_LEN, max_batch=AA_MAX_BATCH, overlap=AA_OVERLAP,
+        )
     except Exception as e:
         print(f"❌ Error during reconstruction: {e}")
-        return librosa.resample(y_input, orig_sr=sr_input, target_sr=16000)
+        return resampling.resample(y_input, sr_input, 16000)
+
+
+def classify_gender(y):
+    """Top (label, score) for 16 kHz audio, or ("unknown", 0.0) if the classifier cannot be loaded."""
+    if inference_worker.ENABLED:
+        try:
+            results = inference_worker.classify(
+                "audio-classification", GENDER_MODEL_ID, {"array": y, "sampling_rate": 16000})
+        except inference_worker.InferenceError as e:
+            print(f"⚠ Gender classification failed in the inference worker: {e}")
+            return "unknown", 0.0
+    elif get_gender_classifier():
+        # Hugging Face pipeline works directly with np.ndarray or file-like
+        results = batching.classify(
+            "audio-classification", GENDER_MODEL_ID, {"array": y, "sampling_rate": 16000})
+    else:
+        return "unknown", 0.0
+    top = results[0]
+    return top["label"], round(top["score"], 3)
 
 
 # -------------------------------
 # Django Endpoint
 # -------------------------------
+@offloaded()
+@instrumented
 @require_http_methods(["POST"])
 def predict_audio(request):
     """
@@ -135,44 +130,44 @@ def predict_audio(request):
         return JsonResponse({"success": False, "error": "No audio file uploaded."})
 
     try:
-        # Load uploaded audio
-        audio_file = request.FILES["audio"]
-        y, sr = librosa.load(audio_file, sr=None)
-        print(f"Loaded audio with SR={sr}, length={len(y)/sr:.2f}s")
+        # Decode the upload straight to the model rate, block by block
+        with stage("decode"):
+            audio_file = request.FILES["audio"]
+            y, sr = audio_stream.decode_resampled(audio_file, AA_MODEL_SR)
+        print(f"Loaded audio with SR={sr}, length={len(y)/AA_MODEL_SR:.2f}s")
 
         # Apply anti-aliasing
-        y_reconstructed = apply_model_reconstruction(y, sr)
+        with stage("reconstruct"):
+            y_reconstructed = apply_model_reconstruction(y, AA_MODEL_SR)
 
         # Save to memory buffer as WAV
-        buffer = io.BytesIO()
-        sf.write(buffer, y_reconstructed, 16000, format="WAV")
-        buffer.seek(0)
+        with stage("encode"):
+            buffer = io.BytesIO()
+            sf.write(buffer, y_reconstructed, 16000, format="WAV")
+            buffer.seek(0)
 
         # Classify reconstructed audio
-        if classifier:
-            # Hugging Face pipeline works directly with np.ndarray or file-like
-            results = classifier({"array": y_reconstructed, "sampling_rate": 16000})
-            top = results[0]
-            label = top["label"]
-            score = round(top["score"], 3)
-        else:
-            label, score = "unknown", 0.0
+        with stage("classify"):
+            label, score = classify_gender(y_reconstructed)
 
         # Encode audio as base64 for frontend playback
-        buffer.seek(0)
-        audio_base64 = base64.b64encode(buffer.read()).decode("utf-8")
-        audio_data_uri = f"data:audio/wav;base64,{audio_base64}"
-
-        return JsonResponse({
-            "success": True,
-            "label": label,
-            "confidence": score,
-            "audio_data": audio_data_uri
-        })
+        with stage("serialize"):
+            buffer.seek(0)
+            audio_base64 = base64.b64encode(buffer.read()).decode("utf-8")
+            audio_data_uri = f"data:audio/wav;base64,{audio_base64}"
+
+            return JsonResponse({
+                "success": True,
+                "label": label,
+                "confidence": score,
+                "audio_data": audio_data_uri
+            })
 
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
+@offloaded()
+@instrumented
 @require_http_methods(["POST"])
 def resample_audio(request):
     try:
@@ -182,42 +177,17 @@ def resample_audio(request):
         new_sr = int(request.POST.get('sampling_rate', 44100))
         audio_file = request.FILES['audio']
 
-        # Load original audio
-        audio_data, original_sr = librosa.load(audio_file, sr=None)
-
-        # Resample
-        num_samples = int(len(audio_data) * new_sr / original_sr)
-        resampled_audio = signal.resample(audio_data, num_samples)
-
-        # Handle very low sample rates by upsampling for playback
-        playback_sr = new_sr
-        if new_sr < 8000:
-            playback_sr = 44100
-            upsampled_audio = signal.resample(resampled_audio, int(len(resampled_audio) * playback_sr / new_sr))
-            resampled_audio = upsampled_audio
+        # Same renditions as GET /audio/<id>/rate/<sr>/ (low rates are upsampled for playback)
+        with stage("fft"):
+            analysis = audio_sessions.create(audio_file)
+        with stage("resample"):
+            wav_bytes = audio_sessions.render(analysis.key, new_sr, analysis)
 
-        # Normalize
-        max_val = np.max(np.abs(resampled_audio))
-        if max_val > 0:
-            resampled_audio = resampled_audio / max_val * 0.85
-
-        resampled_audio = np.clip(resampled_audio, -1.0, 1.0)
-        audio_int16 = np.int16(resampled_audio * 32767)
-
-        # Convert to WAV in memory
-        wav_buffer = io.BytesIO()
-        wavfile.write(wav_buffer, playback_sr, audio_int16)
-        wav_buffer.seek(0)
-
-        audio_base64 = base64.b64encode(wav_buffer.read()).decode('utf-8')
+        with stage("serialize"):
+            audio_base64 = base64.b64encode(wav_bytes).decode('utf-8')
 
         # Nyquist check
-        fft_values = np.abs(fft(audio_data))
-        freqs = np.fft.fftfreq(len(audio_data), 1 / original_sr)
-        positive_freqs = freqs[:len(freqs) // 2]
-        positive_fft = fft_values[:len(fft_values) // 2]
-        fmax = float(positive_freqs[np.argmax(positive_fft)])  # force Python float
-        nyquist_freq = float(2 * fmax)
+        nyquist_freq = analysis.nyquist_freq
         is_below_nyquist = bool(new_sr < nyquist_freq)  # force Python bool
 
         return JsonResponse({
@@ -232,4 +202,54 @@ def resample_audio(request):
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-   
\ No newline at end of file
+
+# -------------------------------
+# Audio sessions: renditions by rate
+# -------------------------------
+MAX_SAMPLING_RATE = 384000
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _range_response(request, body, content_type):
+    """Serve ``body`` honouring a single-range ``Range`` header (206/416); full body otherwise."""
+    size = len(body)
+    match = RANGE_RE.match(request.headers.get("Range", "").strip())
+    if not match or match.groups() == ("", ""):
+        response = HttpResponse(body, content_type=content_type)
+    else:
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            stop = min(int(last), size - 1) if last else size - 1
+        else:  # suffix range: the last N bytes
+            start, stop = max(size - int(last), 0), size - 1
+        if start >= size or start > stop:
+            response = HttpResponse(status=416, content_type=content_type)
+            response["Content-Range"] = f"bytes */{size}"
+            response["Accept-Ranges"] = "bytes"
+            return response
+        response = HttpResponse(body[start:stop + 1], status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{stop}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@instrumented
+@require_http_methods(["GET", "HEAD"])
+def audio_rate(request, audio_id, sr):
+    """WAV rendition of an analysed clip at ``sr`` Hz, cached per rate, with Range support."""
+    if not 1 <= sr <= MAX_SAMPLING_RATE:
+        return JsonResponse({'success': False, 'error': f'sampling rate must be 1-{MAX_SAMPLING_RATE} Hz'}, status=400)
+    try:
+        with stage("resample"):
+            wav_bytes = audio_sessions.render(audio_id, sr)
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    if wav_bytes is None:
+        return JsonResponse({'success': False, 'error': 'Unknown or expired audio_id, upload the file again'}, status=404)
+
+    response = _range_response(request, wav_bytes, "audio/wav")
+    response["Cache-Control"] = "private, max-age=3600"  # content is keyed by hash, never changes
+    response["ETag"] = f'"{audio_id}-{sr}"'
+    return response
@@ -1,32 +1,31 @@
-import os
-import torch
-from django.http import JsonResponse
-from transformers import pipeline
-from django.views.decorators.csrf import csrf_exempt
+import json
+from django.http import JsonResponse, StreamingHttpResponse
+from myapp.services import inference_worker, drone_timeline as timeline
+from myapp.services.audio_stream import decode_resampled
+from myapp.services.offload import Overloaded, busy_response, offloaded, streamed
+from myapp.services.metrics import bind_endpoint, instrumented, stage
 
 
+DRONE_MODEL_ID = "preszzz/drone-audio-detection-05-17-trial-0"
 
+
+@offloaded()
+@instrumented
 def drone_upload(request):
     if request.method == "POST" and request.FILES.get("audio"):
         audio_file = request.FILES["audio"]
 
-        # Save uploaded file temporarily
-        temp_path = f"temp_{audio_file.name}"
-        with open(temp_path, "wb+") as f:
-            for chunk in audio_file.chunks():
-                f.write(chunk)
-
         try:
-            # Load the Hugging Face model
-            model_id = "preszzz/drone-audio-detection-05-17-trial-0"
-            classifier = pipeline(
-                "audio-classification",
-                model=model_id,
-                device=0 if torch.cuda.is_available() else -1
-            )
-
-            # Predict
-            predictions = classifier(temp_path)
+            # Decoded from the upload in memory, at the classifier rate
+            with stage("parse"):
+                y, _ = decode_resampled(audio_file, inference_worker.CLASSIFIER_SR)
+
+            # Predict (batched with concurrent uploads on the shared model, in the
+            # inference worker when it is enabled)
+            with stage("inference"):
+                predictions = inference_worker.classify(
+                    "audio-classification", DRONE_MODEL_ID,
+                    {"array": y, "sampling_rate": inference_worker.CLASSIFIER_SR})
             top = predictions[0]
             result = {
                 "classification": top["label"],
@@ -37,11 +36,39 @@ def drone_upload(request):
         except Exception as e:
             result = {"error": str(e)}
 
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-
         return JsonResponse(result)
 
-    return JsonResponse({"error": "No audio file uploaded."}, status=400)
\ No newline at end of file
+    return JsonResponse({"error": "No audio file uploaded."}, status=400)
+
+
+def _ndjson(events):
+    try:
+        for event in events:
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        # Headers are already sent: report the failure as the last line
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+
+@offloaded()
+@instrumented
+def drone_timeline(request):
+    """
+    Sliding-window detection over a (long) upload: one NDJSON line per window
+    (label and confidence, or gated when near-silent), streamed while the
+    recording is processed, then a summary line.
+    """
+    if request.method != "POST" or not request.FILES.get("audio"):
+        return JsonResponse({"error": "No audio file uploaded."}, status=400)
+
+    # The upload stays open until the response is closed; it is decoded while streaming
+    events = timeline.detect(request.FILES["audio"], DRONE_MODEL_ID)
+    try:
+        content = streamed("drone_timeline", request, bind_endpoint(_ndjson(events)))
+    except Overloaded:
+        return busy_response()
+
+    response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let proxies pass lines through as they come
+    return response
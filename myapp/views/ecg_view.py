@@ -1,15 +1,57 @@
 import os
 import tempfile
-import wfdb
+import numpy as np
+from django.conf import settings
 from django.http import JsonResponse
-from django.shortcuts import render
+from myapp.services import signal_transport, signal_cache, eeg_reader, wfdb_reader
+from myapp.services.offload import offloaded
+from myapp.services.metrics import instrumented, stage
+from myapp.views.signal_view import parse_channels
 
 
+PAGE_SECS = getattr(settings, 'ECG_PAGE_SECS', 60)  # seconds returned by the upload / default page
+MAX_PAGE_SECS = getattr(settings, 'ECG_MAX_PAGE_SECS', 300)  # upper bound per page request
 
 
+def read_page(request, entry, start, stop, picks=None):
+    """
+    Samples [start, stop) for a response: int16 digital samples and their
+    (gain, baseline, invalid) when the client converts them itself, else
+    float32 physical values and None.
+    """
+    if signal_transport.wants_binary(request) and signal_transport.wants_digital(request) \
+            and eeg_reader.supports_digital(entry):
+        data, gain, baseline, invalid = eeg_reader.read_digital(entry, start, stop, picks)
+        return data, (gain, baseline, invalid)
+    return eeg_reader.read_window(entry, start, stop, picks), None
 
+
+@instrumented
+def ecg_header(request):
+    """Read an uploaded .hea file only: leads, sampling rate and duration, no samples."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST method required'})
+
+    hea_file = request.FILES.get('hea_file')
+    if not hea_file:
+        return JsonResponse({'error': '.hea file is required'})
+
+    try:
+        with stage("parse"), tempfile.TemporaryDirectory() as temp_dir:
+            hea_path = os.path.join(temp_dir, os.path.basename(hea_file.name))
+            with open(hea_path, 'wb') as f:
+                for chunk in hea_file.chunks():
+                    f.write(chunk)
+            info = wfdb_reader.describe_path(os.path.splitext(hea_path)[0])
+        return JsonResponse(info)
+    except Exception as e:
+        return JsonResponse({'error': str(e)})
+
+
+@offloaded()
+@instrumented
 def ecg_upload(request):
-    """Handle uploaded ECG .dat/.hea files and return signal(s) for plotting"""
+    """Handle uploaded ECG .dat/.hea files and return the first PAGE_SECS of signal(s) for plotting"""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required'})
 
@@ -21,34 +63,100 @@ def ecg_upload(request):
         return JsonResponse({'error': 'Both .dat and .hea files are required'})
 
     try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
+        # Same record uploaded before -> skip saving and header parsing
+        signal_id = signal_cache.content_key('ecg', dat_file, hea_file)
+        entry = signal_cache.get(signal_id)
 
-        # Save both files
-        dat_path = os.path.join(temp_dir, dat_file.name)
-        hea_path = os.path.join(temp_dir, hea_file.name)
+        if entry is None or 'channels' not in entry:
+            # Keep the files and read windows from them (header only here)
+            with stage("parse"):
+                entry = signal_cache.put_source(signal_id, [dat_file, hea_file], format='wfdb')
+                info = eeg_reader.describe(entry)
+            if info['fs'] <= 0:
+                return JsonResponse({'error': 'Invalid sampling frequency in header'})
+            signal_cache.update_meta(signal_id, **info)
+            entry.update(info)
 
-        with open(dat_path, 'wb') as f:
-            for chunk in dat_file.chunks():
-                f.write(chunk)
-        with open(hea_path, 'wb') as f:
-            for chunk in hea_file.chunks():
-                f.write(chunk)
+        channels = entry['channels']
+        fs = entry['fs']
+        total_samples = eeg_reader.n_samples(entry)
 
-        # Read ECG record (wfdb automatically uses both files)
-        base_name = os.path.splitext(dat_path)[0]
-        record = wfdb.rdrecord(base_name)
+        # First page only; the rest is fetched through ecg_page
+        max_samples = min(total_samples, int(fs * PAGE_SECS))
+        if max_samples <= 0:
+            return JsonResponse({'error': 'No samples found in uploaded record'})
 
-        # Convert to JSON-friendly structures
-        signals = record.p_signal.tolist()
-        channels = record.sig_name
-        fs = record.fs
+        with stage("read"):
+            data_page, digital = read_page(request, entry, 0, max_samples)  # (n_channels, n_samples_page)
 
-        return JsonResponse({
-            'signals': signals,
-            'channels': channels,
-            'fs': fs
-        })
+        with stage("serialize"):
+            # Binary columnar float32 (or int16 digital) when the client asks for it
+            if signal_transport.wants_binary(request):
+                return signal_transport.binary_signal_response(
+                    data_page, channels, fs, request, digital=digital,
+                    extra={'signal_id': signal_id, 'total_samples': total_samples, 'start_sample': 0})
+
+            # Convert to JSON-friendly structures
+            signals = data_page.T.tolist()
+
+            return JsonResponse({
+                'signals': signals,
+                'channels': channels,
+                'fs': fs,
+                'signal_id': signal_id,
+                'total_samples': total_samples,
+                'start_sample': 0
+            })
 
     except Exception as e:
-        return JsonResponse({'error': str(e)})
\ No newline at end of file
+        return JsonResponse({'error': str(e)})
+
+
+@instrumented
+def ecg_page(request, signal_id):
+    """
+    Return seconds [start, stop) of selected leads of a cached ECG record.
+    Only the requested window is read from disk (at most MAX_PAGE_SECS).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'})
+
+    entry = signal_cache.get(signal_id)
+    if entry is None or 'channels' not in entry:
+        return JsonResponse({'error': 'Unknown signal_id, please upload the record again'}, status=404)
+
+    channels = entry['channels']
+    fs = entry['fs']
+    total_samples = eeg_reader.n_samples(entry)
+    try:
+        start = float(request.GET.get('start', 0))
+        stop = float(request.GET.get('stop', start + PAGE_SECS))
+        picks = parse_channels(request.GET.get('channels'), len(channels))
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
+
+    stop = min(stop, start + MAX_PAGE_SECS)
+    i0 = int(np.clip(np.floor(start * fs), 0, total_samples))
+    i1 = int(np.clip(np.ceil(stop * fs), i0, total_samples))
+
+    try:
+        with stage("read"):
+            data_page, digital = read_page(request, entry, i0, i1, picks)
+    except Exception as e:
+        return JsonResponse({'error': str(e)})
+    names = [channels[p] for p in picks]
+
+    with stage("serialize"):
+        if signal_transport.wants_binary(request):
+            return signal_transport.binary_signal_response(
+                data_page, names, fs, request, digital=digital,
+                extra={'signal_id': signal_id, 'total_samples': total_samples, 'start_sample': i0})
+
+        return JsonResponse({
+            'signals': data_page.T.tolist(),
+            'channels': names,
+            'fs': fs,
+            'signal_id': signal_id,
+            'total_samples': total_samples,
+            'start_sample': i0
+        })
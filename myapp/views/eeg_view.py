@@ -1,73 +1,126 @@
-import os
-import tempfile
-import shutil
-import mne
+import numpy as np
+from django.conf import settings
 from django.http import JsonResponse
-from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
+from myapp.services import signal_transport, signal_cache, eeg_reader
+from myapp.services.offload import offloaded
+from myapp.services.metrics import instrumented, stage
+from myapp.views.signal_view import parse_channels
 
 
-TRUNC_SECS = 10  # keep first N seconds only
+PAGE_SECS = getattr(settings, 'EEG_PAGE_SECS', 10)  # seconds returned by the upload / default page
+MAX_PAGE_SECS = getattr(settings, 'EEG_MAX_PAGE_SECS', 60)  # upper bound per page request
 
 
 @csrf_exempt
+@offloaded()
+@instrumented
 def eeg_upload(request):
-    """Handle uploaded EEG .set files and return signal(s) for plotting (truncated to first TRUNC_SECS)."""
+    """Handle uploaded EEG .set (+ optional .fdt) files and return the first PAGE_SECS of signal(s) for plotting."""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required'})
 
     set_file = request.FILES.get('set_file')
+    fdt_file = request.FILES.get('fdt_file')
     if not set_file:
         return JsonResponse({'error': '.set file is required'})
+    uploads = [f for f in (set_file, fdt_file) if f]
 
-    temp_dir = None
     try:
-        temp_dir = tempfile.mkdtemp()
-        set_path = os.path.join(temp_dir, set_file.name)
-
-        # Save uploaded file
-        with open(set_path, 'wb') as f:
-            for chunk in set_file.chunks():
-                f.write(chunk)
-
-        # Load EEG data using MNE (preload to access data)
-        raw = mne.io.read_raw_eeglab(set_path, preload=True)
-        data, times = raw.get_data(return_times=True)  # data shape: (n_channels, n_samples)
-        channels = raw.ch_names
-        fs = int(raw.info.get('sfreq', 0) or 0)
-        if fs <= 0:
-            # fallback or error
-            raw.close()
-            return JsonResponse({'error': 'Invalid sampling frequency from file'})
-
-        # Truncate to first TRUNC_SECS seconds (server-side)
-        max_samples = min(data.shape[1], int(fs * TRUNC_SECS))
+        # Same recording uploaded before -> skip saving and header parsing
+        signal_id = signal_cache.content_key('eeg', *uploads)
+        entry = signal_cache.get(signal_id)
+
+        if entry is None or 'channels' not in entry:
+            # Keep the files and open them lazily (no preload of the whole recording)
+            with stage("parse"):
+                entry = signal_cache.put_source(signal_id, uploads, format='eeglab')
+                info = eeg_reader.describe(entry)
+            if info['fs'] <= 0:
+                return JsonResponse({'error': 'Invalid sampling frequency from file'})
+            signal_cache.update_meta(signal_id, **info)
+            entry.update(info)
+
+        channels = entry['channels']
+        fs = entry['fs']
+        total_samples = eeg_reader.n_samples(entry)
+
+        # First page only; the rest is fetched through eeg_page
+        max_samples = min(total_samples, int(fs * PAGE_SECS))
         if max_samples <= 0:
-            raw.close()
             return JsonResponse({'error': 'No samples found in uploaded file'})
 
-        data_trunc = data[:, :max_samples]  # still (n_channels, n_samples_trunc)
+        with stage("read"):
+            data_page = eeg_reader.read_window(entry, 0, max_samples)  # (n_channels, n_samples_page)
 
-        # Convert to shape (samples, channels) for frontend (same as before)
-        signals = data_trunc.T.tolist()  # shape: (n_samples_trunc, n_channels)
+        with stage("serialize"):
+            # Binary columnar float32 when the client asks for it
+            if signal_transport.wants_binary(request):
+                return signal_transport.binary_signal_response(
+                    data_page, channels, fs, request,
+                    extra={'signal_id': signal_id, 'total_samples': total_samples, 'start_sample': 0})
 
-        # close raw to free resources
-        raw.close()
+            # Convert to shape (samples, channels) for frontend (same as before)
+            signals = data_page.T.tolist()  # shape: (n_samples_page, n_channels)
 
-        return JsonResponse({
-            'signals': signals,
-            'channels': channels,
-            'fs': fs
-        })
+            return JsonResponse({
+                'signals': signals,
+                'channels': channels,
+                'fs': fs,
+                'signal_id': signal_id,
+                'total_samples': total_samples,
+                'start_sample': 0
+            })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)})
+
+
+@instrumented
+def eeg_page(request, signal_id):
+    """
+    Return seconds [start, stop) of selected channels of a cached EEG recording.
+    Only the requested window is read from disk (at most MAX_PAGE_SECS).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'})
 
+    entry = signal_cache.get(signal_id)
+    if entry is None or 'channels' not in entry:
+        return JsonResponse({'error': 'Unknown signal_id, please upload the recording again'}, status=404)
+
+    channels = entry['channels']
+    fs = entry['fs']
+    total_samples = eeg_reader.n_samples(entry)
+    try:
+        start = float(request.GET.get('start', 0))
+        stop = float(request.GET.get('stop', start + PAGE_SECS))
+        picks = parse_channels(request.GET.get('channels'), len(channels))
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
+
+    stop = min(stop, start + MAX_PAGE_SECS)
+    i0 = int(np.clip(np.floor(start * fs), 0, total_samples))
+    i1 = int(np.clip(np.ceil(stop * fs), i0, total_samples))
+
+    try:
+        with stage("read"):
+            data_page = eeg_reader.read_window(entry, i0, i1, picks)
     except Exception as e:
         return JsonResponse({'error': str(e)})
-    finally:
-        # cleanup temporary directory if created
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
+    names = [channels[p] for p in picks]
 
+    with stage("serialize"):
+        if signal_transport.wants_binary(request):
+            return signal_transport.binary_signal_response(
+                data_page, names, fs, request,
+                extra={'signal_id': signal_id, 'total_samples': total_samples, 'start_sample': i0})
 
+        return JsonResponse({
+            'signals': data_page.T.tolist(),
+            'channels': names,
+            'fs': fs,
+            'signal_id': signal_id,
+            'total_samples': total_samples,
+            'start_sample': i0
+        })
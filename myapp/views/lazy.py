@@ -0,0 +1,65 @@
+"""
+Views resolved on first request.
+
+urls.py refers to feature views by name instead of importing their modules,
+so a worker only imports a feature's dependencies (rasterio, mne, wfdb,
+scipy, ...) when that feature is first used. ``PRELOAD_FEATURES`` in
+settings imports chosen features when the app starts instead.
+"""
+import importlib
+
+from asgiref.sync import sync_to_async
+
+
+FEATURE_MODULES = {
+    "ecg": "myapp.views.ecg_view",
+    "eeg": "myapp.views.eeg_view",
+    "signals": "myapp.views.signal_view",
+    "sar": "myapp.views.sar_view",
+    "doppler": "myapp.views.doppler_view",
+    "drones": "myapp.views.drones_view",
+    "audio": "myapp.views.audio_sampling_view",
+    "metrics": "myapp.views.metrics_view",
+}
+
+
+def lazy_view(feature, name, asynchronous=False):
+    """
+    URL callable that imports ``FEATURE_MODULES[feature]`` on first call and
+    delegates to ``name``. Pass ``asynchronous=True`` for async views, so Django
+    calls the wrapper on the event loop instead of a sync thread.
+    """
+    module_path = FEATURE_MODULES[feature]
+    resolved = []
+
+    def load():
+        if not resolved:
+            target = getattr(importlib.import_module(module_path), name)
+            if hasattr(target, "offload_endpoint"):  # lets offload.asgi_guard find the endpoint
+                view.offload_endpoint = target.offload_endpoint
+            resolved.append(target)
+        return resolved[0]
+
+    if asynchronous:
+        async def view(request, *args, **kwargs):
+            target = resolved[0] if resolved else await sync_to_async(load)()
+            return await target(request, *args, **kwargs)
+    else:
+        def view(request, *args, **kwargs):
+            return load()(request, *args, **kwargs)
+
+    view.__name__ = view.__qualname__ = name
+    view.__module__ = module_path
+    return view
+
+
+def preload(features):
+    """Import the view modules of ``features`` now ("*" for all)."""
+    if "*" in features:
+        features = list(FEATURE_MODULES)
+    for feature in features:
+        try:
+            importlib.import_module(FEATURE_MODULES[feature])
+            print(f"✅ Preloaded {feature} views")
+        except Exception as e:
+            print(f"⚠ Could not preload {feature} views: {e}")
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from myapp.services import metrics
+
+
+ALLOWED_IPS = getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the stage/request histograms and service counters.
+    Only served to ``METRICS_ALLOWED_IPS`` (the scraper's address as seen by
+    Django, i.e. REMOTE_ADDR); None serves it to everyone.
+    """
+    if not metrics.ENABLED:
+        return JsonResponse({"error": "Metrics are disabled."}, status=404)
+    if ALLOWED_IPS is not None and request.META.get("REMOTE_ADDR") not in ALLOWED_IPS:
+        return JsonResponse({"error": "Metrics are only served to internal addresses."}, status=403)
+    return HttpResponse(metrics.expose(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,66 +1,122 @@
 import os
-import io
+import json
 import base64
-import numpy as np
-import matplotlib.pyplot as plt
-import rasterio
-from skimage.transform import downscale_local_mean
-from django.http import JsonResponse
-from django.shortcuts import render
+from django.http import JsonResponse, HttpResponse
+from django.conf import settings
+from myapp.services import sar_tiles, sar_render, sar_pipeline, safe_index
+from myapp.services.offload import offloaded
+from myapp.services.metrics import instrumented, stage
 
 
+PREVIEW_MAX_DIM = getattr(settings, "SAR_PREVIEW_MAX_DIM", 1024)
+
+
+@offloaded()
+@instrumented
 def process_sar(request):
+    """
+    Renders one measurement band of a GRD .SAFE folder as a dB image.
+
+    POST folder_path, optional polarisation (VV, VH, HH, HV) and swath to pick
+    the band (first listed in the manifest otherwise), cmap (gray, viridis,
+    inferno, magma) and format (png, webp). With ``format`` the image is returned as binary and
+    its metadata (sizes, dB range, tiles) in the ``X-Sar-Info`` JSON header;
+    without it, JSON with a data URI. Axes are drawn by the client.
+    """
     if request.method == "POST":
         folder_path = request.POST.get("folder_path")
+        fmt = request.POST.get("format")
+        cmap = request.POST.get("cmap", "gray")
         if not folder_path:
             return JsonResponse({"error": "No folder path provided."})
+        if cmap not in sar_render.COLORMAPS:
+            return JsonResponse({"error": f"Unknown colormap: {cmap}"}, status=400)
 
         if not os.path.exists(folder_path):
             return JsonResponse({"error": f"Folder not found: {folder_path}"})
 
         try:
-            # Find first .tiff file in the SAFE folder
-            tiff_file = None
-            for root, dirs, files in os.walk(folder_path):
-                for f in files:
-                    if f.lower().endswith(".tiff"):
-                        tiff_file = os.path.join(root, f)
-                        break
-                if tiff_file:
-                    break
-
-            if not tiff_file:
-                return JsonResponse({"error": "No .tiff measurement file found in SAFE folder."})
-
-            # Read first band with rasterio
-            with rasterio.open(tiff_file) as src:
-                image_data = src.read(1).astype(np.float32)
-
-            # Downsample if too large
-            max_dim = 2048
-            if image_data.shape[0] > max_dim or image_data.shape[1] > max_dim:
-                factor_row = max(1, image_data.shape[0] // max_dim)
-                factor_col = max(1, image_data.shape[1] // max_dim)
-                image_data = downscale_local_mean(image_data, (factor_row, factor_col))
-
-            # Convert to dB
-            amplitude_db = 10 * np.log10(image_data + 1e-6)
-
-            # Plot
-            fig, ax = plt.subplots(figsize=(10, 8))
-            ax.imshow(amplitude_db, cmap='gray', aspect='auto')
-            ax.set_title(f"Sentinel-1 GRD Image (dB)\n{os.path.basename(tiff_file)}")
-            ax.set_xlabel("Range bins")
-            ax.set_ylabel("Azimuth lines")
-
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            img_b64 = base64.b64encode(buf.getbuffer()).decode("utf8")
-
-            return JsonResponse({"image": f"data:image/png;base64,{img_b64}"})
+            # Resolve the band from the product index (manifest parsed once per product)
+            try:
+                with stage("index"):
+                    band, bands = safe_index.resolve(
+                        folder_path, request.POST.get("polarisation"), request.POST.get("swath"))
+            except LookupError as e:
+                return JsonResponse({"error": str(e)})
+            tiff_file = band["path"]
+
+            # Register the product for tiled viewing (coarse tile levels are built here)
+            with stage("tiles"):
+                meta = sar_tiles.register(tiff_file)
+
+            # Windowed read, block mean to display size and dB, strip by strip across
+            # worker processes (full resolution is served as tiles)
+            with stage("decode"):
+                amplitude_db = sar_pipeline.preview_db(tiff_file, PREVIEW_MAX_DIM)
+
+            # Render: histogram contrast stretch, colormap LUT, direct PNG/WebP encode
+            with stage("render"):
+                image_bytes, content_type, db_range = sar_render.render(amplitude_db, cmap, fmt or "png")
+
+            info = {
+                "file_name": os.path.basename(tiff_file),
+                "polarisation": band["polarisation"],
+                "swath": band["swath"],
+                "bands": [{"polarisation": b["polarisation"], "swath": b["swath"]} for b in bands],
+                "width": int(amplitude_db.shape[1]),
+                "height": int(amplitude_db.shape[0]),
+                "source_width": meta["width"],
+                "source_height": meta["height"],
+                "db_range": list(db_range),
+                "cmap": cmap,
+                "tiles": {
+                    "product_id": meta["product_id"],
+                    "url": f"/sar/tiles/{meta['product_id']}/{{z}}/{{x}}/{{y}}.png",
+                    "width": meta["width"],
+                    "height": meta["height"],
+                    "tile_size": meta["tile_size"],
+                    "max_zoom": meta["max_zoom"],
+                    "db_range": meta["db_range"],
+                },
+            }
+            if fmt:
+                response = HttpResponse(image_bytes, content_type=content_type)
+                response["X-Sar-Info"] = json.dumps(info)
+                return response
+
+            with stage("serialize"):
+                img_b64 = base64.b64encode(image_bytes).decode("utf8")
+                return JsonResponse({"image": f"data:{content_type};base64,{img_b64}", **info})
 
         except Exception as e:
             return JsonResponse({"error": f"Error processing GRD .SAFE folder: {e}"})
 
-    return JsonResponse({"error": "Invalid request method."})
\ No newline at end of file
+    return JsonResponse({"error": "Invalid request method."})
+
+
+TILE_FORMATS = {
+    "png": (sar_tiles.tile_png, "image/png"),
+    "u8": (sar_tiles.tile_raw, "application/octet-stream"),
+}
+
+
+@instrumented
+def sar_tile(request, product_id, z, x, y, fmt):
+    """XYZ tile of a registered product: PNG (gray or ?cmap= colormap, with alpha) or raw 256x256 uint8."""
+    cmap = request.GET.get("cmap", "gray")
+    if fmt not in TILE_FORMATS:
+        return JsonResponse({"error": f"Unknown tile format: {fmt}"}, status=400)
+    if cmap not in sar_render.COLORMAPS:
+        return JsonResponse({"error": f"Unknown colormap: {cmap}"}, status=400)
+    try:
+        data = sar_tiles.tile(product_id, z, x, y)
+    except Exception as e:
+        return JsonResponse({"error": f"Error rendering tile: {e}"}, status=500)
+    if data is None:
+        return JsonResponse({"error": "Unknown product or tile out of range."}, status=404)
+
+    encode, content_type = TILE_FORMATS[fmt]
+    response = HttpResponse(encode(data, cmap), content_type=content_type)
+    response["Cache-Control"] = "public, max-age=86400"  # product ids change when the file does
+    response["X-Tile-Width"], response["X-Tile-Height"] = data.shape[1], data.shape[0]
+    return response
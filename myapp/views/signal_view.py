@@ -0,0 +1,253 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.http import JsonResponse
+from myapp.services import signal_cache, decimation, eeg_reader, recurrence
+from myapp.services.offload import offloaded
+from myapp.services.metrics import instrumented, stage
+
+
+DEFAULT_WIDTH = 1000   # plot width in pixels
+MAX_WIDTH = 10000
+LAZY_BLOCK_BUCKETS = 256  # buckets decimated per block read from the recording
+LTTB_PREREDUCE = 8  # min/max down to width * this before LTTB
+MAX_RECURRENCE_SIZE = 2000  # points per side of a recurrence matrix
+ANALYSIS_SECS = getattr(settings, "SIGNAL_ANALYSIS_SECS", 60)  # histogram/recurrence window without ``stop``
+ANALYSIS_MAX_SECS = getattr(settings, "SIGNAL_ANALYSIS_MAX_SECS", 600)
+HISTOGRAM_MAX_CELLS = getattr(settings, "SIGNAL_HISTOGRAM_MAX_CELLS", 4_000_000)  # pairs * bins ** 2
+
+
+def parse_channels(value, n_channels):
+    """Comma-separated channel indices -> list of ints (all channels when empty)."""
+    if not value:
+        return list(range(n_channels))
+    picks = [int(v) for v in value.split(",") if v.strip()]
+    if any(p < 0 or p >= n_channels for p in picks):
+        raise ValueError("channel index out of range")
+    return picks
+
+
+def parse_finite(value, default):
+    """Finite float from a query parameter (``default`` when missing); nan and inf are rejected."""
+    if value is None or value == '':
+        return float(default)
+    seconds = float(value)
+    if not math.isfinite(seconds):
+        raise ValueError(f'{value} is not a finite number')
+    return seconds
+
+
+def _sample_bounds(start, stop, fs, n_samples):
+    i0 = int(np.clip(np.floor(start * fs), 0, n_samples))
+    i1 = int(np.clip(np.ceil(stop * fs), i0, n_samples))
+    return i0, i1
+
+
+def _lazy_minmax(entry, i0, i1, picks, width):
+    """Min/max decimation of a lazily read recording, one block of buckets at a time."""
+    n = i1 - i0
+    if n <= 2 * width:
+        return np.arange(n), eeg_reader.read_window(entry, i0, i1, picks)
+
+    bucket = int(np.ceil(n / width))
+    step = bucket * LAZY_BLOCK_BUCKETS
+    indices, values = [], []
+    for b0 in range(i0, i1, step):
+        block = eeg_reader.read_window(entry, b0, min(b0 + step, i1), picks)
+        idx, val = decimation.minmax_decimate(block, int(np.ceil(block.shape[1] / bucket)))
+        indices.append(idx + (b0 - i0))
+        values.append(val)
+    return np.concatenate(indices), np.concatenate(values, axis=1)
+
+
+@offloaded()
+@instrumented
+def signal_window(request, signal_id):
+    """
+    Return a plot-ready decimation of a cached ECG/EEG upload.
+
+    Query parameters: ``start``/``stop`` in seconds, ``width`` in pixels,
+    ``channels`` as comma-separated indices and ``method`` (minmax or lttb).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'})
+
+    entry = signal_cache.get(signal_id)
+    if entry is None or 'channels' not in entry:
+        return JsonResponse({'error': 'Unknown signal_id, please upload the record again'}, status=404)
+
+    fs = entry['fs']
+    n_samples = eeg_reader.n_samples(entry)
+    try:
+        start = parse_finite(request.GET.get('start'), 0)
+        stop = parse_finite(request.GET.get('stop'), n_samples / fs)
+        width = min(max(int(request.GET.get('width', DEFAULT_WIDTH)), 1), MAX_WIDTH)
+        picks = parse_channels(request.GET.get('channels'), len(entry['channels']))
+        method = request.GET.get('method', 'minmax')
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
+
+    i0, i1 = _sample_bounds(start, stop, fs, n_samples)
+    if method not in ('minmax', 'lttb'):
+        return JsonResponse({'error': f'Unknown method: {method}'}, status=400)
+
+    with stage("decimate"):
+        # Read block by block: never hold more than one block of the recording in memory
+        if method == 'lttb':
+            reduced_idx, reduced = _lazy_minmax(entry, i0, i1, picks, LTTB_PREREDUCE * width)
+            lttb_idx, values = decimation.lttb_decimate(reduced, 2 * width)
+            indices = reduced_idx[lttb_idx]
+        else:
+            indices, values = _lazy_minmax(entry, i0, i1, picks, width)
+    times = np.broadcast_to((indices + i0) / fs, values.shape)
+
+    with stage("serialize"):
+        return JsonResponse({
+            'channels': [entry['channels'][p] for p in picks],
+            'fs': fs,
+            'start': i0 / fs,
+            'stop': i1 / fs,
+            'method': method,
+            'x': np.round(times, 6).tolist(),
+            'y': values.tolist(),
+        })
+
+
+def _window_bounds(request, entry):
+    """
+    Sample range [i0, i1) for the start/stop query parameters (seconds).
+    ``stop`` defaults to ``ANALYSIS_SECS`` after ``start``, and windows longer
+    than ``ANALYSIS_MAX_SECS`` are rejected rather than read whole.
+    """
+    fs = entry['fs']
+    start = parse_finite(request.GET.get('start'), 0)
+    stop = parse_finite(request.GET.get('stop'), start + ANALYSIS_SECS)
+    if stop - start > ANALYSIS_MAX_SECS:
+        raise ValueError(f'window longer than {ANALYSIS_MAX_SECS} s')
+    return _sample_bounds(start, stop, fs, eeg_reader.n_samples(entry))
+
+
+@offloaded()
+@instrumented
+def signal_histogram(request, signal_id):
+    """
+    Joint amplitude histogram of channel pairs of a cached upload.
+
+    ``channels`` is either a pair ``i,j`` or ``all`` (every pair i < j);
+    ``bins`` sets the grid size and ``start``/``stop`` the window in seconds.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'})
+
+    entry = signal_cache.get(signal_id)
+    if entry is None or 'channels' not in entry:
+        return JsonResponse({'error': 'Unknown signal_id, please upload the record again'}, status=404)
+
+    names = entry['channels']
+    try:
+        i0, i1 = _window_bounds(request, entry)
+        bins = min(max(int(request.GET.get('bins', 100)), 2), 1000)
+        value = request.GET.get('channels', '0,1')
+        if value == 'all':
+            picks = list(range(len(names)))
+            pairs = [(i, j) for i in range(len(picks)) for j in range(i + 1, len(picks))]
+        else:
+            picks = parse_channels(value, len(names))
+            if len(picks) != 2 or picks[0] == picks[1]:
+                raise ValueError('select two different channels')
+            pairs = [(0, 1)]
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
+    if i1 - i0 < 2 or not pairs:
+        return JsonResponse({'error': 'Not enough samples or channels in the selected window'}, status=400)
+    if len(pairs) * bins ** 2 > HISTOGRAM_MAX_CELLS:
+        return JsonResponse({'error': f'Too many histogram cells ({len(pairs)} pairs x {bins}^2 bins); '
+                                      f'use fewer bins or channels'}, status=400)
+
+    def compute():
+        with stage("read"):
+            window = eeg_reader.read_window(entry, i0, i1, picks)
+        with stage("histogram"):
+            hists, ranges = recurrence.pair_histograms(window, pairs, bins)
+        return {'z': [h.astype(np.int32) for h in hists], 'ranges': ranges}
+
+    key = ('histogram', signal_id, tuple(picks), bins, i0, i1)
+    result = recurrence.cached(key, compute)
+    ranges = result['ranges']
+
+    with stage("serialize"):
+        if len(pairs) == 1:
+            (lo1, hi1), (lo2, hi2) = ranges[0], ranges[1]
+            return JsonResponse({
+                'channels': [names[picks[0]], names[picks[1]]],
+                'z': result['z'][0].tolist(),
+                'x': recurrence.bin_centres(lo1, hi1, bins).tolist(),
+                'y': recurrence.bin_centres(lo2, hi2, bins).tolist(),
+            })
+        return JsonResponse({
+            'channels': names,
+            'bins': bins,
+            'pairs': [[picks[i], picks[j]] for i, j in pairs],
+            'z': [h.tolist() for h in result['z']],
+            'ranges': {names[p]: ranges[k].tolist() for k, p in enumerate(picks)},
+        })
+
+
+@offloaded()
+@instrumented
+def signal_recurrence(request, signal_id):
+    """
+    Cross-recurrence matrix of two channels of a cached upload.
+
+    The window (``start``/``stop`` seconds) is block-averaged down to ``size``
+    points, optionally time-delay embedded (``dim``, ``delay``) and thresholded
+    at ``eps`` (default: 10% quantile of the distances).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET method required'})
+
+    entry = signal_cache.get(signal_id)
+    if entry is None or 'channels' not in entry:
+        return JsonResponse({'error': 'Unknown signal_id, please upload the record again'}, status=404)
+
+    names, fs = entry['channels'], entry['fs']
+    try:
+        i0, i1 = _window_bounds(request, entry)
+        picks = parse_channels(request.GET.get('channels', '0,1'), len(names))
+        if len(picks) != 2:
+            raise ValueError('select two channels')
+        size = min(max(int(request.GET.get('size', 500)), 10), MAX_RECURRENCE_SIZE)
+        dim = max(int(request.GET.get('dim', 1)), 1)
+        delay = max(int(request.GET.get('delay', 1)), 1)
+        eps = request.GET.get('eps')
+        eps = parse_finite(eps, 0) if eps else None
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
+
+    def compute():
+        with stage("read"):
+            window = eeg_reader.read_window(entry, i0, i1, picks)
+        step = max(1, int(np.ceil(window.shape[1] / size)))
+        n = (window.shape[1] // step) * step
+        if n == 0:
+            raise ValueError('window is empty')
+        reduced = window[:, :n].reshape(2, -1, step).mean(axis=2)
+        with stage("recurrence"):
+            matrix, used_eps = recurrence.cross_recurrence(reduced[0], reduced[1], eps=eps, dim=dim, delay=delay)
+        return {'z': matrix, 'eps': used_eps, 'step': step}
+
+    key = ('recurrence', signal_id, tuple(picks), size, dim, delay, eps, i0, i1)
+    try:
+        result = recurrence.cached(key, compute)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    matrix, step = result['z'], result['step']
+    times = (i0 + np.arange(matrix.shape[0]) * step) / fs
+    return JsonResponse({
+        'channels': [names[p] for p in picks],
+        'z': matrix.tolist(),
+        'eps': result['eps'],
+        'times': np.round(times, 6).tolist(),
+    })